@@ -0,0 +1 @@
+"""Игра «Морской бой»: интерфейс на tkinter и независимый от него движок."""
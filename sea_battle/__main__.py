@@ -0,0 +1,53 @@
+"""Точка входа python -m sea_battle.
+
+Без аргументов запускается окно игры. Подкоманды работают без дисплея:
+модуль подкоманды импортируется только при ее вызове, а tkinter — только
+для окна игры, поэтому пакетные задачи не платят за загрузку интерфейса.
+
+    python -m sea_battle simulate --games 10000
+    python -m sea_battle bench --sizes 10 --output bench.json
+    python -m sea_battle replay --last --show
+"""
+import importlib
+import sys
+
+# Подкоманда -> (модуль с функцией main(argv), описание)
+COMMANDS = {
+    "play": ("main", "окно игры (по умолчанию)"),
+    "simulate": ("simulate", "партии компьютер против компьютера"),
+    "batch": ("batch", "пакетная симуляция партий на NumPy"),
+    "tournament": ("tournament", "круговой турнир стратегий компьютера"),
+    "bench": ("bench", "замеры горячих путей"),
+    "replay": ("journal", "разбор журнала ходов"),
+    "server": ("server", "сервер сетевой игры"),
+    "spectate": ("spectate", "трансляция партии зрителям"),
+    "latency": ("latency", "сравнение замеров задержек интерфейса"),
+}
+
+
+def usage():
+    lines = ["Использование: python -m sea_battle [подкоманда] [аргументы]", "", "Подкоманды:"]
+    lines += [f"  {name:<12} {description}" for name, (_, description) in COMMANDS.items()]
+    lines.append("")
+    lines.append("Аргументы подкоманды: python -m sea_battle <подкоманда> --help")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    name = argv[0] if argv else "play"
+    if name in ("-h", "--help"):
+        print(usage())
+        return 0
+    if name not in COMMANDS:
+        print(f"Неизвестная подкоманда: {name}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module = importlib.import_module(f".{COMMANDS[name][0]}", __package__)
+    if name == "play":
+        return module.main()
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
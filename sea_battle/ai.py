@@ -0,0 +1,431 @@
+"""Стратегии стрельбы компьютера.
+
+Стратегия знает только результаты собственных выстрелов: choose() выбирает
+клетку, observe() сообщает, чем закончился выстрел. Стратегии регистрируются
+по имени через register(), их используют окно игры и турнир (sea_battle.tournament).
+
+SimpleAI — исходное поведение компьютера: добивание раненого корабля,
+иначе случайная клетка. DensityAI ведет карту вероятностей: для каждой клетки считается, сколько
+допустимых положений еще не потопленных кораблей ее накрывают с учетом
+известных попаданий и промахов. Суммы по скользящим окнам считаются
+через накопленные суммы NumPy, а после каждого выстрела пересчитываются
+только затронутые строки и столбцы.
+
+Одинаковые позиции (особенно в начале партии) повторяются из партии в
+партию, поэтому клетки-кандидаты DensityAI запоминаются в общем
+ограниченном LRU-кэше evaluation_cache по состоянию доски целей и
+оставшемуся флоту. Если задан порог endgame_threshold, то, когда
+расстановок оставшихся кораблей немного, DensityAI переходит на точный
+расчет эндшпиля (sea_battle.endgame).
+"""
+import hashlib
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для вероятностной стратегии
+    np = None
+
+from . import endgame, engine
+
+# Стратегии, доступные в настройках
+SIMPLE = "simple"
+DENSITY = "density"
+
+RESULT_MISS = "miss"
+RESULT_HIT = "hit"
+RESULT_SUNK = "sunk"
+
+# Позиций в кэше оценок по умолчанию; 0 отключает кэш
+EVALUATION_CACHE_SIZE = 4096
+
+# Часть бюджета точного расчета, оставляемая на запасную оценку по карте вероятностей, мс
+ENDGAME_RESERVE_MS = 1
+
+
+def density_available():
+    """Проверка, можно ли использовать вероятностную стратегию"""
+    return np is not None
+
+
+class Strategy:
+    """Стратегия стрельбы по доске противника, корабли которой неизвестны"""
+
+    # Название для окна настроек
+    title = ""
+
+    def __init__(self, board_size, ships, rng=random, **options):
+        # options — настройки отдельных стратегий (например, endgame_threshold у DensityAI);
+        # стратегия без такой настройки их не использует
+        self.size = board_size
+        self.rng = rng
+        self.prior = None
+
+    def set_prior(self, counts):
+        """Частоты кораблей противника по клеткам из прошлых партий (индекс row * size + col)"""
+        self.prior = counts
+
+    @classmethod
+    def available(cls):
+        """Можно ли создать стратегию в текущем окружении"""
+        return True
+
+    def choose(self):
+        """Выбор клетки (row, col) для следующего выстрела"""
+        raise NotImplementedError
+
+    def observe(self, row, col, result):
+        """Учет результата выстрела: RESULT_MISS, RESULT_HIT или RESULT_SUNK"""
+        raise NotImplementedError
+
+
+class EvaluationCache:
+    """Ограниченный LRU-кэш оценок позиций: ключ — состояние доски целей и оставшийся флот"""
+
+    def __init__(self, maxsize=EVALUATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Окно игры считает ход в фоновом потоке, а размер меняет из настроек
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Оценка позиции или None; найденная позиция становится самой свежей"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Запоминание оценки; при переполнении вытесняется самая давняя позиция"""
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        """Новый предел числа позиций; лишние давние позиции вытесняются сразу"""
+        with self._lock:
+            self.maxsize = max(0, maxsize)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Очистка кэша и статистики"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Статистика обращений: попадания, промахи, доля попаданий, заполненность"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+# Общий кэш оценок всех стратегий процесса
+evaluation_cache = EvaluationCache()
+
+
+_strategies = {}
+
+
+def register(name, cls):
+    """Регистрация стратегии под именем; повторная регистрация заменяет прежнюю"""
+    _strategies[name] = cls
+    return cls
+
+
+def strategies():
+    """Зарегистрированные стратегии, доступные в текущем окружении: имя -> класс"""
+    return {name: cls for name, cls in _strategies.items() if cls.available()}
+
+
+def create(name, board_size, ships, rng=random, **options):
+    """Создание стратегии по имени; недоступная стратегия заменяется простой"""
+    cls = strategies().get(name, SimpleAI)
+    return cls(board_size, ships, rng, **options)
+
+
+class SimpleAI(Strategy):
+    """Добивание раненого корабля по соседним клеткам, иначе случайный выстрел"""
+
+    title = "Простой"
+
+    def __init__(self, board_size, ships, rng=random, **options):
+        super().__init__(board_size, ships, rng, **options)
+        # Доска целей: только отметки выстрелов, кораблей на ней нет
+        self.target = engine.new_board(board_size)
+        # Порядок поиска по частотам; без частот поиск случайный
+        self.hunt_order = None
+
+    def set_prior(self, counts):
+        super().set_prior(counts)
+        # Порядок считается один раз за партию: сначала клетки, где корабли стояли чаще
+        order = sorted(range(len(counts)), key=lambda index: (-counts[index], self.rng.random()))
+        self.hunt_order = [divmod(index, self.size) for index in reversed(order)]
+
+    def choose(self):
+        if self.hunt_order is None:
+            return engine.choose_shot(self.target, self.rng)
+        target = engine.find_target(self.target)
+        if target:
+            return target
+        while self.hunt_order:
+            row, col = self.hunt_order.pop()
+            if not self.target.is_shot(row, col):
+                return row, col
+        return engine.random_shot(self.target, self.rng)
+
+    def observe(self, row, col, result):
+        self.target.mark(row, col, result != RESULT_MISS)
+
+
+def _window_sums(cells, length):
+    """Суммы по горизонтальным окнам длины length в каждой строке"""
+    padded = np.zeros((cells.shape[0], cells.shape[1] + 1), dtype=np.int32)
+    np.cumsum(cells, axis=1, out=padded[:, 1:])
+    return padded[:, length:] - padded[:, :-length]
+
+
+def _spread(weights, length):
+    """Сумма весов окон, накрывающих каждую клетку строки"""
+    rows, starts = weights.shape
+    width = starts + length - 1
+    totals = np.zeros((rows, starts + 1), dtype=np.int32)
+    np.cumsum(weights, axis=1, out=totals[:, 1:])
+    # Клетку j накрывают окна, начинающиеся в [j - length + 1, j]
+    cells = np.arange(width)
+    return totals[:, np.minimum(cells + 1, starts)] - totals[:, np.maximum(cells - length + 1, 0)]
+
+
+def _mask(cells):
+    """Битовая маска (бит row * size + col) из булева массива"""
+    return int.from_bytes(np.packbits(cells.ravel(), bitorder="little").tobytes(), "little")
+
+
+class DensityAI(Strategy):
+    """Стрельба по клетке, которую накрывает больше всего возможных кораблей"""
+
+    title = "Вероятностный"
+
+    @classmethod
+    def available(cls):
+        return density_available()
+
+    def __init__(self, board_size, ships, rng=random, cache=None, endgame_threshold=None,
+                 endgame_budget_ms=None, **options):
+        if np is None:
+            raise RuntimeError("Для вероятностной стратегии нужен NumPy")
+        super().__init__(board_size, ships, rng, **options)
+        self.cache = evaluation_cache if cache is None else cache
+        # Частоты из прошлых партий меняют оценку, поэтому входят в ключ кэша
+        self.prior_key = None
+        # Точный расчет включается, когда оценка числа расстановок не больше порога; 0 — никогда.
+        # Бюджет покрывает весь ход: оценку, перебор и запасной расчет по карте вероятностей
+        self.endgame_threshold = endgame.THRESHOLD if endgame_threshold is None else endgame_threshold
+        self.endgame_budget_ms = endgame.BUDGET_MS if endgame_budget_ms is None else endgame_budget_ms
+        self.alive = Counter(ships)
+        self.lengths = sorted(length for length in self.alive if length <= board_size)
+
+        shape = (board_size, board_size)
+        self.shot = np.zeros(shape, dtype=bool)
+        # Клетки, где не может быть живого корабля: промахи, потопленные корабли и их окрестность
+        self.blocked = np.zeros(shape, dtype=bool)
+        # Попадания по кораблям, которые еще не потоплены
+        self.wounded = np.zeros(shape, dtype=bool)
+
+        # Для каждой длины: сколько положений одного корабля в режиме поиска накрывают клетку
+        self.hunt_rows = {length: np.zeros(shape, dtype=np.int32) for length in self.lengths}
+        self.hunt_cols = {length: np.zeros(shape, dtype=np.int32) for length in self.lengths}
+        self._refresh(range(board_size), range(board_size))
+
+    def _refresh(self, rows, cols):
+        """Пересчет карты поиска в указанных строках и столбцах"""
+        rows = list(rows)
+        cols = list(cols)
+        free = ~(self.blocked | self.wounded)
+        for length in self.lengths:
+            if rows:
+                windows = _window_sums(free[rows], length) == length
+                self.hunt_rows[length][rows] = _spread(windows.astype(np.int32), length)
+            if cols and length > 1:
+                windows = _window_sums(free[:, cols].T, length) == length
+                self.hunt_cols[length][:, cols] = _spread(windows.astype(np.int32), length).T
+
+    def set_prior(self, counts):
+        super().set_prior(counts)
+        # Множитель поиска: частота корабля в клетке со сглаживанием, чтобы не обнулять редкие клетки
+        prior = np.frombuffer(counts, dtype=np.uint32).reshape(self.size, self.size).astype(np.float64)
+        self.prior_weight = (prior + 1) / (prior.mean() + 1)
+        self.prior_key = hashlib.blake2b(counts, digest_size=16).digest()
+
+    def heatmap(self):
+        """Текущая карта вероятностей (ненормированная)"""
+        if self.wounded.any():
+            heat = self._target_heat()
+        else:
+            heat = np.zeros((self.size, self.size), dtype=np.int32)
+            for length in self.lengths:
+                count = self.alive[length]
+                if count:
+                    heat += count * self.hunt_rows[length]
+                    if length > 1:
+                        heat += count * self.hunt_cols[length]
+            if self.prior is not None:
+                heat = heat * self.prior_weight
+        heat[self.shot] = 0
+        return heat
+
+    def _target_heat(self):
+        """Карта добивания: положения живых кораблей, проходящие через раненые клетки"""
+        heat = np.zeros((self.size, self.size), dtype=np.int32)
+        open_cells = ~self.blocked
+        wounded = self.wounded.astype(np.int32)
+        for length in self.lengths:
+            count = self.alive[length]
+            if not count:
+                continue
+            orientations = [(open_cells, wounded, False)]
+            if length > 1:
+                orientations.append((open_cells.T, wounded.T, True))
+            for cells, hits, transposed in orientations:
+                fits = _window_sums(cells, length) == length
+                weights = _window_sums(hits, length) * fits
+                spread = _spread(weights, length)
+                heat += count * (spread.T if transposed else spread)
+        return heat
+
+    def state_key(self):
+        """Компактный ключ позиции: хеш обстрелянных, закрытых и раненых клеток, живых кораблей и частот.
+
+        Порог точного расчета тоже входит в ключ: от него зависит, чем
+        оценивается позиция.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for cells in (self.shot, self.blocked, self.wounded):
+            digest.update(cells.tobytes())
+        # Длины вместе с числом живых кораблей: флоты (4, 3) и (4, 2) не должны совпасть
+        digest.update(" ".join(f"{length}:{self.alive[length]}" for length in self.lengths).encode())
+        return self.size, digest.digest(), self.prior_key, self.endgame_threshold
+
+    def candidates(self):
+        """Клетки с наибольшей оценкой (массив строк и столбцов); повторная позиция берется из кэша"""
+        key = self.state_key() if self.cache.maxsize > 0 else None
+        candidates = self.cache.get(key) if key is not None else None
+        if candidates is None:
+            candidates, complete = self._endgame_candidates()
+            if candidates is None:
+                heat = self.heatmap()
+                best = heat.max()
+                if best <= 0:
+                    # Карта пуста (например, флот не совпадает с настройками): любая свободная клетка
+                    candidates = np.argwhere(~self.shot)
+                else:
+                    candidates = np.argwhere(heat == best)
+            # Массив общий для всех стратегий с этой позицией
+            candidates.setflags(write=False)
+            # Ответ после прерванного по времени расчета зависит от скорости машины и в кэш не
+            # попадает: иначе игра с кэшем и без него расходилась бы
+            if key is not None and complete:
+                self.cache.put(key, candidates)
+        return candidates
+
+    def _endgame_candidates(self):
+        """Клетки точного расчета и признак, что расчет не прерван по времени.
+
+        Клеток нет (None), если точный расчет выключен, расстановок слишком
+        много или времени не хватило; тогда ход считается по карте вероятностей.
+        """
+        if not self.endgame_threshold:
+            return None, True
+        lengths = [length for length in reversed(self.lengths) for _ in range(self.alive[length])]
+        if not lengths:
+            return None, True
+        # Бюджет отсчитывается от начала хода, часть его остается на запасную карту вероятностей
+        deadline = time.perf_counter() + max(0, self.endgame_budget_ms - ENDGAME_RESERVE_MS) / 1000
+        blocked = _mask(self.blocked)
+        wounded = _mask(self.wounded)
+        if endgame.estimate(self.size, blocked, wounded, lengths, self.endgame_threshold) > self.endgame_threshold:
+            return None, True
+        solution = endgame.solve(self.size, blocked, wounded, lengths, deadline=deadline)
+        if solution is None:
+            return None, False
+        if not solution[0]:
+            return None, True
+        cells = endgame.best_cells(self.size, solution[1], _mask(~self.shot))
+        return (np.array(cells) if cells else None), True
+
+    def choose(self):
+        """Выбор клетки для следующего выстрела"""
+        candidates = self.candidates()
+        row, col = candidates[self.rng.randrange(len(candidates))]
+        return int(row), int(col)
+
+    def observe(self, row, col, result):
+        """Учет результата выстрела: RESULT_MISS, RESULT_HIT или RESULT_SUNK"""
+        self.shot[row, col] = True
+        if result == RESULT_MISS:
+            self.blocked[row, col] = True
+            self._refresh([row], [col])
+            return
+
+        self.wounded[row, col] = True
+        if result == RESULT_HIT:
+            # Корабли не касаются углами, поэтому диагональные соседи попадания пусты
+            top, bottom = max(0, row - 1), min(self.size, row + 2)
+            left, right = max(0, col - 1), min(self.size, col + 2)
+            for r in (row - 1, row + 1):
+                for c in (col - 1, col + 1):
+                    if 0 <= r < self.size and 0 <= c < self.size:
+                        self.blocked[r, c] = True
+            self._refresh(range(top, bottom), range(left, right))
+            return
+
+        # Потоплен: корабль — связная группа раненых клеток, включающая (row, col)
+        ship = self._wounded_group(row, col)
+        rows = [r for r, _ in ship]
+        cols = [c for _, c in ship]
+        top, bottom = max(0, min(rows) - 1), min(self.size, max(rows) + 2)
+        left, right = max(0, min(cols) - 1), min(self.size, max(cols) + 2)
+        for r, c in ship:
+            self.wounded[r, c] = False
+        self.blocked[top:bottom, left:right] = True
+
+        length = len(ship)
+        if self.alive[length]:
+            self.alive[length] -= 1
+        self._refresh(range(top, bottom), range(left, right))
+
+    def _wounded_group(self, row, col):
+        """Клетки связной группы попаданий, содержащей (row, col)"""
+        group = [(row, col)]
+        seen = {(row, col)}
+        for r, c in group:
+            for dr, dc in engine.DIRECTIONS:
+                cell = (r + dr, c + dc)
+                if (cell not in seen and 0 <= cell[0] < self.size and 0 <= cell[1] < self.size
+                        and self.wounded[cell]):
+                    seen.add(cell)
+                    group.append(cell)
+        return group
+
+
+register(SIMPLE, SimpleAI)
+register(DENSITY, DensityAI)
@@ -0,0 +1,276 @@
+"""Пакетный движок: тысячи партий «компьютер против компьютера» в ногу.
+
+Партии хранятся стопками массивов NumPy формы N x 2 x H x W (партия,
+доска, строка, столбец). За один шаг каждая незаконченная партия делает
+ровно один выстрел: попадание, потопление и победа вычисляются сразу для
+всей стопки индексированием массивов, без цикла по партиям. Правила те
+же, что у engine.Board: выстрел в уже обстрелянную клетку передает ход,
+попавший стреляет еще раз, корабль потоплен, когда у него не осталось
+целых клеток, партия выиграна, когда целых клеток не осталось у флота.
+
+Стрельба по умолчанию векторизует простую стратегию компьютера
+(engine.choose_shot): добивание по соседям попаданий в том же порядке,
+иначе случайная необстрелянная клетка. Сводка и ее вывод — те же, что
+у sea_battle.simulate; каждая стопка считается отдельной частью прогона.
+Стопки распределяются по пулу процессов, как части sea_battle.simulate;
+прогон воспроизводится при том же зерне, размере стопки и числе процессов.
+
+Пример запуска:
+
+    python -m sea_battle batch --games 20000 --workers 8 --seed 1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для пакетного движка
+    np = None
+
+from . import engine, fleet
+from .simulate import positive_int, print_summary, split_games, summarize, worker_seed
+
+# Результаты выстрела в массиве, который возвращает step
+NO_SHOT = -1
+MISS = 0
+HIT = 1
+SUNK = 2
+
+# Партий в одной стопке: массивы стопки 10x10 занимают несколько мегабайт
+BATCH_SIZE = 4096
+
+
+def available():
+    """Проверка, можно ли использовать пакетный движок"""
+    return np is not None
+
+
+def _layout_arrays(board_size, layouts):
+    """Номера кораблей по клеткам (-1 — вода) и длины кораблей для списка расстановок.
+
+    Возвращает массивы M x H x W и M x K (K — наибольшее число кораблей).
+    Корабли прямые и не касаются, поэтому корабль начинается в клетке без
+    соседей-кораблей слева и сверху, а остальные его клетки берут номер у
+    соседа слева или сверху. Номера идут по возрастанию начальной клетки,
+    как в реестре engine.Board.
+    """
+    count = len(layouts)
+    cells = board_size * board_size
+    width = (cells + 7) // 8
+    data = b"".join(layout.to_bytes(width, "little") for layout in layouts)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(count, width), axis=1, bitorder="little")
+    ships = bits[:, :cells].reshape(count, board_size, board_size).astype(bool)
+
+    left = np.zeros_like(ships)
+    left[:, :, 1:] = ships[:, :, :-1]
+    up = np.zeros_like(ships)
+    up[:, 1:, :] = ships[:, :-1, :]
+    heads = ships & ~left & ~up
+    numbers = np.cumsum(heads.reshape(count, -1), axis=1, dtype=np.int16).reshape(ships.shape) - 1
+    ship_id = np.where(heads, numbers, np.int16(-1))
+    # Номер проходит вдоль корабля на одну клетку за шаг
+    for _ in range(board_size - 1):
+        from_left = np.full_like(ship_id, -1)
+        from_left[:, :, 1:] = ship_id[:, :, :-1]
+        from_up = np.full_like(ship_id, -1)
+        from_up[:, 1:, :] = ship_id[:, :-1, :]
+        grown = np.where(ships & (ship_id < 0), np.maximum(from_left, from_up), ship_id)
+        if np.array_equal(grown, ship_id):
+            break
+        ship_id = grown
+
+    max_ships = max(int(heads.reshape(count, -1).sum(axis=1).max(initial=0)), 1)
+    # Длины: число клеток с каждым номером, номера всех досок подряд в одном bincount
+    offsets = (np.arange(count) * max_ships)[:, None, None]
+    labelled = ship_id >= 0
+    lengths = np.bincount((ship_id + offsets)[labelled], minlength=count * max_ships)
+    return ship_id, lengths.reshape(count, max_ships).astype(np.int16)
+
+
+class BatchGames:
+    """N партий на парах расстановок (маски кораблей, как у fleet.generate_fleets)"""
+
+    def __init__(self, board_size, layouts):
+        if np is None:
+            raise RuntimeError("Для пакетного движка нужен NumPy")
+        self.size = board_size
+        count = len(layouts)
+        ship_id, lengths = _layout_arrays(board_size, [layout for pair in layouts for layout in pair])
+
+        # Номер корабля в клетке, -1 — вода
+        self.ship_id = ship_id.reshape(count, 2, board_size, board_size)
+        self.ships = self.ship_id >= 0
+        self.hits = np.zeros_like(self.ships)
+        self.misses = np.zeros_like(self.ships)
+        # Целые клетки каждого корабля и всего флота каждой доски
+        self.ship_remaining = lengths.reshape(count, 2, -1)
+        self.remaining = self.ship_remaining.sum(axis=2, dtype=np.int32)
+
+        # Кто стреляет, сколько выстрелов сделал каждый игрок, кто победил
+        self.turn = np.zeros(count, dtype=np.int8)
+        self.shot_counts = np.zeros((count, 2), dtype=np.int32)
+        self.winner = np.full(count, -1, dtype=np.int8)
+        self.games = np.arange(count)
+
+    @property
+    def active(self):
+        """Маска незаконченных партий"""
+        return self.winner < 0
+
+    def targets(self):
+        """Попадания и обстрелянные клетки досок, по которым сейчас стреляют: два массива N x H x W"""
+        target = 1 - self.turn
+        hits = self.hits[self.games, target]
+        return hits, hits | self.misses[self.games, target]
+
+    def step(self, rows, cols):
+        """Один выстрел в каждой незаконченной партии; возвращает результаты (NO_SHOT для законченных)"""
+        games = self.games
+        turn = self.turn
+        target = 1 - turn
+        active = self.active
+        size = self.size
+
+        inside = (rows >= 0) & (rows < size) & (cols >= 0) & (cols < size)
+        rows = np.where(inside, rows, 0)
+        cols = np.where(inside, cols, 0)
+        shot = self.hits[games, target, rows, cols] | self.misses[games, target, rows, cols]
+        fired = active & inside & ~shot
+        hit = fired & self.ships[games, target, rows, cols]
+        miss = fired & ~hit
+
+        self.shot_counts[games[active], turn[active]] += 1
+        self.hits[games[hit], target[hit], rows[hit], cols[hit]] = True
+        self.misses[games[miss], target[miss], rows[miss], cols[miss]] = True
+
+        # В каждой партии один выстрел, поэтому индексы не повторяются и вычитание без np.subtract.at
+        ship = self.ship_id[games, target, rows, cols]
+        self.ship_remaining[games[hit], target[hit], ship[hit]] -= 1
+        self.remaining[games[hit], target[hit]] -= 1
+        sunk = hit & (self.ship_remaining[games, target, np.maximum(ship, 0)] == 0)
+        won = hit & (self.remaining[games, target] == 0)
+        self.winner[won] = turn[won]
+
+        # Промах и выстрел в обстрелянную клетку передают ход
+        passes = active & ~hit
+        self.turn[passes] = 1 - turn[passes]
+
+        results = np.full(len(games), NO_SHOT, dtype=np.int8)
+        results[active] = MISS
+        results[hit] = HIT
+        results[sunk] = SUNK
+        return results
+
+    def play(self, choose, generator):
+        """Партии до конца; choose(hits, shots, generator) возвращает строки и столбцы выстрелов"""
+        while self.active.any():
+            hits, shots = self.targets()
+            rows, cols = choose(hits, shots, generator)
+            self.step(rows, cols)
+        return self.winner, self.shot_counts[self.games, self.winner]
+
+
+def simple_shots(hits, shots, generator):
+    """Векторная простая стратегия: как engine.choose_shot, но для всей стопки досок сразу"""
+    count, size, _ = hits.shape
+    unshot = ~shots
+    # Для каждого направления в порядке engine.DIRECTIONS: попадания, у которых сосед в этом направлении цел
+    candidates = []
+    for dr, dc in engine.DIRECTIONS:
+        neighbour = np.zeros_like(unshot)
+        neighbour[:, max(0, -dr):size - max(0, dr), max(0, -dc):size - max(0, dc)] = \
+            unshot[:, max(0, dr):size - max(0, -dr) or None, max(0, dc):size - max(0, -dc) or None]
+        candidates.append(hits & neighbour)
+    found = np.logical_or.reduce(candidates).reshape(count, -1)
+
+    # Добивание: первое по индексу попадание с необстрелянным соседом, первое подходящее направление
+    has_target = found.any(axis=1)
+    first = found.argmax(axis=1)
+    rows, cols = np.divmod(first, size)
+    direction = np.argmax(np.stack([c.reshape(count, -1)[np.arange(count), first] for c in candidates]), axis=0)
+    steps = np.array(engine.DIRECTIONS)
+    target_rows = rows + steps[direction, 0]
+    target_cols = cols + steps[direction, 1]
+
+    # Случайная необстрелянная клетка: наибольший случайный ключ среди свободных клеток
+    keys = generator.random((count, size * size))
+    keys[shots.reshape(count, -1)] = -1
+    random_rows, random_cols = np.divmod(keys.argmax(axis=1), size)
+
+    return (np.where(has_target, target_rows, random_rows),
+            np.where(has_target, target_cols, random_cols))
+
+
+def run_chunk(chunk, games, board_size, ships, seed):
+    """Одна стопка партий в ногу; результат в формате simulate.run_chunk"""
+    started = time.perf_counter()
+    # Независимые потоки для расстановок и выстрелов: общее зерно дало бы один и тот же поток PCG64
+    layout_seed, shot_seed = np.random.SeedSequence(worker_seed(seed, chunk)).spawn(2)
+    generator = np.random.default_rng(shot_seed)
+    layouts = fleet.generate_fleets(2 * games, board_size, ships, seed=int(layout_seed.generate_state(1)[0]))
+    batch = BatchGames(board_size, [(next(layouts), next(layouts)) for _ in range(games)])
+    winner, shots = batch.play(simple_shots, generator)
+    values, counts = np.unique(shots, return_counts=True)
+    return {
+        "worker": chunk,
+        "pid": os.getpid(),
+        "games": games,
+        "seconds": time.perf_counter() - started,
+        "wins": [int((winner == 0).sum()), int((winner == 1).sum())],
+        "shots_to_win": {int(v): int(c) for v, c in zip(values, counts)},
+    }
+
+
+def run_batch(games, workers=None, board_size=10, ships=engine.DEFAULT_SHIPS, seed=0, batch_size=BATCH_SIZE):
+    """Прогон партий стопками не больше batch_size на пуле процессов; сводка как у simulate.run_simulation"""
+    if np is None:
+        raise RuntimeError("Для пакетного движка нужен NumPy")
+    workers = workers or os.cpu_count() or 1
+    ships = tuple(ships)
+    # Стопок не меньше, чем процессов, чтобы каждому досталась работа
+    stacks = max(-(-games // batch_size), min(workers, games))
+    counts = [count for count in split_games(games, stacks) if count] if games else []
+
+    started = time.perf_counter()
+    if workers <= 1 or len(counts) <= 1:
+        chunks = [run_chunk(chunk, count, board_size, ships, seed) for chunk, count in enumerate(counts)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(counts))) as pool:
+            futures = [
+                pool.submit(run_chunk, chunk, count, board_size, ships, seed)
+                for chunk, count in enumerate(counts)
+            ]
+            chunks = [future.result() for future in futures]
+    return summarize(chunks, time.perf_counter() - started)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная симуляция партий на NumPy")
+    parser.add_argument("--games", type=positive_int, default=10000, help="число партий")
+    parser.add_argument("--batch-size", type=positive_int, default=BATCH_SIZE, help="партий в одной стопке")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию все ядра)")
+    parser.add_argument("--board-size", type=int, default=10, help="размер доски")
+    parser.add_argument("--seed", type=int, default=0, help="базовое зерно генератора")
+    parser.add_argument("--json", action="store_true", help="вывести статистику в формате JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not available():
+        print("Для пакетного движка нужен NumPy", file=sys.stderr)
+        return 1
+    summary = run_batch(args.games, args.workers, args.board_size, seed=args.seed, batch_size=args.batch_size)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""Замеры производительности горячих путей игры без дисплея.
+
+Измеряются операции движка на досках разного размера, полная партия
+«компьютер против компьютера» и отрисовка draw_board на записывающем
+холсте, который считает создание, изменение и удаление элементов.
+Отдельно замеряется холодный запуск подкоманд python -m sea_battle без
+окна: время процесса, число загруженных модулей и то, не подгружается ли tkinter.
+Результаты пишутся в JSON, чтобы сравнивать их между коммитами:
+
+    python -m sea_battle.bench --output bench.json
+    python -m sea_battle.bench --compare old.json --output new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from . import engine, fleet, simulate
+
+DEFAULT_SIZES = (6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 20, 30, 50)
+# Размеры большого поля (разреженная доска и прокручиваемый холст)
+LARGE_SIZES = (100, 300, 1000)
+# Подкоманды python -m sea_battle, холодный запуск которых замеряется
+STARTUP_COMMANDS = ("replay", "simulate", "tournament", "server", "spectate", "latency")
+
+# Во сколько раз результат может ухудшиться, прежде чем считаться регрессией
+REGRESSION_THRESHOLD = 1.25
+
+
+class RecordingCanvas:
+    """Холст-заглушка: запоминает элементы и считает вызовы Tk"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.items = {}
+        self.next_id = 1
+        # Смещение прокрутки
+        self.x = self.y = 0
+
+    def canvasx(self, x):
+        return x + self.x
+
+    def canvasy(self, y):
+        return y + self.y
+
+    def tag_raise(self, tag):
+        self.calls["tag_raise"] += 1
+
+    def _create(self, kind, coords, options):
+        self.calls["create"] += 1
+        item = self.next_id
+        self.next_id += 1
+        self.items[item] = (kind, coords, options)
+        return item
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_oval(self, *coords, **options):
+        return self._create("oval", coords, options)
+
+    def delete(self, tag):
+        self.calls["delete"] += 1
+        if tag == "all":
+            self.items.clear()
+        elif tag in self.items:
+            self.items.pop(tag)
+        else:
+            # Удаление по метке: tags может быть строкой или кортежем
+            for item, (_, _, options) in list(self.items.items()):
+                tags = options.get("tags", ())
+                if tag == tags or tag in tags and not isinstance(tags, str):
+                    del self.items[item]
+
+    def itemconfig(self, item, **options):
+        self.calls["itemconfig"] += 1
+        self.items[item][2].update(options)
+
+    def coords(self, item, *coords):
+        self.calls["coords"] += 1
+
+    def bind(self, sequence, func):
+        self.calls["bind"] += 1
+
+    def unbind(self, sequence):
+        self.calls["unbind"] += 1
+
+
+def fleet_for(size):
+    """Стандартный флот, урезанный с конца, если он не помещается на доске"""
+    ships = list(engine.DEFAULT_SHIPS)
+    while ships:
+        try:
+            fleet.sample_layout(size, ships, random.Random(0))
+            return tuple(ships)
+        except fleet.FleetInfeasibleError:
+            ships.pop()
+    return ()
+
+
+def measure(func, number, repeat=3):
+    """Лучшее из нескольких повторений: секунды на number вызовов"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def result(name, size, number, seconds, **extra):
+    """Запись одного замера"""
+    entry = {
+        "name": name,
+        "board_size": size,
+        "ops": number,
+        "seconds": seconds,
+        "us_per_op": seconds / number * 1e6,
+    }
+    entry.update(extra)
+    return entry
+
+
+def scaled(number, size):
+    """Число повторов, уменьшающееся для больших досок"""
+    return max(10, number * 100 // (size * size))
+
+
+def bench_engine(size, ships, rng):
+    """Операции движка: создание доски, проверка позиции, расстановка, выстрелы"""
+    results = []
+
+    number = scaled(20000, size)
+    results.append(result("create_empty_board", size, number,
+                          measure(lambda: engine.Board(size), number)))
+
+    board = engine.Board(size)
+    fleet.place_random_fleet(board, ships, rng)
+    anchors = [(rng.randrange(size), rng.randrange(size), rng.choice(ships), rng.choice(engine.ORIENTATIONS))
+               for _ in range(1000)]
+    number = 20
+    results.append(result("can_place_ship", size, number * len(anchors),
+                          measure(lambda: [board.can_place_ship(*anchor) for anchor in anchors], number)))
+
+    number = 20
+    results.append(result("place_computer_ships", size, number,
+                          measure(lambda: fleet.place_random_fleet(engine.Board(size), ships, rng), number)))
+
+    # Выстрелы по всем клеткам в случайном порядке на свежей доске
+    cells = [(row, col) for row in range(size) for col in range(size)]
+    rng.shuffle(cells)
+    layout = board.ships
+
+    def fire_all():
+        target = engine.Board(size)
+        target.set_ships(layout)
+        for row, col in cells:
+            target.fire(row, col)
+
+    number = scaled(50, size)
+    seconds = measure(fire_all, number) - measure(lambda: engine.Board(size).set_ships(layout), number)
+    results.append(result("fire", size, number * len(cells), max(seconds, 0.0)))
+
+    hit_cells = list(engine.iter_cells(layout, size))
+    target = engine.Board(size)
+    target.set_ships(layout)
+    for row, col in hit_cells[::2]:
+        target.fire(row, col)
+    number = 200
+    results.append(result("is_ship_sunk", size, number * len(hit_cells),
+                          measure(lambda: [target.is_ship_sunk(row, col) for row, col in hit_cells], number)))
+    results.append(result("check_win", size, number * 100,
+                          measure(lambda: [target.all_sunk() for _ in range(100)], number)))
+    results.append(result("find_target", size, number * 10,
+                          measure(lambda: [engine.find_target(target) for _ in range(10)], number)))
+    return results
+
+
+def bench_game(size, ships, seed):
+    """Полная партия компьютер против компьютера"""
+    rng = random.Random(seed)
+    games = max(5, scaled(200, size) // 4)
+    layouts = list(fleet.generate_fleets(2 * games, size, ships, seed=seed))
+    pairs = iter(zip(layouts[::2], layouts[1::2]))
+    started = time.perf_counter()
+    shots = 0
+    for layout in pairs:
+        shots += simulate.play_game(size, layout, rng)[1]
+    seconds = time.perf_counter() - started
+    return [result("full_game", size, games, seconds, mean_shots_to_win=shots / games)]
+
+
+def _headless_view(size):
+    """Объект BattleshipGame без окна: только то, что нужно для отрисовки"""
+    # tkinter нужен только ради класса игры; дисплей при этом не требуется
+    from .main import BattleshipGame
+
+    game = BattleshipGame.__new__(BattleshipGame)
+    game.board_size = size
+    game.colors = {
+        "water": "#4a86e8", "ship": "#5b5b5b", "hit": "#e74c3c",
+        "miss": "#3498db", "grid": "#2c3e50", "bg": "#ecf0f1", "text": "#2c3e50"
+    }
+    game.board_views = {}
+    return game
+
+
+def bench_draw(size, ships, rng):
+    """draw_board: первая отрисовка и обновление после одного выстрела"""
+    results = []
+    board = engine.Board(size)
+    fleet.place_random_fleet(board, ships, rng)
+    game = _headless_view(size)
+
+    def full_draw():
+        canvas = RecordingCanvas()
+        game.build_board_canvas(canvas)
+        game.draw_board(canvas, board, True)
+        return canvas
+
+    number = scaled(100, size)
+    seconds = measure(full_draw, number)
+    canvas = full_draw()
+    results.append(result("draw_board_full", size, number, seconds,
+                          tk_calls=dict(canvas.calls), canvas_items=len(canvas.items)))
+
+    cells = [(row, col) for row in range(size) for col in range(size)]
+    rng.shuffle(cells)
+    canvas.calls.clear()
+    started = time.perf_counter()
+    for row, col in cells:
+        board.fire(row, col)
+        game.draw_board(canvas, board, True)
+    seconds = time.perf_counter() - started
+    per_shot = {name: count / len(cells) for name, count in canvas.calls.items()}
+    results.append(result("draw_board_shot", size, len(cells), seconds, tk_calls_per_op=per_shot))
+    return results
+
+
+def bench_large(size, seed, draw=True):
+    """Большое поле: расстановка по квадратам, выстрелы и отрисовка видимой части"""
+    results = []
+    rng = random.Random(seed)
+    ships = engine.DEFAULT_SHIPS
+
+    started = time.perf_counter()
+    board = engine.new_board(size)
+    fleets = fleet.place_tiled_fleet(board, ships, rng)
+    results.append(result("place_tiled_fleet", size, 1, time.perf_counter() - started,
+                          ships=fleets * len(ships)))
+
+    # Одинаковое число выстрелов на любом размере: стоимость выстрела не должна расти с доской
+    cells = [(rng.randrange(size), rng.randrange(size)) for _ in range(20000)]
+    started = time.perf_counter()
+    for row, col in cells:
+        board.fire(row, col)
+    results.append(result("fire", size, len(cells), time.perf_counter() - started))
+
+    number = 200
+    results.append(result("find_target", size, number,
+                          measure(lambda: engine.find_target(board), number)))
+    if not draw:
+        return results
+
+    game = _headless_view(size)
+    canvas = RecordingCanvas()
+    game.build_board_canvas(canvas)
+    started = time.perf_counter()
+    game.draw_board(canvas, board, True)
+    results.append(result("draw_board_full", size, 1, time.perf_counter() - started,
+                          tk_calls=dict(canvas.calls), canvas_items=len(canvas.items)))
+
+    visible = [(rng.randrange(20), rng.randrange(20)) for _ in range(200)]
+    canvas.calls.clear()
+    started = time.perf_counter()
+    for row, col in visible:
+        board.fire(row, col)
+        game.draw_board(canvas, board, True)
+    seconds = time.perf_counter() - started
+    per_shot = {name: count / len(visible) for name, count in canvas.calls.items()}
+    results.append(result("draw_board_shot", size, len(visible), seconds, tk_calls_per_op=per_shot))
+
+    # Прокрутка на экран вниз: перестраивается только видимая часть
+    canvas.calls.clear()
+    canvas.y += 400
+    started = time.perf_counter()
+    game.draw_board(canvas, board, True)
+    results.append(result("draw_board_scroll", size, 1, time.perf_counter() - started,
+                          tk_calls=dict(canvas.calls), canvas_items=len(canvas.items)))
+    return results
+
+
+# Запуск подкоманды с выводом загруженных модулей последней строкой
+_STARTUP_SCRIPT = """
+import runpy, sys
+sys.argv = ["sea_battle", sys.argv[1], "--help"]
+try:
+    runpy.run_module("sea_battle", run_name="__main__")
+except SystemExit:
+    pass
+print(" ".join(sys.modules))
+"""
+
+
+def bench_startup(command, repeat=3):
+    """Холодный запуск подкоманды без окна: python -m sea_battle <command> --help"""
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_dir, os.environ.get("PYTHONPATH")])))
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, command], env=env,
+                                   capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    lines = completed.stdout.strip().splitlines()
+    modules = set(lines[-1].split()) if lines else set()
+    return result(f"startup_{command}", 0, 1, best, exit_code=completed.returncode, modules=len(modules),
+                  imports_tkinter="tkinter" in modules, imports_numpy="numpy" in modules)
+
+
+def run(sizes=DEFAULT_SIZES, seed=0, draw=True, large_sizes=LARGE_SIZES, startup=STARTUP_COMMANDS):
+    """Прогон всех замеров; возвращает словарь для записи в JSON"""
+    results = []
+    for size in sizes:
+        ships = fleet_for(size)
+        rng = random.Random(seed)
+        results.extend(bench_engine(size, ships, rng))
+        results.extend(bench_game(size, ships, seed))
+        if draw:
+            results.extend(bench_draw(size, ships, rng))
+    for size in large_sizes:
+        results.extend(bench_large(size, seed, draw))
+    for command in startup:
+        results.append(bench_startup(command))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """Замеры, которые стали медленнее порога по сравнению со старым прогоном"""
+    before = {(entry["name"], entry["board_size"]): entry["us_per_op"] for entry in old["results"]}
+    regressions = []
+    for entry in new["results"]:
+        key = (entry["name"], entry["board_size"])
+        if key in before and before[key] > 0 and entry["us_per_op"] > before[key] * threshold:
+            regressions.append({
+                "name": entry["name"],
+                "board_size": entry["board_size"],
+                "before_us": before[key],
+                "after_us": entry["us_per_op"],
+                "ratio": entry["us_per_op"] / before[key],
+            })
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры горячих путей «Морского боя»")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="размеры досок")
+    parser.add_argument("--large-sizes", type=int, nargs="*", default=list(LARGE_SIZES),
+                        help="размеры большого поля")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора")
+    parser.add_argument("--no-draw", action="store_true", help="не замерять отрисовку")
+    parser.add_argument("--no-startup", action="store_true", help="не замерять запуск подкоманд")
+    parser.add_argument("--output", help="файл для результатов (по умолчанию вывод в консоль)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для поиска регрессий")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="во сколько раз замедление считается регрессией")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args.sizes, args.seed, draw=not args.no_draw, large_sizes=args.large_sizes,
+                 startup=() if args.no_startup else STARTUP_COMMANDS)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            report["regressions"] = compare(json.load(f), report, args.threshold)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    for entry in report["results"]:
+        print(f"{entry['name']:>22} {entry['board_size']:>4}: {entry['us_per_op']:10.2f} мкс/оп",
+              file=sys.stderr)
+    if report.get("regressions"):
+        print(f"Регрессии: {len(report['regressions'])}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Точный расчет эндшпиля: перебор всех расстановок оставшихся кораблей.
+
+Когда живых кораблей мало, все их расстановки, согласные с наблюдениями,
+можно перечислить. Корабли не заходят в закрытые клетки (промахи,
+потопленные корабли и их окрестность), не касаются друг друга, вместе
+накрывают все раненые клетки, и ни один живой корабль не ранен целиком.
+Для каждой клетки считается, в скольких расстановках она занята;
+выстрел по необстрелянной клетке с наибольшим счетом попадает с
+наибольшей вероятностью.
+
+Перебор — поиск в глубину по битовым маскам (бит row * size + col, как
+в engine). Подзадача «оставшиеся корабли, занятая зона, непокрытые
+раненые клетки» запоминается, поэтому перестановки одинаковых кораблей
+и разные пути к одной позиции считаются один раз. Счетчики всех клеток
+упакованы в одно большое целое по FIELD бит на клетку: сложение
+распределений подзадач — одно сложение целых.
+"""
+import functools
+import time
+
+from . import engine
+
+# Оценка числа расстановок, ниже которой включается точный расчет; 0 — расчет выключен.
+# Для массовых прогонов (турнир, замеры) выключен: выигрыш (около 0.2 выстрела на
+# партию) меньше доверительного интервала турнира, а p99 хода вырастает с 0.5 мс до 5–20 мс
+THRESHOLD = 0
+
+# Порог для компьютера в окне игры: ход считается в фоне во время паузы перед ним,
+# а p99 хода при таком пороге около 10 мс, вдвое меньше BUDGET_MS
+INTERACTIVE_THRESHOLD = 50_000
+
+# Предел времени хода с точным расчетом (оценка, перебор и запасной расчет), мс;
+# при превышении ход считается обычной стратегией
+BUDGET_MS = 20
+
+# Бит на счетчик клетки в упакованном распределении
+FIELD = 64
+
+# Как часто сверяться с часами: раз в столько узлов перебора
+CLOCK_EVERY = 16
+
+
+class _Timeout(Exception):
+    """Исчерпан предел времени расчета"""
+
+
+@functools.lru_cache(maxsize=None)
+def _placements(board_size, length):
+    """Положения корабля длины length: (клетки, окрестность, счетчики клеток в упакованном виде)"""
+    orientations = engine.ORIENTATIONS[:1] if length == 1 else engine.ORIENTATIONS
+    placements = []
+    for orientation in orientations:
+        for placement in engine.placement_index(board_size, length, orientation).placements:
+            unit = 0
+            for row, col in engine.iter_cells(placement.cells, board_size):
+                unit |= 1 << ((row * board_size + col) * FIELD)
+            placements.append((placement.cells, placement.halo, unit))
+    return tuple(placements)
+
+
+def _open_placements(board_size, length, blocked, wounded):
+    """Положения, не задевающие закрытых клеток и не состоящие целиком из раненых"""
+    return [p for p in _placements(board_size, length)
+            if not p[0] & blocked and p[0] & ~wounded]
+
+
+def _placement_count(board_size, length, cells):
+    """Число положений корабля длины length целиком внутри маски cells"""
+    count = 0
+    orientations = engine.ORIENTATIONS[:1] if length == 1 else engine.ORIENTATIONS
+    for orientation in orientations:
+        step = 1 if orientation == engine.HORIZONTAL else board_size
+        fits = cells
+        for i in range(1, length):
+            fits &= cells >> (i * step)
+        count += bin(fits & engine.placement_index(board_size, length, orientation).anchors).count("1")
+    return count
+
+
+def estimate(board_size, blocked, wounded, lengths, limit=THRESHOLD):
+    """Верхняя оценка числа расстановок (произведение числа положений); больше limit — limit + 1"""
+    open_cells = engine.board_masks(board_size)[0] & ~blocked
+    total = 1
+    for length in lengths:
+        # Положения целиком из раненых клеток лежат внутри открытых и не годятся
+        total *= (_placement_count(board_size, length, open_cells)
+                  - _placement_count(board_size, length, wounded & open_cells))
+        if total > limit:
+            return limit + 1
+    return total
+
+
+def solve(board_size, blocked, wounded, lengths, budget_ms=BUDGET_MS, deadline=None):
+    """Число расстановок и счетчики занятости клеток (список по row * size + col).
+
+    blocked — маска клеток, где живых кораблей быть не может, wounded —
+    маска попаданий по непотопленным кораблям, lengths — длины живых
+    кораблей. Возвращает None, если расчет не уложился в budget_ms или,
+    если задан deadline, не закончился к этому моменту time.perf_counter().
+    Одинаковые корабли различаются, поэтому число расстановок больше
+    числа различных раскладок в произведение факториалов числа
+    одинаковых кораблей; на доли клеток это не влияет. Счетчики точны,
+    пока число расстановок меньше 2 ** FIELD.
+    """
+    if deadline is None:
+        deadline = time.perf_counter() + budget_ms / 1000
+    lengths = tuple(sorted(lengths, reverse=True))
+    tables = [_open_placements(board_size, length, blocked, wounded) for length in lengths]
+    needed = [sum(lengths[index:]) for index in range(len(lengths) + 1)]
+    memo = {}
+    nodes = [0]
+
+    def search(index, forbidden, left):
+        if index == len(lengths):
+            return (0, 0) if left else (1, 0)
+        # Непокрытая раненая клетка рядом с уже поставленным кораблем — тупик
+        if left & forbidden or bin(left).count("1") > needed[index]:
+            return 0, 0
+        key = (index, forbidden, left)
+        if key in memo:
+            return memo[key]
+        nodes[0] += 1
+        if nodes[0] % CLOCK_EVERY == 0 and time.perf_counter() > deadline:
+            raise _Timeout
+
+        count = coverage = 0
+        for cells, halo, unit in tables[index]:
+            if cells & forbidden:
+                continue
+            sub_count, sub_coverage = search(index + 1, forbidden | halo, left & ~cells)
+            if sub_count:
+                count += sub_count
+                coverage += sub_coverage + sub_count * unit
+        memo[key] = count, coverage
+        return count, coverage
+
+    try:
+        count, coverage = search(0, 0, wounded)
+    except _Timeout:
+        return None
+    field = (1 << FIELD) - 1
+    return count, [(coverage >> (index * FIELD)) & field for index in range(board_size * board_size)]
+
+
+def best_cells(board_size, coverage, unshot):
+    """Необстрелянные клетки (row, col) с наибольшим счетом занятости"""
+    cells = [(row, col) for row, col in engine.iter_cells(unshot, board_size)]
+    best = max((coverage[row * board_size + col] for row, col in cells), default=0)
+    if not best:
+        return []
+    return [(row, col) for row, col in cells if coverage[row * board_size + col] == best]
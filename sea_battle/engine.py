@@ -0,0 +1,611 @@
+"""Игровой движок «Морского боя» без зависимости от tkinter.
+
+Каждая доска хранится как три целочисленные битовые маски (корабли,
+попадания, промахи). Клетке (row, col) соответствует бит
+row * size + col, поэтому проверки правил сводятся к нескольким
+побитовым операциям вместо двойных циклов по спискам строк.
+"""
+import functools
+import random
+from array import array
+from collections import namedtuple
+
+HORIZONTAL = "horizontal"
+VERTICAL = "vertical"
+ORIENTATIONS = (HORIZONTAL, VERTICAL)
+
+# Стандартный флот: размеры кораблей
+DEFAULT_SHIPS = (4, 3, 3, 2, 2, 2, 1, 1, 1, 1)
+
+# Обозначения клеток, которые использует интерфейс
+WATER = "~"
+SHIP = "S"
+HIT = "X"
+MISS = "O"
+
+# Порядок обхода соседей при добивании раненого корабля
+DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+# Размер доски, начиная с которого используется разреженная доска SparseBoard
+LARGE_BOARD = 100
+
+
+# Положение корабля: клетки и окрестность, в которой не должно быть других кораблей
+Placement = namedtuple("Placement", "row col length orientation cells halo")
+
+
+@functools.lru_cache(maxsize=None)
+def board_masks(size):
+    """Маски доски: все клетки и клетки без первого и последнего столбцов"""
+    full = (1 << size * size) - 1
+    first_col = 0
+    for row in range(size):
+        first_col |= 1 << (row * size)
+    last_col = first_col << (size - 1)
+    return full, full & ~first_col, full & ~last_col
+
+
+class PlacementIndex:
+    """Все положения корабля одной длины и ориентации на доске заданного размера"""
+
+    def __init__(self, board_size, length, orientation):
+        board = Board(board_size)
+        placements = []
+        if orientation == HORIZONTAL:
+            anchors = [(row, col) for row in range(board_size) for col in range(board_size - length + 1)]
+        else:
+            anchors = [(row, col) for row in range(board_size - length + 1) for col in range(board_size)]
+        for row, col in anchors:
+            if orientation == HORIZONTAL:
+                cells = ((1 << length) - 1) << (row * board_size + col)
+            else:
+                cells = 0
+                for i in range(length):
+                    cells |= 1 << ((row + i) * board_size + col)
+            placements.append(Placement(row, col, length, orientation, cells, board.halo(cells)))
+        self.placements = tuple(placements)
+        self.by_anchor = {(p.row, p.col): p for p in placements}
+        # Маска всех начальных клеток (верхняя левая клетка корабля)
+        self.anchors = 0
+        for p in placements:
+            self.anchors |= 1 << (p.row * board_size + p.col)
+
+    def legal(self, ships):
+        """Положения, не задевающие уже стоящие корабли"""
+        return [p for p in self.placements if not p.halo & ships]
+
+
+@functools.lru_cache(maxsize=None)
+def placement_index(board_size, length, orientation):
+    """Индекс положений; строится при первом обращении и общий для всех партий"""
+    return PlacementIndex(board_size, length, orientation)
+
+
+class UnshotPool:
+    """Необстрелянные клетки доски: случайная клетка и удаление за O(1).
+
+    Клетки каждого цвета шахматной раскраски ((row + col) % 2) лежат в своем
+    массиве, а позиция клетки в массиве хранится в индексе; удаление
+    переставляет последнюю клетку массива на место удаленной. Отдельные
+    массивы цветов позволяют искать корабли через клетку.
+    """
+
+    def __init__(self, size, shots=0):
+        self.size = size
+        self.cells = (array("l"), array("l"))
+        self.position = array("l", [-1]) * (size * size)
+        # Биты маски строкой, от младшего: один проход вместо сдвига маски для каждой клетки
+        bits = bin(shots)[:1:-1]
+        for index in range(size * size):
+            if index >= len(bits) or bits[index] == "0":
+                self.add(index)
+
+    def parity(self, index):
+        row, col = divmod(index, self.size)
+        return (row + col) & 1
+
+    def __len__(self):
+        return len(self.cells[0]) + len(self.cells[1])
+
+    def add(self, index):
+        cells = self.cells[self.parity(index)]
+        self.position[index] = len(cells)
+        cells.append(index)
+
+    def discard(self, index):
+        """Удаление клетки, если она еще в пуле"""
+        position = self.position[index]
+        if position < 0:
+            return
+        cells = self.cells[self.parity(index)]
+        last = cells.pop()
+        if last != index:
+            cells[position] = last
+            self.position[last] = position
+        self.position[index] = -1
+
+    def sample(self, rng=random, parity=None):
+        """Индекс случайной клетки (только цвета parity, если он задан) или None, если клеток нет"""
+        if parity is None:
+            first, second = self.cells
+            count = len(first) + len(second)
+            if not count:
+                return None
+            position = int(rng.random() * count)
+            return first[position] if position < len(first) else second[position - len(first)]
+        cells = self.cells[parity]
+        return cells[int(rng.random() * len(cells))] if cells else None
+
+
+class Board:
+    """Доска одного игрока: его корабли и выстрелы противника по ним"""
+
+    def __init__(self, size):
+        self.size = size
+        # Маски столбцов, чтобы сдвиг на одну клетку не переносился на соседнюю строку
+        self.full, self.not_first_col, self.not_last_col = board_masks(size)
+
+        self.ships = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Реестр флота: номер корабля по индексу клетки, маски кораблей
+        # и число непораженных клеток каждого корабля и всего флота
+        self.ship_at = {}
+        self.fleet = []
+        self.ship_remaining = []
+        self.remaining = 0
+        # Клетки, изменившиеся с последней отрисовки
+        self.dirty = 0
+        # Необстрелянные клетки для случайного выстрела; строится при первом обращении
+        self.pool = None
+
+    def bit(self, row, col):
+        """Бит клетки (row, col)"""
+        return 1 << (row * self.size + col)
+
+    def in_bounds(self, row, col):
+        """Проверка, что клетка лежит на доске"""
+        return 0 <= row < self.size and 0 <= col < self.size
+
+    def placement(self, row, col, length, orientation):
+        """Положение корабля из индекса или None, если он не помещается на доске"""
+        return placement_index(self.size, length, orientation).by_anchor.get((row, col))
+
+    def ship_mask(self, row, col, length, orientation):
+        """Маска клеток корабля или 0, если он не помещается на доске"""
+        placement = self.placement(row, col, length, orientation)
+        return placement.cells if placement else 0
+
+    def shift_cross(self, mask):
+        """Клетки маски вместе с соседями по горизонтали и вертикали"""
+        result = mask | ((mask << 1) & self.not_first_col) | ((mask >> 1) & self.not_last_col)
+        result |= (mask << self.size) | (mask >> self.size)
+        return result & self.full
+
+    def halo(self, mask):
+        """Клетки маски вместе со всеми соседями, включая диагональные"""
+        result = mask | ((mask << 1) & self.not_first_col) | ((mask >> 1) & self.not_last_col)
+        result |= (result << self.size) | (result >> self.size)
+        return result & self.full
+
+    @property
+    def shots(self):
+        """Маска клеток, в которые уже стреляли"""
+        return self.hits | self.misses
+
+    @property
+    def unshot(self):
+        """Маска клеток, в которые еще не стреляли"""
+        return self.full & ~(self.hits | self.misses)
+
+    def can_place_ship(self, row, col, length, orientation):
+        """Проверка, можно ли разместить корабль в указанной позиции"""
+        placement = self.placement(row, col, length, orientation)
+        return placement is not None and not (placement.halo & self.ships)
+
+    def legal_placements(self, length, orientation=None):
+        """Все допустимые положения корабля с учетом уже стоящих кораблей"""
+        orientations = ORIENTATIONS if orientation is None else (orientation,)
+        if length == 1:
+            # Однопалубный корабль в обеих ориентациях занимает одни и те же клетки
+            orientations = orientations[:1]
+        legal = []
+        for item in orientations:
+            legal.extend(placement_index(self.size, length, item).legal(self.ships))
+        return legal
+
+    def conflicting_anchors(self, cells, length, orientation):
+        """Маска начальных клеток положений, которые задевают клетки cells или их соседей"""
+        zone = self.halo(cells)
+        step = 1 if orientation == HORIZONTAL else self.size
+        mask = 0
+        for i in range(length):
+            mask |= zone >> (i * step)
+        return mask & placement_index(self.size, length, orientation).anchors
+
+    def allowed_anchors(self, length, orientation):
+        """Маска начальных клеток, от которых корабль можно поставить"""
+        anchors = placement_index(self.size, length, orientation).anchors
+        return anchors & ~self.conflicting_anchors(self.ships, length, orientation)
+
+    def place_ship(self, row, col, length, orientation):
+        """Размещение корабля; возвращает False, если позиция недопустима"""
+        placement = self.placement(row, col, length, orientation)
+        if placement is None or placement.halo & self.ships:
+            return False
+        self.ships |= placement.cells
+        self.dirty |= placement.cells
+        self._register(placement.cells)
+        return True
+
+    def set_ships(self, mask):
+        """Замена всей расстановки кораблей; реестр строится заново по связным группам"""
+        self.dirty |= self.ships | mask
+        self.ships = mask
+        self.rebuild_fleet()
+
+    def rebuild_fleet(self):
+        """Построение реестра флота по текущим маскам кораблей и попаданий"""
+        self.ship_at = {}
+        self.fleet = []
+        self.ship_remaining = []
+        self.remaining = 0
+        rest = self.ships
+        while rest:
+            # Корабли не касаются друг друга, поэтому связная группа клеток — один корабль
+            cells = rest & -rest
+            while True:
+                grown = self.shift_cross(cells) & self.ships
+                if grown == cells:
+                    break
+                cells = grown
+            self._register(cells)
+            rest &= ~cells
+
+    def _register(self, cells):
+        """Добавление корабля в реестр"""
+        ship_id = len(self.fleet)
+        self.fleet.append(cells)
+        left = bin(cells & ~self.hits).count("1")
+        self.ship_remaining.append(left)
+        self.remaining += left
+        rest = cells
+        while rest:
+            low = rest & -rest
+            self.ship_at[low.bit_length() - 1] = ship_id
+            rest ^= low
+
+    def ship_anchors(self):
+        """Корабли флота в виде (row, col, length, orientation), от верхней левой клетки"""
+        anchors = []
+        for cells in self.fleet:
+            row, col = divmod((cells & -cells).bit_length() - 1, self.size)
+            length = bin(cells).count("1")
+            # У горизонтального корабля длиннее одной клетки занята и соседняя справа клетка
+            vertical = length > 1 and not cells & (1 << (row * self.size + col + 1))
+            anchors.append((row, col, length, VERTICAL if vertical else HORIZONTAL))
+        return anchors
+
+    def take_dirty(self):
+        """Маска изменившихся клеток; после вызова она сбрасывается"""
+        dirty = self.dirty
+        self.dirty = 0
+        return dirty
+
+    def is_shot(self, row, col):
+        """Проверка, стреляли ли уже в клетку"""
+        return bool(self.shots & self.bit(row, col))
+
+    def fire(self, row, col):
+        """Выстрел по клетке: HIT, MISS или None, если выстрел невозможен"""
+        if not self.in_bounds(row, col):
+            return None
+        bit = self.bit(row, col)
+        if (self.hits | self.misses) & bit:
+            return None
+        self.dirty |= bit
+        if self.pool is not None:
+            self.pool.discard(row * self.size + col)
+        if self.ships & bit:
+            self.hits |= bit
+            self.ship_remaining[self.ship_at[row * self.size + col]] -= 1
+            self.remaining -= 1
+            return HIT
+        self.misses |= bit
+        return MISS
+
+    def mark(self, row, col, hit):
+        """Отметка выстрела с уже известным результатом (доска противника, корабли которой неизвестны)"""
+        bit = self.bit(row, col)
+        if hit:
+            self.hits |= bit
+        else:
+            self.misses |= bit
+        self.dirty |= bit
+        if self.pool is not None:
+            self.pool.discard(row * self.size + col)
+
+    def unshot_pool(self):
+        """Пул необстрелянных клеток; дальше его обновляют fire и mark"""
+        if self.pool is None:
+            self.pool = UnshotPool(self.size, self.hits | self.misses)
+        return self.pool
+
+    def random_unshot(self, rng=random, parity=None):
+        """Случайная необстрелянная клетка (row, col) или None, если таких нет"""
+        index = self.unshot_pool().sample(rng, parity)
+        if index is not None and (self.hits | self.misses) >> index & 1:
+            # Маски выстрелов изменили в обход fire и mark: пул строится заново
+            self.pool = None
+            index = self.unshot_pool().sample(rng, parity)
+        return None if index is None else divmod(index, self.size)
+
+    def ship_id(self, row, col):
+        """Номер корабля в клетке или None"""
+        return self.ship_at.get(row * self.size + col)
+
+    def ship_cells(self, row, col):
+        """Маска корабля, которому принадлежит клетка (0, если корабля нет)"""
+        ship_id = self.ship_id(row, col)
+        return 0 if ship_id is None else self.fleet[ship_id]
+
+    def is_ship_sunk(self, row, col):
+        """Проверка, потоплен ли корабль, которому принадлежит клетка"""
+        ship_id = self.ship_id(row, col)
+        return ship_id is not None and self.ship_remaining[ship_id] == 0
+
+    def sunk_ships(self):
+        """Маски всех потопленных кораблей"""
+        return [cells for cells, left in zip(self.fleet, self.ship_remaining) if not left]
+
+    def afloat_sizes(self):
+        """Размеры кораблей, которые еще на плаву"""
+        return sorted((bin(cells).count("1") for cells, left in zip(self.fleet, self.ship_remaining) if left),
+                      reverse=True)
+
+    def all_sunk(self):
+        """Проверка, все ли корабли потоплены"""
+        return self.remaining == 0
+
+    def cell(self, row, col, reveal_ships=True):
+        """Обозначение клетки для отрисовки"""
+        bit = self.bit(row, col)
+        if self.hits & bit:
+            return HIT
+        if self.misses & bit:
+            return MISS
+        if reveal_ships and self.ships & bit:
+            return SHIP
+        return WATER
+
+    def to_rows(self, reveal_ships=True):
+        """Доска в виде списка строк из обозначений клеток"""
+        return [[self.cell(row, col, reveal_ships) for col in range(self.size)]
+                for row in range(self.size)]
+
+
+class SparseBoard:
+    """Большая доска: корабли и выстрелы хранятся по клеткам, а не масками.
+
+    Битовая маска доски 1000 x 1000 занимает 125 КБ, и каждая операция с
+    ней копирует всю маску. Здесь память растет только с числом кораблей и
+    выстрелов, а выстрел, постановка корабля и проверка потопления стоят
+    O(1) независимо от размера доски. Клетки задаются индексом row * size + col.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = set()
+        self.misses = set()
+
+        # Реестр флота: номер корабля по индексу клетки, клетки кораблей
+        # и число непораженных клеток каждого корабля и всего флота
+        self.ship_at = {}
+        self.fleet = []
+        self.ship_remaining = []
+        self.remaining = 0
+        # Попадания в порядке выстрелов; до target_start у всех соседи уже обстреляны
+        self.targets = []
+        self.target_start = 0
+        # Клетки, изменившиеся с последней отрисовки
+        self.dirty = set()
+
+    def in_bounds(self, row, col):
+        """Проверка, что клетка лежит на доске"""
+        return 0 <= row < self.size and 0 <= col < self.size
+
+    def ship_indices(self, row, col, length, orientation):
+        """Индексы клеток корабля или None, если он не помещается на доске"""
+        if orientation == HORIZONTAL:
+            if not (0 <= row < self.size and 0 <= col and col + length <= self.size):
+                return None
+            start = row * self.size + col
+            return range(start, start + length)
+        if not (0 <= col < self.size and 0 <= row and row + length <= self.size):
+            return None
+        start = row * self.size + col
+        return range(start, start + length * self.size, self.size)
+
+    def can_place_ship(self, row, col, length, orientation):
+        """Проверка, можно ли разместить корабль в указанной позиции"""
+        if self.ship_indices(row, col, length, orientation) is None:
+            return False
+        if orientation == HORIZONTAL:
+            rows, cols = (row,), (col, col + length - 1)
+        else:
+            rows, cols = (row, row + length - 1), (col,)
+        # Прямоугольник корабля вместе с соседними клетками
+        size = self.size
+        for r in range(max(0, rows[0] - 1), min(size, rows[-1] + 2)):
+            for c in range(max(0, cols[0] - 1), min(size, cols[-1] + 2)):
+                if r * size + c in self.ship_at:
+                    return False
+        return True
+
+    def place_ship(self, row, col, length, orientation):
+        """Размещение корабля; возвращает False, если позиция недопустима"""
+        if not self.can_place_ship(row, col, length, orientation):
+            return False
+        cells = tuple(self.ship_indices(row, col, length, orientation))
+        ship_id = len(self.fleet)
+        self.fleet.append(cells)
+        left = sum(1 for index in cells if index not in self.hits)
+        self.ship_remaining.append(left)
+        self.remaining += left
+        for index in cells:
+            self.ship_at[index] = ship_id
+        self.dirty.update(cells)
+        return True
+
+    def ship_anchors(self):
+        """Корабли флота в виде (row, col, length, orientation), от верхней левой клетки"""
+        anchors = []
+        for cells in self.fleet:
+            row, col = divmod(cells[0], self.size)
+            vertical = len(cells) > 1 and cells[1] - cells[0] == self.size
+            anchors.append((row, col, len(cells), VERTICAL if vertical else HORIZONTAL))
+        return anchors
+
+    def take_dirty(self):
+        """Индексы изменившихся клеток; после вызова набор сбрасывается"""
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def is_shot(self, row, col):
+        """Проверка, стреляли ли уже в клетку"""
+        index = row * self.size + col
+        return index in self.hits or index in self.misses
+
+    def fire(self, row, col):
+        """Выстрел по клетке: HIT, MISS или None, если выстрел невозможен"""
+        if not self.in_bounds(row, col) or self.is_shot(row, col):
+            return None
+        index = row * self.size + col
+        self.dirty.add(index)
+        ship_id = self.ship_at.get(index)
+        if ship_id is not None:
+            self.hits.add(index)
+            self.targets.append(index)
+            self.ship_remaining[ship_id] -= 1
+            self.remaining -= 1
+            return HIT
+        self.misses.add(index)
+        return MISS
+
+    def mark(self, row, col, hit):
+        """Отметка выстрела с уже известным результатом (доска противника, корабли которой неизвестны)"""
+        index = row * self.size + col
+        if hit:
+            self.hits.add(index)
+            self.targets.append(index)
+        else:
+            self.misses.add(index)
+        self.dirty.add(index)
+
+    def random_unshot(self, rng=random, parity=None, attempts=64):
+        """Случайная необстрелянная клетка (row, col) или None, если таких нет.
+
+        Пул всех клеток большой доски занял бы мегабайты, а обстреляна
+        обычно ничтожная доля клеток, поэтому клетка выбирается с
+        отклонением; если попытки кончились, клетки перебираются по порядку.
+        """
+        size = self.size
+        for _ in range(attempts):
+            row = int(rng.random() * size)
+            col = int(rng.random() * size)
+            if (parity is None or (row + col) & 1 == parity) and not self.is_shot(row, col):
+                return row, col
+        for index in range(size * size):
+            row, col = divmod(index, size)
+            if (parity is None or (row + col) & 1 == parity) and not self.is_shot(row, col):
+                return row, col
+        return None
+
+    def find_target(self):
+        """Непростреленный сосед самого раннего попадания, у которого такие соседи остались"""
+        for position in range(self.target_start, len(self.targets)):
+            row, col = divmod(self.targets[position], self.size)
+            for dr, dc in DIRECTIONS:
+                new_row, new_col = row + dr, col + dc
+                if self.in_bounds(new_row, new_col) and not self.is_shot(new_row, new_col):
+                    # Выстрелы только добавляются, поэтому пройденные попадания больше не понадобятся
+                    self.target_start = position
+                    return new_row, new_col
+        self.target_start = len(self.targets)
+        return None
+
+    def ship_id(self, row, col):
+        """Номер корабля в клетке или None"""
+        return self.ship_at.get(row * self.size + col)
+
+    def is_ship_sunk(self, row, col):
+        """Проверка, потоплен ли корабль, которому принадлежит клетка"""
+        ship_id = self.ship_id(row, col)
+        return ship_id is not None and self.ship_remaining[ship_id] == 0
+
+    def all_sunk(self):
+        """Проверка, все ли корабли потоплены"""
+        return self.remaining == 0
+
+    def cell(self, row, col, reveal_ships=True):
+        """Обозначение клетки для отрисовки"""
+        index = row * self.size + col
+        if index in self.hits:
+            return HIT
+        if index in self.misses:
+            return MISS
+        if reveal_ships and index in self.ship_at:
+            return SHIP
+        return WATER
+
+
+def new_board(size):
+    """Пустая доска: битовая для обычных размеров, разреженная для больших"""
+    return SparseBoard(size) if size >= LARGE_BOARD else Board(size)
+
+
+def iter_cells(mask, size):
+    """Перебор клеток (row, col) маски в порядке возрастания индекса"""
+    while mask:
+        low = mask & -mask
+        yield divmod(low.bit_length() - 1, size)
+        mask ^= low
+
+
+def find_target(board):
+    """Поиск цели для добивания: непростреленный сосед любого попадания"""
+    if isinstance(board, SparseBoard):
+        return board.find_target()
+    if not (board.shift_cross(board.hits) & board.unshot):
+        return None
+    for row, col in iter_cells(board.hits, board.size):
+        for dr, dc in DIRECTIONS:
+            new_row, new_col = row + dr, col + dc
+            if board.in_bounds(new_row, new_col) and not board.is_shot(new_row, new_col):
+                return new_row, new_col
+    return None
+
+
+def random_shot(board, rng=random, parity=None):
+    """Случайный выстрел по клетке, в которую еще не стреляли.
+
+    parity — искать только среди клеток с (row + col) % 2 == parity, пока
+    они есть. Если необстрелянных клеток не осталось совсем, возвращается
+    любая клетка.
+    """
+    cell = board.random_unshot(rng, parity)
+    if cell is None and parity is not None:
+        cell = board.random_unshot(rng)
+    if cell is None:
+        return int(rng.random() * board.size), int(rng.random() * board.size)
+    return cell
+
+
+def choose_shot(board, rng=random, parity=None):
+    """Выбор выстрела компьютера: сначала добивание, затем случайная клетка"""
+    target = find_target(board)
+    if target:
+        return target
+    return random_shot(board, rng, parity)
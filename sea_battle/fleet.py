@@ -0,0 +1,384 @@
+"""Генератор случайной расстановки флота.
+
+Основной способ — выборка с отклонением: каждый корабль ставится в
+равновероятно выбранное положение из всех возможных, и при любом касании
+расстановка начинается заново. Принятые расстановки распределены строго
+равномерно среди всех допустимых. Если за отведенное число попыток
+расстановка не найдена (тесная доска), используется перебор с возвратом,
+который находит расстановку, если она существует и перебор укладывается
+в SOLVER_NODES узлов. Его расстановки не строго равномерны: положения
+каждого корабля перебираются в случайном порядке, но расстановки с
+меньшим числом продолжений выпадают чаще.
+
+При наличии NumPy попытки проверяются пачками: занятые клетки каждой
+попытки хранятся словами битовой маски, и новый корабль сверяется со
+всеми уже поставленными одним И с его окрестностью. Так выбирается и
+одна расстановка для игры, и тысячи расстановок для симуляций.
+
+fleet_fits решает, помещается ли флот вообще: детерминированный перебор
+с отсечением по площади, запоминанием тупиковых состояний и перебором
+положений первого корабля только с точностью до симметрий доски. Ответы
+запоминаются, а число узлов перебора ограничено.
+"""
+import functools
+import random
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy массовая генерация идет по одной расстановке
+    np = None
+
+from . import engine
+
+# Число попыток, проверяемых за один проход векторной выборки
+BATCH_ATTEMPTS = 20000
+# То же для одной расстановки: пачка поменьше, чтобы не тратить время после первой удачи
+SINGLE_ATTEMPTS = 2048
+
+# Большая доска делится на квадраты TILE x TILE, разделенные пустой полосой;
+# в каждый ставится расстановка из пула TILE_POOL случайных расстановок
+TILE = 10
+TILE_POOL = 32
+
+# Предел числа узлов перебора в fleet_fits
+SOLVER_NODES = 100_000
+
+
+class FleetInfeasibleError(ValueError):
+    """Флот невозможно разместить на доске без касаний"""
+
+
+class FleetSearchLimitError(FleetInfeasibleError):
+    """Перебор исчерпал предел узлов, так и не найдя расстановку (она может существовать)"""
+
+
+@functools.lru_cache(maxsize=None)
+def _ship_placements(board_size, length):
+    """Все положения корабля длины length в обеих ориентациях"""
+    orientations = engine.ORIENTATIONS[:1] if length == 1 else engine.ORIENTATIONS
+    placements = []
+    for orientation in orientations:
+        placements.extend(engine.placement_index(board_size, length, orientation).placements)
+    return tuple(placements)
+
+
+@functools.lru_cache(maxsize=None)
+def _placement_words(board_size, length):
+    """Клетки и окрестности всех положений корабля по словам маски: два списка массивов uint64"""
+    words = -(-board_size * board_size // 64)
+    placements = _ship_placements(board_size, length)
+    masks = np.array([[placement.cells, placement.halo] for placement in placements], dtype=object)
+    # Маски всех положений разбиваются на слова по 64 бита одним сдвигом массива
+    split = ((masks[:, :, None] >> (np.arange(words, dtype=object) * 64)) & ((1 << 64) - 1)).astype(np.uint64)
+    return ([np.ascontiguousarray(split[:, 0, word]) for word in range(words)],
+            [np.ascontiguousarray(split[:, 1, word]) for word in range(words)])
+
+
+def area_bound_allows(board_size, ships):
+    """Быстрая необходимая проверка по площади.
+
+    Корабль длины L вместе с полосой соседних клеток справа и снизу занимает
+    прямоугольник 2 x (L + 1); такие прямоугольники разных кораблей не
+    пересекаются и помещаются в квадрат (board_size + 1) x (board_size + 1).
+    """
+    if any(length > board_size for length in ships):
+        return False
+    return sum(2 * (length + 1) for length in ships) <= (board_size + 1) ** 2
+
+
+def block_bound_allows(board_size, ships):
+    """Необходимая проверка по квадратам 2 x 2.
+
+    Любые две клетки квадрата 2 x 2 соседние, поэтому в одном квадрате
+    бывают клетки только одного корабля. Разбиение доски на такие квадраты
+    (крайние могут быть неполными) дает ceil(n / 2) ** 2 квадратов, а корабль
+    длины L задевает не меньше ceil(L / 2) из них.
+    """
+    blocks = (board_size + 1) // 2
+    return sum((length + 1) // 2 for length in ships) <= blocks * blocks
+
+
+def _symmetries(board_size):
+    """Восемь преобразований квадрата (повороты и отражения) как функции клетки"""
+    last = board_size - 1
+    return (
+        lambda r, c: (r, c), lambda r, c: (c, last - r), lambda r, c: (last - r, last - c),
+        lambda r, c: (last - c, r), lambda r, c: (r, last - c), lambda r, c: (last - r, c),
+        lambda r, c: (c, r), lambda r, c: (last - c, last - r),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _canonical_placements(board_size, length):
+    """Положения корабля, по одному из каждого класса симметричных положений"""
+    transforms = _symmetries(board_size)
+    canonical = []
+    for placement in _ship_placements(board_size, length):
+        cells = list(engine.iter_cells(placement.cells, board_size))
+        key = tuple(cells)
+        if all(tuple(sorted(transform(r, c) for r, c in cells)) >= key for transform in transforms):
+            canonical.append(placement)
+    return tuple(canonical)
+
+
+class _Budget(Exception):
+    """Исчерпан предел узлов перебора"""
+
+
+@functools.lru_cache(maxsize=4096)
+def _fits(board_size, lengths, limit):
+    if not lengths:
+        return True
+    if not area_bound_allows(board_size, lengths) or not block_bound_allows(board_size, lengths):
+        return False
+
+    tables = [_ship_placements(board_size, length) for length in lengths]
+    # Если решение есть, его образ при симметрии доски — тоже решение,
+    # поэтому первый корабль достаточно ставить в неэквивалентные положения
+    tables[0] = _canonical_placements(board_size, lengths[0])
+    full = engine.board_masks(board_size)[0]
+    needed = [sum(lengths[index:]) for index in range(len(lengths) + 1)]
+    failed = set()
+    nodes = [0]
+
+    def search(index, blocked, first):
+        if index == len(lengths):
+            return True
+        key = (index, blocked, first)
+        if key in failed or bin(full & ~blocked).count("1") < needed[index]:
+            return False
+        nodes[0] += 1
+        if nodes[0] > limit:
+            raise _Budget
+        # Одинаковые корабли ставим в порядке возрастания номера положения
+        same_next = index + 1 < len(lengths) and lengths[index + 1] == lengths[index]
+        placements = tables[index]
+        for position in range(first, len(placements)):
+            placement = placements[position]
+            if placement.cells & blocked:
+                continue
+            # Номера в таблице первого корабля не совпадают с общей, поэтому для него порядок не задаем
+            next_first = position + 1 if same_next and index else 0
+            if search(index + 1, blocked | placement.halo, next_first):
+                return True
+        failed.add(key)
+        return False
+
+    try:
+        return search(0, 0, 0)
+    except _Budget:
+        return None
+
+
+def fleet_fits(board_size, ships, limit=SOLVER_NODES):
+    """Помещается ли флот на доску без касаний: True, False или None, если предел перебора исчерпан.
+
+    На большом поле флот ставится в каждый квадрат TILE x TILE, поэтому
+    проверяется квадрат. Ответы запоминаются по размеру доски и составу флота.
+    """
+    if board_size >= engine.LARGE_BOARD:
+        board_size = TILE
+    if any(length < 1 for length in ships):
+        return False
+    return _fits(board_size, tuple(sorted(ships, reverse=True)), limit)
+
+
+def parse_ships(text):
+    """Флот из строки длин через пробел или запятую, по убыванию; ValueError при ошибке"""
+    ships = sorted((int(part) for part in text.replace(",", " ").split()), reverse=True)
+    if not ships or ships[-1] < 1:
+        raise ValueError("Длины кораблей должны быть положительными")
+    return ships
+
+
+def sample_uniform(board_size, ships, rng=random, attempts=20000):
+    """Равномерная выборка расстановки с отклонением; None, если попытки исчерпаны"""
+    if np is not None:
+        # Пачки попыток на NumPy; генератор пачек берет зерно из rng, поэтому выборка воспроизводима
+        lengths = tuple(sorted(ships, reverse=True))
+        generator = np.random.default_rng(rng.getrandbits(64))
+        for start in range(0, attempts, SINGLE_ATTEMPTS):
+            batch = _sample_batch(board_size, lengths, generator, min(SINGLE_ATTEMPTS, attempts - start))
+            if batch:
+                return batch[0]
+        return None
+    tables = [_ship_placements(board_size, length) for length in sorted(ships, reverse=True)]
+    rand = rng.random
+    for _ in range(attempts):
+        mask = 0
+        for placements in tables:
+            placement = placements[int(rand() * len(placements))]
+            if placement.halo & mask:
+                break
+            mask |= placement.cells
+        else:
+            return mask
+    return None
+
+
+def sample_backtracking(board_size, ships, rng=random, limit=SOLVER_NODES):
+    """Случайный перебор с возвратом: находит расстановку, если она существует.
+
+    Распределение не равномерное: корабль ставится в случайное из еще
+    свободных положений, поэтому расстановки, где первым кораблям мало
+    места, выпадают чаще. Больше limit узлов перебора — FleetSearchLimitError.
+    """
+    lengths = sorted(ships, reverse=True)
+    if not area_bound_allows(board_size, lengths):
+        raise FleetInfeasibleError(f"Флот {lengths} не помещается на доске {board_size}x{board_size}")
+
+    tables = [_ship_placements(board_size, length) for length in lengths]
+    full = engine.board_masks(board_size)[0]
+    # Сколько клеток еще нужно оставшимся кораблям, начиная с каждого индекса
+    needed = [sum(lengths[index:]) for index in range(len(lengths) + 1)]
+    failed = set()
+    nodes = [0]
+
+    def search(index, mask, blocked, first):
+        if index == len(lengths):
+            return mask
+        # Продолжение зависит только от занятой зоны, а не от самих кораблей
+        key = (index, blocked, first)
+        if key in failed or bin(full & ~blocked).count("1") < needed[index]:
+            return None
+        nodes[0] += 1
+        if nodes[0] > limit:
+            raise FleetSearchLimitError(f"Расстановка флота {lengths} на доске {board_size}x{board_size} "
+                                        f"не найдена за {limit} шагов перебора")
+        placements = tables[index]
+        # Одинаковые корабли ставим в порядке возрастания номера положения,
+        # чтобы не перебирать их перестановки
+        same_next = index + 1 < len(lengths) and lengths[index + 1] == lengths[index]
+        order = list(range(first, len(placements)))
+        rng.shuffle(order)
+        for position in order:
+            placement = placements[position]
+            if placement.cells & blocked:
+                continue
+            found = search(index + 1, mask | placement.cells, blocked | placement.halo,
+                           position + 1 if same_next else 0)
+            if found is not None:
+                return found
+        failed.add(key)
+        return None
+
+    mask = search(0, 0, 0, 0)
+    if mask is None:
+        raise FleetInfeasibleError(f"Флот {lengths} не помещается на доске {board_size}x{board_size}")
+    return mask
+
+
+def sample_layout(board_size, ships, rng=random, attempts=20000):
+    """Маска кораблей случайной расстановки; FleetInfeasibleError, если ее нет.
+
+    Обычно расстановка равномерна; если выборка с отклонением не удалась
+    (тесная доска), она берется перебором с возвратом и смещена к
+    расстановкам с малым числом продолжений.
+    """
+    if not area_bound_allows(board_size, ships) or fleet_fits(board_size, ships) is False:
+        raise FleetInfeasibleError(f"Флот {sorted(ships, reverse=True)} не помещается "
+                                   f"на доске {board_size}x{board_size}")
+    mask = sample_uniform(board_size, ships, rng, attempts)
+    if mask is None:
+        mask = sample_backtracking(board_size, ships, rng)
+    return mask
+
+
+def _sample_batch(board_size, lengths, generator, attempts):
+    """Векторная выборка с отклонением: маски всех принятых расстановок из пачки попыток.
+
+    Занятые клетки каждой попытки хранятся словами битовой маски, поэтому
+    новый корабль проверяется одним И с его окрестностью, а не с каждым
+    уже поставленным кораблем.
+    """
+    occupied = None
+    for length in lengths:
+        cells, halo = _placement_words(board_size, length)
+        choice = generator.integers(0, len(cells[0]), size=attempts if occupied is None else len(occupied[0]))
+        if occupied is None:
+            occupied = [word[choice] for word in cells]
+            continue
+        touching = halo[0][choice] & occupied[0]
+        for word, taken in zip(halo[1:], occupied[1:]):
+            touching |= word[choice] & taken
+        fits = touching == 0
+        choice = choice[fits]
+        occupied = [taken[fits] | word[choice] for word, taken in zip(cells, occupied)]
+        if not len(choice):
+            return []
+
+    masks = []
+    for words in zip(*(taken.tolist() for taken in occupied)):
+        mask = 0
+        for index, word in enumerate(words):
+            mask |= word << (64 * index)
+        masks.append(mask)
+    return masks
+
+
+def place_random_fleet(board, ships, rng=random):
+    """Случайная расстановка флота на пустой доске"""
+    board.set_ships(sample_layout(board.size, ships, rng))
+    return board
+
+
+def tile_count(board_size):
+    """Число квадратов расстановки по одной стороне большой доски"""
+    return (board_size + 1) // (TILE + 1)
+
+
+def place_tiled_fleet(board, ships, rng=random):
+    """Расстановка на большой (разреженной) доске: по флоту ships в каждом квадрате.
+
+    Полоса в одну клетку между квадратами гарантирует, что корабли соседних
+    квадратов не касаются, поэтому расстановка находится всегда, если флот
+    помещается в один квадрат. Плотность кораблей та же, что у флота на
+    доске TILE x TILE. Возвращает число расставленных флотов.
+    """
+    pool = []
+    for _ in range(TILE_POOL):
+        tile = engine.Board(TILE)
+        tile.set_ships(sample_layout(TILE, ships, rng))
+        pool.append(tile.ship_anchors())
+
+    step = TILE + 1
+    count = tile_count(board.size)
+    for top in range(0, count * step, step):
+        for left in range(0, count * step, step):
+            for row, col, length, orientation in rng.choice(pool):
+                board.place_ship(top + row, left + col, length, orientation)
+    return count * count
+
+
+def generate_fleet(board_size, ships=engine.DEFAULT_SHIPS, seed=None):
+    """Новая доска со случайной расстановкой флота"""
+    return place_random_fleet(engine.Board(board_size), ships, random.Random(seed))
+
+
+def generate_fleets(count, board_size, ships=engine.DEFAULT_SHIPS, seed=None, uniform=True):
+    """Массовая генерация расстановок (маски кораблей) для симуляций.
+
+    При uniform=False используется только перебор с возвратом: он быстрее
+    на тесных досках и без NumPy, но распределение расстановок не строго
+    равномерное.
+    """
+    rng = random.Random(seed)
+    lengths = tuple(sorted(ships, reverse=True))
+    if not area_bound_allows(board_size, lengths):
+        raise FleetInfeasibleError(f"Флот {list(lengths)} не помещается "
+                                   f"на доске {board_size}x{board_size}")
+    if not uniform:
+        for _ in range(count):
+            yield sample_backtracking(board_size, lengths, rng)
+        return
+
+    generator = np.random.default_rng(seed) if np is not None else None
+    produced = 0
+    while produced < count:
+        batch = _sample_batch(board_size, lengths, generator, BATCH_ATTEMPTS) if generator else []
+        if not batch:
+            # Пачка пуста (нет NumPy или доска слишком тесная): одна расстановка обычным путем
+            batch = [sample_layout(board_size, lengths, rng)]
+        for mask in batch[:count - produced]:
+            yield mask
+        produced += len(batch)
@@ -0,0 +1,84 @@
+"""Частоты расстановки кораблей игрока, накопленные за прошлые партии.
+
+Для каждого размера доски — свой небольшой файл: заголовок, число
+учтенных партий и счетчик на каждую клетку (сколько раз в ней стоял
+корабль игрока). Файл отображается в память через mmap, поэтому
+стратегия компьютера читает счетчики без копирования, а в конце партии
+они увеличиваются прямо в отображении. Счетчики хранятся 32-битными
+числами в порядке байтов машины.
+"""
+import mmap
+import os
+import struct
+
+from . import engine
+
+MAGIC = b"SBH"
+VERSION = 1
+
+# Магия, версия, размер доски, число партий
+HEADER = struct.Struct("=3sBHI")
+
+# Сколько партий нужно накопить, прежде чем частоты начнут влиять на стрельбу
+MIN_GAMES = 3
+
+
+class HeatmapFormatError(ValueError):
+    """Файл частот поврежден или имеет другой формат"""
+
+
+def default_path(board_size):
+    """Имя файла частот для доски заданного размера"""
+    return f"battleship_heatmap_{board_size}.bin"
+
+
+class PlacementHeatmap:
+    """Отображенный в память файл частот для одного размера доски"""
+
+    def __init__(self, path, board_size):
+        self.board_size = board_size
+        cells = board_size * board_size
+        length = HEADER.size + 4 * cells
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, board_size, 0))
+                f.write(bytes(4 * cells))
+
+        self.file = open(path, "r+b")
+        try:
+            if os.fstat(self.file.fileno()).st_size != length:
+                raise HeatmapFormatError("Неверный размер файла частот")
+            self.map = mmap.mmap(self.file.fileno(), length)
+        except Exception:
+            self.file.close()
+            raise
+        magic, version, size, _ = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or size != board_size:
+            self.close()
+            raise HeatmapFormatError("Неизвестный формат файла частот")
+        # Счетчики клеток по индексу row * board_size + col, без копирования
+        self.counts = memoryview(self.map)[HEADER.size:].cast("I")
+
+    @property
+    def games(self):
+        """Число учтенных партий"""
+        return HEADER.unpack_from(self.map)[3]
+
+    def ready(self):
+        """Достаточно ли партий, чтобы частотам можно было доверять"""
+        return self.games >= MIN_GAMES
+
+    def record(self, ships):
+        """Учет расстановки игрока (маски кораблей) по итогам партии"""
+        counts = self.counts
+        for row, col in engine.iter_cells(ships, self.board_size):
+            counts[row * self.board_size + col] += 1
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.board_size, self.games + 1)
+        self.map.flush()
+
+    def close(self):
+        if getattr(self, "counts", None) is not None:
+            self.counts.release()
+            self.counts = None
+        self.map.close()
+        self.file.close()
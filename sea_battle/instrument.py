@@ -0,0 +1,151 @@
+"""Необязательные счетчики горячих путей.
+
+Включаются переменной окружения SEA_BATTLE_INSTRUMENT=1 или настройкой
+"instrumentation" в battleship_settings.json. Выключенные счетчики ничего
+не стоят: методы объекта подменяются обертками только при включении.
+"""
+import functools
+import json
+import os
+import time
+
+from . import engine
+
+ENV_VAR = "SEA_BATTLE_INSTRUMENT"
+
+# Методы BattleshipGame, время которых измеряется
+HOT_PATHS = (
+    "draw_board", "placement_allowed", "computer_turn", "choose_computer_shot", "apply_computer_shot",
+    "is_ship_sunk", "check_win"
+)
+
+# Методы классов движка: доски создаются заново в каждой партии, поэтому обертки ставятся на класс
+CLASS_HOT_PATHS = (
+    (engine.Board, ("place_ship",)),
+    (engine.SparseBoard, ("place_ship",)),
+)
+
+CANVAS_CREATE = ("create_line", "create_rectangle", "create_oval", "create_text", "create_polygon")
+
+_functions = {}
+_canvas = {"created": 0, "deleted": 0}
+_enabled = False
+
+
+def env_enabled():
+    """Проверка переменной окружения"""
+    return os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+
+def enable():
+    """Включение счетчиков"""
+    global _enabled
+    _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Обнуление всех счетчиков"""
+    _functions.clear()
+    _canvas["created"] = 0
+    _canvas["deleted"] = 0
+
+
+def timed(name, func):
+    """Обертка, считающая вызовы и суммарное время функции"""
+    stats = _functions.setdefault(name, [0, 0.0])
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += time.perf_counter() - started
+
+    return wrapper
+
+
+def instrument_object(obj, names=HOT_PATHS):
+    """Подмена методов объекта измеряющими обертками (если счетчики включены)"""
+    if not _enabled:
+        return
+    for name in names:
+        method = getattr(obj, name)
+        if not getattr(method, "__wrapped__", None):
+            setattr(obj, name, timed(name, method))
+
+
+def instrument_classes(paths=CLASS_HOT_PATHS):
+    """Подмена методов классов измеряющими обертками с именами вида Board.place_ship"""
+    if not _enabled:
+        return
+    for cls, names in paths:
+        for name in names:
+            method = cls.__dict__[name]
+            if not getattr(method, "__wrapped__", None):
+                setattr(cls, name, timed(f"{cls.__name__}.{name}", method))
+
+
+def instrument_canvas(canvas):
+    """Подсчет создаваемых и удаляемых элементов холста (если счетчики включены)"""
+    if not _enabled:
+        return
+
+    def counting_create(create):
+        @functools.wraps(create)
+        def wrapper(*args, **kwargs):
+            _canvas["created"] += 1
+            return create(*args, **kwargs)
+        return wrapper
+
+    for name in CANVAS_CREATE:
+        setattr(canvas, name, counting_create(getattr(canvas, name)))
+
+    delete = canvas.delete
+
+    @functools.wraps(delete)
+    def counting_delete(*tags):
+        for tag in tags:
+            _canvas["deleted"] += len(canvas.find_withtag(tag) or ())
+        return delete(*tags)
+
+    canvas.delete = counting_delete
+
+    destroy = canvas.destroy
+
+    @functools.wraps(destroy)
+    def counting_destroy():
+        # Элементы уничтожаемого холста тоже считаем удаленными
+        _canvas["deleted"] += len(canvas.find_all() or ())
+        return destroy()
+
+    canvas.destroy = counting_destroy
+
+
+def snapshot():
+    """Текущие значения счетчиков"""
+    return {
+        "enabled": _enabled,
+        "functions": {
+            name: {
+                "calls": calls,
+                "seconds": seconds,
+                "mean_us": seconds / calls * 1e6 if calls else 0.0,
+            }
+            for name, (calls, seconds) in sorted(_functions.items())
+        },
+        "canvas": dict(_canvas),
+    }
+
+
+def dump(path, extra=None):
+    """Запись снимка счетчиков в JSON; extra — дополнительные разделы снимка"""
+    data = snapshot()
+    data.update(extra or {})
+    with open(path, "w") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,290 @@
+"""Журнал ходов: расстановки и выстрелы в файле с дозаписью.
+
+Файл начинается с короткого заголовка, за которым идут записи
+фиксированного размера (8 байт). Каждая партия открывается записью
+START с размером доски, поэтому в один файл можно дописывать сколько
+угодно партий подряд.
+
+Воспроизведение бывает двух видов: fast_forward сразу собирает итоговые
+маски досок без отрисовки, а Replayer применяет записи по одной, чтобы
+показывать партию в интерфейсе.
+
+Разбор журнала без окна игры:
+
+    python -m sea_battle replay --last --show
+"""
+import argparse
+import json
+import os
+import struct
+from collections import namedtuple
+
+from . import engine
+
+DEFAULT_PATH = "battleship_journal.bin"
+
+MAGIC = b"SBJ"
+VERSION = 1
+HEADER = struct.Struct("<3sB")
+
+# Вид записи, доска, строка, столбец, аргумент, флаги
+RECORD = struct.Struct("<BBHHBB")
+
+START = 0
+PLACE = 1
+SHOT = 2
+
+# Доска, к которой относится запись: доска игрока (по ней стреляет компьютер) или компьютера
+SIDE_PLAYER = 0
+SIDE_COMPUTER = 1
+
+# Результат выстрела в поле «аргумент»
+RESULT_MISS = 0
+RESULT_HIT = 1
+RESULT_SUNK = 2
+
+FLAG_VERTICAL = 1
+
+Record = namedtuple("Record", "kind side row col arg flags")
+
+
+class JournalFormatError(ValueError):
+    """Файл журнала поврежден или имеет другой формат"""
+
+
+class Journal:
+    """Запись ходов в конец файла"""
+
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        if new_file:
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+
+    def write(self, kind, side, row, col, arg=0, flags=0):
+        self.file.write(RECORD.pack(kind, side, row, col, arg, flags))
+
+    def start_game(self, board_size):
+        """Начало новой партии"""
+        self.write(START, 0, board_size, 0)
+
+    def record_placement(self, side, row, col, length, orientation):
+        """Корабль, поставленный на доску"""
+        self.write(PLACE, side, row, col, length, FLAG_VERTICAL if orientation == engine.VERTICAL else 0)
+
+    def record_fleet(self, side, board):
+        """Все корабли доски (после авторасстановки или загрузки)"""
+        for row, col, length, orientation in board.ship_anchors():
+            self.record_placement(side, row, col, length, orientation)
+
+    def record_shot(self, side, row, col, board):
+        """Выстрел по доске side; результат берется из доски после выстрела"""
+        if not board.ships & board.bit(row, col):
+            result = RESULT_MISS
+        elif board.is_ship_sunk(row, col):
+            result = RESULT_SUNK
+        else:
+            result = RESULT_HIT
+        self.write(SHOT, side, row, col, result)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_body(path):
+    """Содержимое журнала без заголовка"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise JournalFormatError("Файл журнала слишком короткий")
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise JournalFormatError("Неизвестный формат журнала")
+    body = memoryview(data)[HEADER.size:]
+    # Недописанный хвост (например, после аварийного завершения) пропускаем
+    return body[:len(body) - len(body) % RECORD.size]
+
+
+def iter_records(path):
+    """Все записи журнала по порядку"""
+    for fields in RECORD.iter_unpack(read_body(path)):
+        yield Record(*fields)
+
+
+def iter_games(path):
+    """Записи журнала, сгруппированные по партиям"""
+    game = None
+    for record in iter_records(path):
+        if record.kind == START:
+            if game:
+                yield game
+            game = [record]
+        elif game is not None:
+            game.append(record)
+    if game:
+        yield game
+
+
+class _Accumulator:
+    """Сбор итоговых масок партии прямо из записей, без проверки правил"""
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.ships = [0, 0]
+        self.shots = [0, 0]
+        self.vertical_cells = {}
+
+    def apply(self, records):
+        board_size = self.board_size
+        ships = self.ships
+        shots = self.shots
+        vertical_cells = self.vertical_cells
+        for kind, side, row, col, arg, flags in records:
+            index = row * board_size + col
+            if kind == SHOT:
+                shots[side] |= 1 << index
+            elif kind == PLACE:
+                if flags & FLAG_VERTICAL:
+                    cells = vertical_cells.get(arg)
+                    if cells is None:
+                        cells = vertical_cells[arg] = sum(1 << (i * board_size) for i in range(arg))
+                    ships[side] |= cells << index
+                else:
+                    ships[side] |= ((1 << arg) - 1) << index
+
+    def boards(self):
+        """Доски (игрока, компьютера); реестр флота строится один раз"""
+        boards = []
+        for side in (SIDE_PLAYER, SIDE_COMPUTER):
+            board = engine.Board(self.board_size)
+            board.hits = self.shots[side] & self.ships[side]
+            board.misses = self.shots[side] & ~self.ships[side]
+            board.set_ships(self.ships[side])
+            boards.append(board)
+        return tuple(boards)
+
+
+def fast_forward(records, upto=None):
+    """Доски (игрока, компьютера) после записей одной партии; upto — индекс первой непримененной записи"""
+    accumulator = _Accumulator(records[0].row)
+    accumulator.apply(records[1:upto])
+    return accumulator.boards()
+
+
+def fast_forward_file(path):
+    """Итоговые доски каждой партии журнала; записи разбираются без промежуточных объектов"""
+    accumulator = None
+    pending = []
+    for fields in RECORD.iter_unpack(read_body(path)):
+        if fields[0] == START:
+            if accumulator:
+                accumulator.apply(pending)
+                yield accumulator.boards()
+            accumulator = _Accumulator(fields[2])
+            pending = []
+        else:
+            pending.append(fields)
+    if accumulator:
+        accumulator.apply(pending)
+        yield accumulator.boards()
+
+
+class Replayer:
+    """Пошаговое воспроизведение партии по записям журнала"""
+
+    def __init__(self, records):
+        self.records = records
+        self.position = 1
+        board_size = records[0].row
+        self.boards = (engine.Board(board_size), engine.Board(board_size))
+
+    @property
+    def finished(self):
+        return self.position >= len(self.records)
+
+    def step(self):
+        """Применение следующей записи; возвращает ее или None в конце партии"""
+        if self.finished:
+            return None
+        record = self.records[self.position]
+        self.position += 1
+        board = self.boards[record.side]
+        if record.kind == PLACE:
+            orientation = engine.VERTICAL if record.flags & FLAG_VERTICAL else engine.HORIZONTAL
+            board.place_ship(record.row, record.col, record.arg, orientation)
+        elif record.kind == SHOT:
+            board.fire(record.row, record.col)
+        return record
+
+
+def game_summary(number, records, boards):
+    """Сводка партии по ее записям и итоговым доскам (игрока, компьютера)"""
+    player_board, computer_board = boards
+    if computer_board.all_sunk() and computer_board.fleet:
+        winner = "player"
+    elif player_board.all_sunk() and player_board.fleet:
+        winner = "computer"
+    else:
+        winner = None
+    return {
+        "game": number,
+        "board_size": records[0].row,
+        "records": len(records),
+        # Выстрелы игрока приходятся на доску компьютера и наоборот
+        "player_shots": bin(computer_board.shots).count("1"),
+        "computer_shots": bin(player_board.shots).count("1"),
+        "winner": winner,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Разбор журнала ходов «Морского боя»")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, help="файл журнала")
+    parser.add_argument("--game", type=int, help="номер партии (с 0; отрицательный — с конца)")
+    parser.add_argument("--last", action="store_true", help="только последняя партия")
+    parser.add_argument("--show", action="store_true", help="напечатать итоговые доски")
+    parser.add_argument("--json", action="store_true", help="вывести сводку в формате JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        games = list(iter_games(args.path))
+    except (OSError, JournalFormatError) as e:
+        print(f"Не удалось прочитать журнал: {e}")
+        return 1
+
+    numbers = range(len(games))
+    if args.last:
+        numbers = numbers[-1:]
+    elif args.game is not None:
+        try:
+            numbers = [numbers[args.game]]
+        except IndexError:
+            print(f"В журнале {len(games)} партий")
+            return 1
+
+    summaries = []
+    for number in numbers:
+        boards = fast_forward(games[number])
+        summary = game_summary(number, games[number], boards)
+        summaries.append(summary)
+        if args.json:
+            continue
+        winner = {"player": "победил игрок", "computer": "победил компьютер", None: "не закончена"}
+        print(f"Партия {number}: доска {summary['board_size']}x{summary['board_size']}, "
+              f"записей {summary['records']}, выстрелов игрока {summary['player_shots']}, "
+              f"компьютера {summary['computer_shots']}, {winner[summary['winner']]}")
+        if args.show:
+            for title, board in zip(("Поле игрока", "Поле компьютера"), boards):
+                print(f"  {title}:")
+                for row in board.to_rows():
+                    print("    " + " ".join(row))
+    if args.json:
+        print(json.dumps(summaries, ensure_ascii=False, indent=2))
+    return 0
@@ -0,0 +1,279 @@
+"""Замеры задержек интерфейса: от клика до перерисовки и отставание цикла Tk.
+
+Включаются переменной окружения SEA_BATTLE_LATENCY=1, настройкой
+"latency_hud" в battleship_settings.json или клавишей F3 в окне игры.
+Выключенные замеры ничего не стоят: методы игры подменяются обертками
+только при включении, как у счетчиков sea_battle.instrument.
+
+Гистограммы:
+
+    click_fire    клик по полю противника — поле перерисовано
+    click_place   клик при расстановке корабля — поле перерисовано
+    draw_board    время одной отрисовки доски
+    loop_lag      насколько позже срока срабатывает периодический after
+
+Перерисовку холста Tk откладывает до простоя цикла событий; отметка
+after_idle, поставленная в конце обработчика клика, выполняется после
+нее, поэтому время до этой отметки — задержка, которую видит игрок.
+Клик учитывается, только если обработчик перерисовал доску: клики по
+обстрелянной клетке или во время хода компьютера ничего не меняют, и их
+почти нулевое время занижало бы процентили.
+Гистограммы логарифмические (шаг RATIO), пишутся в JSON и сравниваются:
+
+    python -m sea_battle latency battleship_latency.json
+    python -m sea_battle latency before.json after.json
+"""
+import argparse
+import functools
+import json
+import math
+import os
+import sys
+import time
+
+ENV_VAR = "SEA_BATTLE_LATENCY"
+DEFAULT_PATH = "battleship_latency.json"
+
+CLICK_FIRE = "click_fire"
+CLICK_PLACE = "click_place"
+DRAW = "draw_board"
+LOOP_LAG = "loop_lag"
+NAMES = (CLICK_FIRE, CLICK_PLACE, DRAW, LOOP_LAG)
+
+# Обработчики кликов, время до перерисовки после которых измеряется
+CLICK_HANDLERS = {"player_fire": CLICK_FIRE, "place_player_ship": CLICK_PLACE}
+
+# Период проверки цикла событий и обновления показаний, мс
+HEARTBEAT_MS = 50
+REFRESH_EVERY = 10
+
+# Границы корзин: от MIN_MS с шагом RATIO (точность около 10%), все, что дольше, — в последней
+MIN_MS = 0.01
+RATIO = 1.1
+BUCKETS = 200
+
+PERCENTILES = (50, 95, 99)
+
+
+def env_enabled():
+    """Проверка переменной окружения"""
+    return os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+
+def bucket_bound(index):
+    """Верхняя граница корзины, мс"""
+    return MIN_MS * RATIO ** index
+
+
+class Histogram:
+    """Логарифмическая гистограмма длительностей"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1e3
+        index = 0 if ms <= MIN_MS else min(BUCKETS - 1, math.ceil(math.log(ms / MIN_MS, RATIO)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        """Верхняя граница корзины, в которую попадает p-й процентиль, мс; None без замеров"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_bound(index), self.max)
+        return self.max
+
+    def summary(self):
+        result = {"count": self.count, "mean_ms": self.total / self.count if self.count else None,
+                  "max_ms": self.max if self.count else None}
+        for p in PERCENTILES:
+            result[f"p{p}_ms"] = self.percentile(p)
+        return result
+
+    def to_dict(self):
+        data = self.summary()
+        # Только непустые корзины: [верхняя граница, мс; число замеров]
+        data["buckets"] = [[bucket_bound(index), count] for index, count in enumerate(self.counts) if count]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        for bound, count in data.get("buckets", ()):
+            index = 0 if bound <= MIN_MS else min(BUCKETS - 1, round(math.log(bound / MIN_MS, RATIO)))
+            histogram.counts[index] += count
+        histogram.count = data.get("count", sum(histogram.counts))
+        histogram.total = (data.get("mean_ms") or 0.0) * histogram.count
+        histogram.max = data.get("max_ms") or 0.0
+        return histogram
+
+
+class LatencyMonitor:
+    """Гистограммы задержек окна игры и периодическая проверка цикла событий"""
+
+    def __init__(self, root):
+        self.root = root
+        self.histograms = {name: Histogram() for name in NAMES}
+        self.overlay = None  # Надпись с показаниями; задает окно игры
+        self.ticks = 0
+        self.after_id = None
+        self.expected = None
+
+    def record(self, name, seconds):
+        self.histograms[name].record(seconds)
+
+    def timed(self, name, func):
+        """Обертка, записывающая длительность вызова"""
+        histogram = self.histograms[name]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter() - started)
+
+        return wrapper
+
+    def clicked(self, name, handler):
+        """Обертка обработчика клика: время от начала обработки до перерисовки после нее"""
+
+        draws = self.histograms[DRAW]
+
+        @functools.wraps(handler)
+        def wrapper(event):
+            started = time.perf_counter()
+            ticks = self.ticks
+            drawn = draws.count
+            try:
+                return handler(event)
+            finally:
+                # Проверка цикла сработала внутри обработчика — значит, он ждал модального
+                # окна (предупреждение, победа), и такой замер не про отрисовку; без
+                # перерисовки доски клик ничего не изменил
+                if self.ticks == ticks and draws.count != drawn:
+                    self.root.after_idle(lambda: self.record(name, time.perf_counter() - started))
+
+        return wrapper
+
+    def attach(self, game):
+        """Подмена методов игры измеряющими обертками"""
+        for method, name in CLICK_HANDLERS.items():
+            setattr(game, method, self.clicked(name, getattr(game, method)))
+        game.draw_board = self.timed(DRAW, game.draw_board)
+
+    def start(self):
+        """Запуск периодической проверки цикла событий"""
+        if self.after_id is None:
+            self.expected = time.perf_counter() + HEARTBEAT_MS / 1000
+            self.after_id = self.root.after(HEARTBEAT_MS, self.tick)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def tick(self):
+        now = time.perf_counter()
+        self.record(LOOP_LAG, max(0.0, now - self.expected))
+        self.ticks += 1
+        if self.ticks % REFRESH_EVERY == 0:
+            self.refresh()
+        # Срок следующей проверки отсчитывается от фактического срабатывания
+        self.expected = now + HEARTBEAT_MS / 1000
+        self.after_id = self.root.after(HEARTBEAT_MS, self.tick)
+
+    def refresh(self):
+        """Обновление надписи с показаниями, если она на экране"""
+        overlay = self.overlay
+        if overlay is None or not overlay.winfo_exists():
+            self.overlay = None
+            return
+        overlay.config(text=self.text())
+
+    def text(self):
+        """Показания p50/p95/p99 в несколько строк"""
+        lines = [f"{'мс':<12}{'p50':>7}{'p95':>7}{'p99':>7}{'n':>6}"]
+        for name in NAMES:
+            histogram = self.histograms[name]
+            values = "".join(f"{format_ms(histogram.percentile(p)):>7}" for p in PERCENTILES)
+            lines.append(f"{name:<12}{values}{histogram.count:>6}")
+        return "\n".join(lines)
+
+    def snapshot(self):
+        return {
+            "heartbeat_ms": HEARTBEAT_MS,
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+    def export(self, path=DEFAULT_PATH):
+        """Запись гистограмм в JSON"""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def format_ms(value):
+    if value is None:
+        return "-"
+    return f"{value:.1f}" if value < 100 else f"{value:.0f}"
+
+
+def load(path):
+    """Гистограммы из файла export"""
+    with open(path) as f:
+        data = json.load(f)
+    return {name: Histogram.from_dict(histogram) for name, histogram in data.get("histograms", {}).items()}
+
+
+def print_report(histograms, baseline=None):
+    """Таблица процентилей; с baseline — и отношение к ней (меньше 1 — быстрее)"""
+    header = f"{'':<12}{'n':>7}" + "".join(f"{f'p{p}, мс':>10}" for p in PERCENTILES) + f"{'max, мс':>10}"
+    print(header)
+    for name, histogram in histograms.items():
+        values = [histogram.percentile(p) for p in PERCENTILES] + [histogram.max if histogram.count else None]
+        print(f"{name:<12}{histogram.count:>7}" + "".join(f"{format_ms(value):>10}" for value in values))
+        old = baseline.get(name) if baseline else None
+        if old is None or not old.count or not histogram.count:
+            continue
+        old_values = [old.percentile(p) for p in PERCENTILES] + [old.max]
+        ratios = [f"x{new / before:.2f}" if before else "-" for new, before in zip(values, old_values)]
+        print(f"{'':<12}{'':>7}" + "".join(f"{ratio:>10}" for ratio in ratios))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение замеров задержек интерфейса")
+    parser.add_argument("paths", nargs="+", metavar="FILE",
+                        help="файл замеров; два файла — было и стало, печатается отношение")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if len(args.paths) > 2:
+        print("Нужен один файл или два: было и стало", file=sys.stderr)
+        return 2
+    histograms = [load(path) for path in args.paths]
+    if len(histograms) == 1:
+        print_report(histograms[0])
+    else:
+        print_report(histograms[1], baseline=histograms[0])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
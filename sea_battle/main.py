@@ -3,6 +3,31 @@ from tkinter import messagebox, simpledialog, ttk
 import random
 import json
 import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from . import ai, endgame, engine, fleet, heatmap, instrument, journal, latency, netclient, savegame, spectate
+
+# Файл с незавершенной партией
+SAVE_FILE = "battleship_save.bin"
+# Журнал ходов всех партий
+JOURNAL_FILE = journal.DEFAULT_PATH
+# Пауза перед ходом компьютера по умолчанию и период опроса готовности хода, мс
+AI_DELAY = 1000
+AI_POLL_INTERVAL = 15
+# Размер видимой области поля и клетки большого поля, пикселей
+VIEWPORT = 400
+LARGE_CELL = 20
+LARGE_BOARD_MAX = 1000
+
+
+def plural(count, one, few, many):
+    """Форма слова для числа: 1 корабль, 2 корабля, 5 кораблей"""
+    if count % 10 == 1 and count % 100 != 11:
+        return one
+    if 2 <= count % 10 <= 4 and not 12 <= count % 100 <= 14:
+        return few
+    return many
 
 
 class BattleshipGame:
@@ -13,11 +38,40 @@ class BattleshipGame:
 
         # Настройки игры
         self.board_size = 10
-        self.ships = [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]  # Размеры кораблей
-        self.player_board = []
-        self.computer_board = []
-        self.player_target_board = []
-        self.computer_target_board = []
+        self.ships = list(engine.DEFAULT_SHIPS)  # Размеры кораблей
+        # Размер доски и флот из настроек; у загруженной, просматриваемой или сетевой
+        # партии свои размер и флот, и они не должны попадать в настройки
+        self.settings_board_size = self.board_size
+        self.settings_ships = list(self.ships)
+        # Доски движка: корабли владельца и выстрелы противника по ним
+        self.player_board = None
+        self.computer_board = None
+        self.rng = random.Random()
+        self.ai_strategy = ai.SIMPLE  # Стратегия стрельбы компьютера
+        self.computer_ai = None
+        # Частоты расстановки игрока по размерам доски (False — файл недоступен)
+        self.heatmaps = {}
+        self.manual_fleet = False  # Корабли текущей партии игрок расставил сам
+        self.ai_delay = AI_DELAY  # Пауза перед ходом компьютера, мс
+        self.ai_cache_size = ai.EVALUATION_CACHE_SIZE  # Позиций в кэше оценок компьютера
+        # Порог точного расчета эндшпиля вероятностной стратегии (0 — без него)
+        self.endgame_threshold = endgame.INTERACTIVE_THRESHOLD
+        # Ход компьютера считается в отдельном потоке, чтобы окно не замирало
+        self.ai_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sea_battle-ai")
+        self.ai_after = None  # Отложенный запуск хода компьютера
+        self.ai_future = None  # Выбор клетки, который сейчас считается
+        self.instrumentation = False  # Счетчики горячих путей
+        self.latency_hud = False  # Замеры задержек интерфейса с показаниями на экране игры
+        self.latency = None
+        self.journal = None  # Журнал ходов, открывается с первой партией
+        self.replayer = None  # Воспроизведение записанной партии
+        # На досках партия против компьютера, начатая или продолженная в этом сеансе;
+        # только ее сохранение заменяет или удаляет файл сохранения
+        self.local_game = False
+        self.network = None  # Соединение с сервером сетевой игры
+        self.server_address = netclient.default_address()
+        self.spectator_port = None  # Порт трансляции для зрителей; None — трансляция выключена
+        self.spectators = None
         self.current_turn = "player"  # или "computer"
         self.game_over = False
         self.ships_placed = False
@@ -45,8 +99,23 @@ class BattleshipGame:
         # Загрузка сохраненных настроек
         self.load_settings()
 
+        self.start_spectators()
+
+        # Счетчики горячих путей включаются настройкой или переменной окружения
+        if self.instrumentation or instrument.env_enabled():
+            instrument.enable()
+            instrument.instrument_object(self)
+            instrument.instrument_classes()
+
+        # Замеры задержек включаются настройкой, переменной окружения или клавишей F3
+        if self.latency_hud or latency.env_enabled():
+            self.enable_latency()
+        self.root.bind("<F3>", self.toggle_latency_hud)
+
     def create_main_menu(self):
         """Создание главного меню"""
+        self.cancel_computer_turn()
+        self.close_network()
         self.clear_window()
 
         # Фрейм для меню
@@ -64,9 +133,15 @@ class BattleshipGame:
         title_label.pack(pady=(0, 40))
 
         # Кнопки меню
-        buttons = [
+        buttons = []
+        if os.path.exists(SAVE_FILE):
+            buttons.append(("Продолжить игру", self.resume_game))
+        if os.path.exists(JOURNAL_FILE):
+            buttons.append(("Просмотр прошлой партии", self.replay_last_game))
+        buttons += [
             ("Новая игра", self.start_new_game),
             ("Авторасстановка кораблей", self.auto_place_ships),
+            ("Сетевая игра", self.start_network_game),
             ("Настройки", self.open_settings),
             ("Правила игры", self.show_rules),
             ("Выход", self.on_closing)
@@ -98,31 +173,448 @@ class BattleshipGame:
         self.clear_window()
 
         # Сброс состояния игры
+        self.board_size = self.settings_board_size
+        self.ships = list(self.settings_ships)
         self.player_board = self.create_empty_board()
         self.computer_board = self.create_empty_board()
-        self.player_target_board = self.create_empty_board()
-        self.computer_target_board = self.create_empty_board()
         self.current_turn = "player"
         self.game_over = False
         self.ships_placed = False
         self.placement_mode = True
         self.current_ship_index = 0
+        self.replayer = None
+        self.local_game = False
+        self.manual_fleet = False
+        # Маски допустимых начальных клеток для кораблей игрока по (размер, ориентация)
+        self.allowed_anchors = {}
 
         # Размещение кораблей компьютера
-        self.place_computer_ships()
+        try:
+            self.place_computer_ships()
+        except fleet.FleetInfeasibleError:
+            messagebox.showerror("Ошибка", "Корабли не помещаются на доске такого размера. Измените настройки.")
+            self.create_main_menu()
+            return False
+        self.local_game = True
+        self.computer_ai = self.create_computer_ai()
+        self.log_move("start_game", self.board_size)
+        self.broadcast("new_game", self.board_size)
+        self.log_move("record_fleet", journal.SIDE_COMPUTER, self.computer_board)
 
         # Создание интерфейса игры
         self.create_game_interface()
 
-        # Начало размещения кораблей игрока
+        if self.large_board():
+            # На большом поле корабли игрока расставляются автоматически
+            self.auto_place_player_ships()
+        else:
+            # Начало размещения кораблей игрока
+            self.start_ship_placement()
+        return True
+
+    def resume_game(self):
+        """Продолжение партии, сохраненной при закрытии окна"""
+        try:
+            saved = savegame.load(SAVE_FILE)
+            os.remove(SAVE_FILE)
+        except (OSError, savegame.SaveFormatError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить сохраненную игру: {e}")
+            return
+
+        self.clear_window()
+
+        # Восстановление состояния игры
+        self.board_size = saved.board_size
+        self.ships = saved.ships
+        self.player_board = saved.player_board
+        self.computer_board = saved.computer_board
+        self.current_turn = saved.current_turn
+        self.game_over = False
+        self.placement_mode = saved.placement_mode
+        self.ships_placed = not saved.placement_mode
+        self.current_ship_index = saved.current_ship_index
+        self.current_ship_orientation = saved.orientation
+        self.allowed_anchors = {}
+        self.replayer = None
+        self.local_game = True
+        # Как были расставлены корабли до сохранения, неизвестно
+        self.manual_fleet = False
+        self.rng.seed(saved.seed)
+        self.computer_ai = self.create_computer_ai()
+        self.restore_computer_ai()
+        self.journal_restored_game()
+        self.broadcast("new_game", self.board_size, {
+            spectate.PLAYER: spectate.board_state(self.player_board),
+            spectate.COMPUTER: spectate.board_state(self.computer_board),
+        })
+
+        self.create_game_interface()
+
+        if self.placement_mode:
+            self.start_ship_placement()
+        elif self.current_turn == "computer":
+            self.status_label.config(text="Ход противника.")
+            self.schedule_computer_turn()
+        else:
+            self.status_label.config(text="Игра продолжена. Ваш ход.")
+
+    def restore_computer_ai(self):
+        """Передача стратегии компьютера результатов уже сделанных им выстрелов"""
+        if not self.computer_ai:
+            return
+        board = self.player_board
+        for row, col in engine.iter_cells(board.misses, self.board_size):
+            self.computer_ai.observe(row, col, ai.RESULT_MISS)
+        for cells, left in zip(board.fleet, board.ship_remaining):
+            hit_cells = list(engine.iter_cells(cells & board.hits, self.board_size))
+            for i, (row, col) in enumerate(hit_cells):
+                sunk = not left and i == len(hit_cells) - 1
+                self.computer_ai.observe(row, col, ai.RESULT_SUNK if sunk else ai.RESULT_HIT)
+
+    def journal_restored_game(self):
+        """Запись загруженной партии в журнал: флоты и уже сделанные выстрелы"""
+        self.log_move("start_game", self.board_size)
+        for side, board in ((journal.SIDE_PLAYER, self.player_board), (journal.SIDE_COMPUTER, self.computer_board)):
+            self.log_move("record_fleet", side, board)
+            # Порядок выстрелов в сохранении не хранится, пишем их по клеткам
+            for row, col in engine.iter_cells(board.shots, self.board_size):
+                self.log_move("record_shot", side, row, col, board)
+
+    def log_move(self, method, *args):
+        """Запись в журнал ходов; ошибка записи отключает журнал, но не прерывает игру"""
+        # Сетевые партии в журнал не пишутся: корабли соперника клиенту неизвестны;
+        # партии на большом поле тоже, их воспроизведение потребовало бы битовых досок
+        if self.journal is False or self.network or self.large_board():
+            return
+        try:
+            if self.journal is None:
+                self.journal = journal.Journal(JOURNAL_FILE)
+            getattr(self.journal, method)(*args)
+            self.journal.flush()
+        except OSError as e:
+            print(f"Ошибка записи журнала: {e}")
+            self.journal = False
+
+    def start_spectators(self):
+        """Запуск трансляции для зрителей, если в настройках задан порт"""
+        if not self.spectator_port or self.spectators:
+            return
+        try:
+            self.spectators = spectate.SpectatorService(port=self.spectator_port)
+        except OSError as e:
+            print(f"Не удалось запустить трансляцию: {e}")
+
+    def broadcasting(self):
+        """Идет ли трансляция текущей партии"""
+        # Как и журнал, трансляция ведется только для локальных партий на обычном поле
+        return bool(self.spectators) and not self.network and not self.large_board()
+
+    def broadcast(self, method, *args):
+        """Событие для зрителей; публикация только ставится в очередь потока трансляции"""
+        if self.broadcasting():
+            getattr(self.spectators, method)(*args)
+
+    def broadcast_shot(self, side, board, row, col, result):
+        """Выстрел по доске стороны side для зрителей; result — ответ board.fire"""
+        if not self.broadcasting():
+            return
+        if result == engine.MISS:
+            result = ai.RESULT_MISS
+        elif self.is_ship_sunk(board, row, col):
+            result = ai.RESULT_SUNK
+        else:
+            result = ai.RESULT_HIT
+        self.spectators.shot(side, row, col, result)
+
+    def replay_last_game(self):
+        """Пошаговый просмотр последней партии из журнала"""
+        try:
+            games = list(journal.iter_games(JOURNAL_FILE))
+        except (OSError, journal.JournalFormatError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать журнал: {e}")
+            return
+        if not games:
+            messagebox.showinfo("Просмотр", "В журнале нет записанных партий.")
+            return
+
+        self.clear_window()
+
+        # Доски воспроизведения вместо досок партии; стрелять и ставить корабли нельзя
+        self.replayer = journal.Replayer(games[-1])
+        self.local_game = False
+        self.board_size = games[-1][0].row
+        self.player_board, self.computer_board = self.replayer.boards
+        self.computer_ai = None
+        self.current_turn = "replay"
+        self.game_over = False
+        self.placement_mode = False
+        self.ships_placed = False
+
+        self.create_game_interface()
+        self.status_label.config(text="Просмотр партии. Нажмите «Следующий ход».")
+
+        step_btn = tk.Button(
+            self.status_frame,
+            text="Следующий ход",
+            font=("Arial", 12),
+            bg=self.colors["water"],
+            fg="white",
+            activebackground="#3a76d8",
+            activeforeground="white",
+            cursor="hand2",
+            command=self.replay_step
+        )
+        step_btn.pack(side="left", padx=(0, 10))
+
+    def replay_step(self):
+        """Применение следующей записи журнала и отрисовка изменений"""
+        record = self.replayer.step() if self.replayer else None
+        if record is None:
+            self.status_label.config(text="Запись партии закончена.")
+            return
+
+        # При просмотре корабли видны на обоих полях
+        self.draw_board(self.player_canvas, self.player_board, True)
+        self.draw_board(self.computer_canvas, self.computer_board, True)
+
+        who = "Игрок" if record.side == journal.SIDE_COMPUTER else "Компьютер"
+        if record.kind == journal.PLACE:
+            owner = "игрока" if record.side == journal.SIDE_PLAYER else "компьютера"
+            text = f"Корабль {owner} ({record.arg} клетки)"
+        elif record.arg == journal.RESULT_SUNK:
+            text = f"{who}: потопил корабль"
+        elif record.arg == journal.RESULT_HIT:
+            text = f"{who}: попадание"
+        else:
+            text = f"{who}: промах"
+        self.status_label.config(text=f"Ход {self.replayer.position - 1}/{len(self.replayer.records) - 1}. {text}")
+
+    def start_network_game(self):
+        """Подключение к серверу и поиск соперника с тем же размером доски"""
+        address = simpledialog.askstring("Сетевая игра", "Адрес сервера (хост:порт):",
+                                         initialvalue=self.server_address, parent=self.root)
+        if not address:
+            return
+        try:
+            host, port = netclient.parse_address(address)
+            connection = netclient.Connection(host, port)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось подключиться к серверу: {e}")
+            return
+
+        self.close_network()
+        self.clear_window()
+        self.server_address = address
+        self.network = connection
+        self.network.send("JOIN", self.settings_board_size)
+
+        wait_frame = tk.Frame(self.root, bg=self.colors["bg"])
+        wait_frame.pack(expand=True, fill="both", padx=50, pady=50)
+        self.status_label = tk.Label(
+            wait_frame,
+            text="Подключение к серверу...",
+            font=("Arial", 18),
+            fg=self.colors["text"],
+            bg=self.colors["bg"]
+        )
+        self.status_label.pack(pady=(0, 40))
+        tk.Button(
+            wait_frame,
+            text="Отмена",
+            font=("Arial", 12),
+            bg="#95a5a6",
+            fg="white",
+            activebackground="#7f8c8d",
+            activeforeground="white",
+            cursor="hand2",
+            command=self.create_main_menu
+        ).pack()
+
+        self.poll_network()
+
+    def poll_network(self):
+        """Обработка сообщений сервера; повторяется, пока соединение открыто"""
+        if not self.network:
+            return
+        for parts in self.network.poll():
+            self.on_network_message(parts)
+            if not self.network:
+                return
+        self.root.after(netclient.POLL_INTERVAL, self.poll_network)
+
+    def on_network_message(self, parts):
+        """Одно сообщение сервера"""
+        if not parts:
+            messagebox.showerror("Ошибка", "Соединение с сервером потеряно.")
+            self.create_main_menu()
+            return
+
+        command = parts[0]
+        if command == "WAIT":
+            size = self.settings_board_size
+            self.status_label.config(text=f"Ожидание соперника (доска {size}x{size})...")
+        elif command == "START":
+            self.start_network_match(int(parts[1]), [int(size) for size in parts[2].split(",")])
+        elif command == "TURN":
+            self.current_turn = "player" if parts[1] == "you" else "opponent"
+            # Дальше о смене хода сообщают результаты выстрелов
+            if self.ships_placed and not (self.player_board.shots or self.computer_board.shots):
+                self.status_label.config(text="Ваш ход." if self.current_turn == "player" else "Ход соперника.")
+        elif command == "SHOT":
+            row, col, result = int(parts[1]), int(parts[2]), parts[3]
+            self.computer_board.mark(row, col, result != ai.RESULT_MISS)
+            self.draw_board(self.computer_canvas, self.computer_board, False)
+            if result == ai.RESULT_SUNK:
+                self.status_label.config(text="Корабль потоплен! Стреляйте еще.")
+            elif result == ai.RESULT_HIT:
+                self.status_label.config(text="Попадание! Стреляйте еще.")
+            else:
+                self.status_label.config(text="Промах! Ход соперника.")
+        elif command == "INCOMING":
+            self.player_board.fire(int(parts[1]), int(parts[2]))
+            self.draw_board(self.player_canvas, self.player_board, True)
+            if parts[3] == ai.RESULT_MISS:
+                self.status_label.config(text="Соперник промахнулся! Ваш ход.")
+            else:
+                self.status_label.config(text="Соперник попал. Ход соперника.")
+        elif command in ("WIN", "LOSE", "LEFT"):
+            self.game_over = True
+            if command == "WIN":
+                messagebox.showinfo("Победа!", "Поздравляем! Вы потопили все корабли соперника!")
+            elif command == "LOSE":
+                messagebox.showinfo("Поражение", "Соперник потопил все ваши корабли!")
+            else:
+                messagebox.showinfo("Сетевая игра", "Соперник отключился.")
+            self.create_main_menu()
+        elif command == "ERR":
+            self.status_label.config(text=f"Сервер: {' '.join(parts[1:])}")
+
+    def start_network_match(self, board_size, ships):
+        """Начало сетевой партии: расстановка своих кораблей, поле соперника пустое"""
+        self.clear_window()
+
+        self.board_size = board_size
+        self.ships = ships
+        self.player_board = self.create_empty_board()
+        # Кораблей соперника не знаем; результаты своих выстрелов отмечаем по ответам сервера
+        self.computer_board = self.create_empty_board()
+        self.computer_ai = None
+        self.current_turn = "opponent"
+        self.game_over = False
+        self.ships_placed = False
+        self.placement_mode = True
+        self.current_ship_index = 0
+        self.replayer = None
+        self.local_game = False
+        self.allowed_anchors = {}
+
+        self.create_game_interface()
         self.start_ship_placement()
 
+    def close_network(self):
+        """Отключение от сервера, если идет сетевая игра"""
+        if self.network:
+            self.network.send("QUIT")
+            self.network.close()
+            self.network = None
+
+    def save_game(self):
+        """Сохранение незавершенной партии; без нее сохранение прошлого сеанса остается на месте"""
+        try:
+            if self.network or self.large_board():
+                # Сетевую партию продолжить без сервера нельзя, большое поле не сохраняется
+                return
+            if not self.local_game or self.game_over:
+                # Партию в этом сеансе не начинали (или на досках просмотр журнала), либо она доиграна
+                return
+            savegame.save(SAVE_FILE, savegame.SavedGame(
+                board_size=self.board_size,
+                ships=self.ships,
+                player_board=self.player_board,
+                computer_board=self.computer_board,
+                current_turn=self.current_turn,
+                current_ship_index=self.current_ship_index,
+                orientation=self.current_ship_orientation,
+                placement_mode=self.placement_mode,
+                seed=savegame.reseed(self.rng)
+            ))
+        except Exception as e:
+            print(f"Ошибка сохранения игры: {e}")
+
+    def discard_save(self):
+        """Удаление сохранения, когда партия доиграна: продолжать больше нечего"""
+        if self.large_board():
+            return
+        try:
+            if os.path.exists(SAVE_FILE):
+                os.remove(SAVE_FILE)
+        except OSError as e:
+            print(f"Ошибка удаления сохранения: {e}")
+
+    def create_computer_ai(self):
+        """Создание стратегии компьютера согласно настройкам"""
+        # Вероятностная стратегия пересчитывает карту всего поля, на большом поле используем простую
+        strategy = ai.SIMPLE if self.large_board() else self.ai_strategy
+        computer_ai = ai.create(strategy, self.board_size, self.ships, self.rng,
+                                endgame_threshold=self.endgame_threshold)
+        # Компьютер начинает с клеток, где игрок в прошлых партиях чаще ставил корабли
+        placements = self.placement_heatmap()
+        if placements and placements.ready():
+            computer_ai.set_prior(placements.counts)
+        return computer_ai
+
+    def placement_heatmap(self):
+        """Файл частот расстановки игрока для текущего размера доски или None"""
+        if self.large_board():
+            return None
+        if self.board_size not in self.heatmaps:
+            try:
+                self.heatmaps[self.board_size] = heatmap.PlacementHeatmap(
+                    heatmap.default_path(self.board_size), self.board_size)
+            except (OSError, ValueError) as e:
+                print(f"Ошибка открытия частот расстановки: {e}")
+                self.heatmaps[self.board_size] = False
+        return self.heatmaps[self.board_size] or None
+
+    def learn_player_fleet(self):
+        """Учет расстановки игрока в частотах по итогам партии; автоматическая расстановка не учитывается"""
+        placements = self.placement_heatmap()
+        if not placements or not self.manual_fleet:
+            return
+        try:
+            placements.record(self.player_board.ships)
+        except (OSError, ValueError) as e:
+            print(f"Ошибка записи частот расстановки: {e}")
+
     def create_empty_board(self):
         """Создание пустой доски"""
-        return [["~" for _ in range(self.board_size)] for _ in range(self.board_size)]
+        return engine.new_board(self.board_size)
+
+    def large_board(self):
+        """Идет ли партия на большом поле (разреженная доска и прокручиваемый холст)"""
+        return self.board_size >= engine.LARGE_BOARD
+
+    def cell_size(self):
+        """Размер клетки на холсте, пикселей"""
+        return LARGE_CELL if self.large_board() else VIEWPORT // self.board_size
+
+    def event_cell(self, canvas, event):
+        """Клетка (row, col) под указателем с учетом прокрутки холста"""
+        cell_size = self.cell_size()
+        return int(canvas.canvasy(event.y)) // cell_size, int(canvas.canvasx(event.x)) // cell_size
+
+    def place_random_ships(self, board):
+        """Случайная расстановка флота на пустой доске"""
+        if self.large_board():
+            fleet.place_tiled_fleet(board, self.ships, self.rng)
+        else:
+            fleet.place_random_fleet(board, self.ships, self.rng)
 
     def create_game_interface(self):
         """Создание игрового интерфейса"""
+        # Элементы клеток на холстах текущей партии
+        self.board_views = {}
+
         # Фрейм для игровых досок
         boards_frame = tk.Frame(self.root, bg=self.colors["bg"])
         boards_frame.pack(fill="both", expand=True, padx=20, pady=20)
@@ -140,17 +632,24 @@ class BattleshipGame:
         )
         player_label.pack(pady=(0, 10))
 
-        self.player_canvas = tk.Canvas(
-            player_frame,
-            width=400,
-            height=400,
-            bg=self.colors["water"],
-            highlightbackground=self.colors["grid"],
-            highlightthickness=2
-        )
-        self.player_canvas.pack()
+        self.player_canvas = self.create_board_canvas(player_frame)
+        instrument.instrument_canvas(self.player_canvas)
+        self.build_board_canvas(self.player_canvas)
         self.draw_board(self.player_canvas, self.player_board, True)
 
+        # Постоянный набор элементов предпросмотра корабля: их только двигают и скрывают
+        self.preview_items = [
+            self.player_canvas.create_rectangle(0, 0, 0, 0, fill=self.colors["ship"], outline=self.colors["ship"],
+                                                state="hidden", tags="preview")
+            for _ in range(max(self.ships))
+        ]
+        self.preview_shown = 0
+        self.preview_key = None
+        self.preview_cell = (-1, -1)
+
+        # На своем поле ставим корабли, по полю противника стреляем
+        self.player_canvas.bind("<Motion>", self.on_mouse_move)
+
         # Доска компьютера (целей)
         computer_frame = tk.Frame(boards_frame, bg=self.colors["bg"])
         computer_frame.pack(side="right", fill="both", expand=True, padx=(10, 0))
@@ -164,19 +663,14 @@ class BattleshipGame:
         )
         computer_label.pack(pady=(0, 10))
 
-        self.computer_canvas = tk.Canvas(
-            computer_frame,
-            width=400,
-            height=400,
-            bg=self.colors["water"],
-            highlightbackground=self.colors["grid"],
-            highlightthickness=2
-        )
-        self.computer_canvas.pack()
-        self.draw_board(self.computer_canvas, self.computer_target_board, False)
+        self.computer_canvas = self.create_board_canvas(computer_frame)
+        instrument.instrument_canvas(self.computer_canvas)
+        self.build_board_canvas(self.computer_canvas)
+        self.draw_board(self.computer_canvas, self.computer_board, False)
+        self.bind_board_clicks()
 
         # Панель статуса
-        status_frame = tk.Frame(self.root, bg=self.colors["bg"])
+        self.status_frame = status_frame = tk.Frame(self.root, bg=self.colors["bg"])
         status_frame.pack(fill="x", padx=20, pady=(0, 20))
 
         self.status_label = tk.Label(
@@ -216,149 +710,345 @@ class BattleshipGame:
         )
         menu_btn.pack(side="right")
 
-    def draw_board(self, canvas, board, is_player_board):
-        """Отрисовка игровой доски на холсте"""
-        canvas.delete("all")
+        if self.latency:
+            self.show_latency_overlay()
+
+    def bind_board_clicks(self):
+        """Клики по полям: расстановка на своем, выстрел по полю противника"""
+        self.player_canvas.bind("<Button-1>", self.place_player_ship)
+        self.computer_canvas.bind("<Button-1>", self.player_fire)
+
+    def in_game_screen(self):
+        """Открыт ли экран партии"""
+        canvas = getattr(self, "computer_canvas", None)
+        return canvas is not None and bool(canvas.winfo_exists())
+
+    def enable_latency(self):
+        """Включение замеров: обработчики кликов и draw_board подменяются измеряющими обертками"""
+        self.latency = latency.LatencyMonitor(self.root)
+        self.latency.attach(self)
+        self.latency.start()
+        if self.in_game_screen():
+            # Привязки текущей партии указывают на методы без оберток
+            self.bind_board_clicks()
+
+    def show_latency_overlay(self):
+        """Показания задержек поверх экрана партии"""
+        overlay = tk.Frame(self.root, bg=self.colors["text"])
+        overlay.place(relx=1.0, x=-8, y=8, anchor="ne")
+        label = tk.Label(
+            overlay,
+            text=self.latency.text(),
+            font=("Courier", 9),
+            justify="left",
+            fg="white",
+            bg=self.colors["text"]
+        )
+        label.pack(padx=6, pady=(4, 0))
+        export_btn = tk.Button(
+            overlay,
+            text="Сохранить замеры",
+            font=("Arial", 9),
+            bg="#95a5a6",
+            fg="white",
+            activebackground="#7f8c8d",
+            activeforeground="white",
+            cursor="hand2",
+            command=self.export_latency
+        )
+        export_btn.pack(pady=4)
+        self.latency.overlay = label
+
+    def toggle_latency_hud(self, event=None):
+        """F3: показать или скрыть показания задержек; первое нажатие включает замеры"""
+        if self.latency is None:
+            self.enable_latency()
+        overlay = self.latency.overlay
+        if overlay is not None and overlay.winfo_exists():
+            overlay.master.destroy()
+            self.latency.overlay = None
+        elif self.in_game_screen():
+            self.show_latency_overlay()
+
+    def export_latency(self):
+        """Запись гистограмм задержек в файл"""
+        try:
+            path = self.latency.export(latency.DEFAULT_PATH)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить замеры: {e}")
+            return
+        self.status_label.config(text=f"Замеры задержек записаны в {path}")
+
+    def create_board_canvas(self, parent):
+        """Холст поля; большое поле показывается в прокручиваемом окне"""
+        canvas = tk.Canvas(
+            parent,
+            width=VIEWPORT,
+            height=VIEWPORT,
+            bg=self.colors["water"],
+            highlightbackground=self.colors["grid"],
+            highlightthickness=2
+        )
+        if not self.large_board():
+            canvas.pack()
+            return canvas
+
+        extent = self.board_size * LARGE_CELL
+        canvas.config(scrollregion=(0, 0, extent, extent), xscrollincrement=LARGE_CELL,
+                      yscrollincrement=LARGE_CELL)
+        x_scroll = tk.Scrollbar(parent, orient="horizontal",
+                                command=lambda *args: self.scroll_board(canvas, canvas.xview, *args))
+        y_scroll = tk.Scrollbar(parent, orient="vertical",
+                                command=lambda *args: self.scroll_board(canvas, canvas.yview, *args))
+        canvas.config(xscrollcommand=x_scroll.set, yscrollcommand=y_scroll.set)
+        x_scroll.pack(side="bottom", fill="x")
+        y_scroll.pack(side="right", fill="y")
+        canvas.pack()
+
+        # Колесо мыши прокручивает по вертикали, с Shift — по горизонтали
+        def wheel(event, view):
+            step = -1 if event.num == 4 or getattr(event, "delta", 0) > 0 else 1
+            self.scroll_board(canvas, view, "scroll", step * 3, "units")
+
+        canvas.bind("<MouseWheel>", lambda event: wheel(event, canvas.yview))
+        canvas.bind("<Shift-MouseWheel>", lambda event: wheel(event, canvas.xview))
+        canvas.bind("<Button-4>", lambda event: wheel(event, canvas.yview))
+        canvas.bind("<Button-5>", lambda event: wheel(event, canvas.yview))
+        return canvas
+
+    def scroll_board(self, canvas, view, *args):
+        """Прокрутка большого поля и отрисовка клеток, ставших видимыми"""
+        view(*args)
+        board_view = self.board_views[canvas]
+        if board_view["board"] is not None:
+            self.draw_board(canvas, board_view["board"], board_view["reveal"])
+
+    def build_board_canvas(self, canvas):
+        """Создание сетки и элементов всех клеток; выполняется один раз за партию"""
+        if self.large_board():
+            # Элементы большого поля создаются только для видимых клеток при отрисовке
+            self.board_views[canvas] = {"board": None, "window": None, "reveal": False}
+            return
 
-        cell_size = 400 // self.board_size
+        cell_size = VIEWPORT // self.board_size
 
         # Рисуем сетку
         for i in range(self.board_size + 1):
             # Вертикальные линии
             canvas.create_line(
-                i * cell_size, 0, i * cell_size, 400,
+                i * cell_size, 0, i * cell_size, VIEWPORT,
                 fill=self.colors["grid"], width=2
             )
             # Горизонтальные линии
             canvas.create_line(
-                0, i * cell_size, 400, i * cell_size,
+                0, i * cell_size, VIEWPORT, i * cell_size,
                 fill=self.colors["grid"], width=2
             )
 
-        # Рисуем содержимое клеток
+        # Для каждой клетки заранее создаем скрытые элементы: заливку, крестик и кружок
+        items = []
         for row in range(self.board_size):
+            items_row = []
             for col in range(self.board_size):
                 x1 = col * cell_size + 2
                 y1 = row * cell_size + 2
                 x2 = (col + 1) * cell_size - 2
                 y2 = (row + 1) * cell_size - 2
 
-                cell = board[row][col]
-
-                if cell == "S":  # Корабль
-                    canvas.create_rectangle(x1, y1, x2, y2, fill=self.colors["ship"], outline=self.colors["ship"])
-                elif cell == "X":  # Попадание
-                    canvas.create_rectangle(x1, y1, x2, y2, fill=self.colors["hit"], outline=self.colors["hit"])
-                    # Крестик для попадания
-                    canvas.create_line(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill="white", width=3)
-                    canvas.create_line(x2 - 5, y1 + 5, x1 + 5, y2 - 5, fill="white", width=3)
-                elif cell == "O":  # Промах
-                    canvas.create_oval(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill=self.colors["miss"],
-                                       outline=self.colors["miss"])
-                elif cell == "~":  # Вода
-                    pass  # Оставляем цвет воды
-
-        # Если это доска компьютера и игра началась, привязываем клики
-        if not is_player_board and not self.placement_mode:
-            canvas.bind("<Button-1>", self.player_fire)
-        else:
-            canvas.unbind("<Button-1>")
+                fill = canvas.create_rectangle(x1, y1, x2, y2, state="hidden")
+                cross = (
+                    canvas.create_line(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill="white", width=3, state="hidden"),
+                    canvas.create_line(x2 - 5, y1 + 5, x1 + 5, y2 - 5, fill="white", width=3, state="hidden")
+                )
+                oval = canvas.create_oval(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill=self.colors["miss"],
+                                          outline=self.colors["miss"], state="hidden")
+                items_row.append((fill, cross, oval))
+            items.append(items_row)
 
-        # Если это доска игрока и мы в режиме размещения кораблей
-        if is_player_board and self.placement_mode:
-            canvas.bind("<Motion>", self.on_mouse_move)
-            canvas.bind("<Button-1>", self.place_player_ship)
+        self.board_views[canvas] = {"board": None, "items": items}
+
+    def draw_board(self, canvas, board, is_player_board):
+        """Отрисовка изменившихся клеток доски на холсте"""
+        view = self.board_views[canvas]
+        if "window" in view:
+            self.draw_visible_cells(canvas, board, is_player_board)
+            return
+
+        if view["board"] is not board:
+            # Новая доска: перерисовываем все клетки
+            view["board"] = board
+            board.take_dirty()
+            cells = [(row, col) for row in range(self.board_size) for col in range(self.board_size)]
+        else:
+            cells = engine.iter_cells(board.take_dirty(), self.board_size)
+
+        for row, col in cells:
+            fill, cross, oval = view["items"][row][col]
+            cell = board.cell(row, col, is_player_board)
+
+            if cell == "S":  # Корабль
+                canvas.itemconfig(fill, fill=self.colors["ship"], outline=self.colors["ship"], state="normal")
+            elif cell == "X":  # Попадание
+                canvas.itemconfig(fill, fill=self.colors["hit"], outline=self.colors["hit"], state="normal")
+            else:  # Промах или вода: оставляем цвет воды
+                canvas.itemconfig(fill, state="hidden")
+
+            # Крестик для попадания
+            cross_state = "normal" if cell == "X" else "hidden"
+            canvas.itemconfig(cross[0], state=cross_state)
+            canvas.itemconfig(cross[1], state=cross_state)
+
+            # Кружок для промаха
+            canvas.itemconfig(oval, state="normal" if cell == "O" else "hidden")
+
+    def visible_window(self, canvas):
+        """Видимые строки и столбцы большого поля: (первая, за последней) по каждой оси"""
+        left = int(canvas.canvasx(0)) // LARGE_CELL
+        top = int(canvas.canvasy(0)) // LARGE_CELL
+        span = VIEWPORT // LARGE_CELL + 1
+        return top, min(self.board_size, top + span), left, min(self.board_size, left + span)
+
+    def draw_visible_cells(self, canvas, board, is_player_board):
+        """Отрисовка большого поля: элементы есть только у видимых клеток, вода не рисуется"""
+        view = self.board_views[canvas]
+        window = self.visible_window(canvas)
+        top, bottom, left, right = window
+
+        if view["board"] is not board or view["window"] != window:
+            # Новая доска или прокрутка: видимая часть строится заново
+            view.update(board=board, window=window, reveal=is_player_board)
+            board.take_dirty()
+            canvas.delete("cells")
+            for row in range(top, bottom + 1):
+                canvas.create_line(left * LARGE_CELL, row * LARGE_CELL, right * LARGE_CELL, row * LARGE_CELL,
+                                   fill=self.colors["grid"], width=2, tags="cells")
+            for col in range(left, right + 1):
+                canvas.create_line(col * LARGE_CELL, top * LARGE_CELL, col * LARGE_CELL, bottom * LARGE_CELL,
+                                   fill=self.colors["grid"], width=2, tags="cells")
+            cells = [(row, col) for row in range(top, bottom) for col in range(left, right)]
+            rebuilt = True
+        else:
+            cells = [divmod(index, board.size) for index in board.take_dirty()]
+            rebuilt = False
+
+        for row, col in cells:
+            if not (top <= row < bottom and left <= col < right):
+                continue
+            tag = f"cell{row}_{col}"
+            if not rebuilt:
+                canvas.delete(tag)
+            cell = board.cell(row, col, is_player_board)
+            if cell == engine.WATER:
+                continue
+            x1 = col * LARGE_CELL + 2
+            y1 = row * LARGE_CELL + 2
+            x2 = (col + 1) * LARGE_CELL - 2
+            y2 = (row + 1) * LARGE_CELL - 2
+            tags = ("cells", tag)
+            if cell == engine.MISS:
+                canvas.create_oval(x1 + 3, y1 + 3, x2 - 3, y2 - 3, fill=self.colors["miss"],
+                                   outline=self.colors["miss"], tags=tags)
+                continue
+            color = self.colors["hit"] if cell == engine.HIT else self.colors["ship"]
+            canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline=color, tags=tags)
+            if cell == engine.HIT:
+                canvas.create_line(x1 + 3, y1 + 3, x2 - 3, y2 - 3, fill="white", width=2, tags=tags)
+                canvas.create_line(x2 - 3, y1 + 3, x1 + 3, y2 - 3, fill="white", width=2, tags=tags)
+        # Предпросмотр корабля остается поверх клеток
+        canvas.tag_raise("preview")
 
     def on_mouse_move(self, event):
         """Обработка движения мыши при размещении кораблей"""
         if not self.placement_mode or self.current_ship_index >= len(self.ships):
             return
 
-        canvas = self.player_canvas
-        cell_size = 400 // self.board_size
-        col = event.x // cell_size
-        row = event.y // cell_size
+        self.preview_cell = self.event_cell(self.player_canvas, event)
+        self.update_preview()
 
-        # Очищаем предыдущий предпросмотр
-        canvas.delete("preview")
+    def update_preview(self):
+        """Перемещение предпросмотра корабля; работа выполняется только при смене клетки или ориентации"""
+        row, col = self.preview_cell
+        key = (row, col, self.current_ship_orientation, self.current_ship_index)
+        if key == self.preview_key:
+            return
+        self.preview_key = key
+
+        canvas = self.player_canvas
+        cell_size = self.cell_size()
 
         # Проверяем, можно ли разместить корабль в этой позиции
-        ship_size = self.ships[self.current_ship_index]
-        valid = self.can_place_ship(self.player_board, row, col, ship_size, self.current_ship_orientation)
+        if self.current_ship_index >= len(self.ships) or not self.placement_allowed(
+                row, col, self.ships[self.current_ship_index], self.current_ship_orientation):
+            self.hide_preview()
+            return
 
-        if 0 <= row < self.board_size and 0 <= col < self.board_size and valid:
-            # Рисуем предпросмотр корабля
+        # Переставляем элементы предпросмотра вместо создания новых
+        ship_size = self.ships[self.current_ship_index]
+        for i, item in enumerate(self.preview_items):
+            if i >= ship_size:
+                if i < self.preview_shown:
+                    canvas.itemconfig(item, state="hidden")
+                continue
             if self.current_ship_orientation == "horizontal":
-                for i in range(ship_size):
-                    if col + i < self.board_size:
-                        x1 = (col + i) * cell_size + 2
-                        y1 = row * cell_size + 2
-                        x2 = (col + i + 1) * cell_size - 2
-                        y2 = (row + 1) * cell_size - 2
-                        canvas.create_rectangle(x1, y1, x2, y2, fill=self.colors["ship"], outline=self.colors["ship"],
-                                                tags="preview")
+                cell_row, cell_col = row, col + i
             else:  # vertical
-                for i in range(ship_size):
-                    if row + i < self.board_size:
-                        x1 = col * cell_size + 2
-                        y1 = (row + i) * cell_size + 2
-                        x2 = (col + 1) * cell_size - 2
-                        y2 = (row + i + 1) * cell_size - 2
-                        canvas.create_rectangle(x1, y1, x2, y2, fill=self.colors["ship"], outline=self.colors["ship"],
-                                                tags="preview")
-
-    def can_place_ship(self, board, row, col, size, orientation):
-        """Проверка, можно ли разместить корабль в указанной позиции"""
-        if orientation == "horizontal":
-            if col + size > self.board_size:
-                return False
-            for i in range(size):
-                # Проверяем саму клетку и соседние
-                for r in range(max(0, row - 1), min(self.board_size, row + 2)):
-                    for c in range(max(0, col + i - 1), min(self.board_size, col + i + 2)):
-                        if board[r][c] == "S":
-                            return False
-        else:  # vertical
-            if row + size > self.board_size:
-                return False
-            for i in range(size):
-                # Проверяем саму клетку и соседние
-                for r in range(max(0, row + i - 1), min(self.board_size, row + i + 2)):
-                    for c in range(max(0, col - 1), min(self.board_size, col + 2)):
-                        if board[r][c] == "S":
-                            return False
-        return True
+                cell_row, cell_col = row + i, col
+            canvas.coords(
+                item,
+                cell_col * cell_size + 2, cell_row * cell_size + 2,
+                (cell_col + 1) * cell_size - 2, (cell_row + 1) * cell_size - 2
+            )
+            if i >= self.preview_shown:
+                canvas.itemconfig(item, state="normal")
+        self.preview_shown = ship_size
+
+    def hide_preview(self):
+        """Скрытие предпросмотра корабля"""
+        for item in self.preview_items[:self.preview_shown]:
+            self.player_canvas.itemconfig(item, state="hidden")
+        self.preview_shown = 0
+
+    def placement_allowed(self, row, col, size, orientation):
+        """Проверка позиции по маске допустимых начальных клеток для текущей доски игрока"""
+        if not (0 <= row < self.board_size and 0 <= col < self.board_size):
+            return False
+        key = (size, orientation)
+        if key not in self.allowed_anchors:
+            self.allowed_anchors[key] = self.player_board.allowed_anchors(size, orientation)
+        return bool(self.allowed_anchors[key] & self.player_board.bit(row, col))
 
     def place_player_ship(self, event):
         """Размещение корабля игрока по клику"""
-        if self.current_ship_index >= len(self.ships):
+        if not self.placement_mode or self.current_ship_index >= len(self.ships):
             return
 
-        canvas = self.player_canvas
-        cell_size = 400 // self.board_size
-        col = event.x // cell_size
-        row = event.y // cell_size
+        row, col = self.event_cell(self.player_canvas, event)
 
         ship_size = self.ships[self.current_ship_index]
 
         # Проверяем, можно ли разместить корабль
-        if not self.can_place_ship(self.player_board, row, col, ship_size, self.current_ship_orientation):
+        if not self.placement_allowed(row, col, ship_size, self.current_ship_orientation):
             messagebox.showwarning("Невозможно разместить", "Корабль нельзя разместить в этой позиции!")
             return
 
         # Размещаем корабль
-        if self.current_ship_orientation == "horizontal":
-            for i in range(ship_size):
-                self.player_board[row][col + i] = "S"
-        else:  # vertical
-            for i in range(ship_size):
-                self.player_board[row + i][col] = "S"
+        cells = self.player_board.ship_mask(row, col, ship_size, self.current_ship_orientation)
+        self.player_board.place_ship(row, col, ship_size, self.current_ship_orientation)
+        self.log_move("record_placement", journal.SIDE_PLAYER, row, col, ship_size, self.current_ship_orientation)
+        if self.network:
+            self.network.send("PLACE", row, col, ship_size, self.current_ship_orientation[0])
+
+        # Убираем из масок допустимых позиций все, что задевает новый корабль
+        for size, orientation in self.allowed_anchors:
+            self.allowed_anchors[size, orientation] &= ~self.player_board.conflicting_anchors(
+                cells, size, orientation)
 
         # Переходим к следующему кораблю
         self.current_ship_index += 1
 
-        # Обновляем доску
+        # Обновляем доску и предпросмотр для следующего корабля
         self.draw_board(self.player_canvas, self.player_board, True)
+        self.update_preview()
 
         # Обновляем статус
         if self.current_ship_index < len(self.ships):
@@ -368,10 +1058,11 @@ class BattleshipGame:
             # Все корабли размещены
             self.placement_mode = False
             self.ships_placed = True
-            self.status_label.config(text="Все корабли размещены! Ваш ход. Кликайте по правому полю.")
-
-            # Разблокируем доску компьютера для выстрелов
-            self.draw_board(self.computer_canvas, self.computer_target_board, False)
+            self.manual_fleet = True
+            if self.network and self.current_turn != "player":
+                self.status_label.config(text="Все корабли размещены! Ждем соперника.")
+            else:
+                self.status_label.config(text="Все корабли размещены! Ваш ход. Кликайте по правому полю.")
 
     def rotate_ship(self):
         """Поворот корабля при размещении"""
@@ -380,51 +1071,25 @@ class BattleshipGame:
         else:
             self.current_ship_orientation = "horizontal"
 
+        if self.placement_mode:
+            self.update_preview()
+
     def start_ship_placement(self):
         """Начало размещения кораблей"""
-        self.status_label.config(text=f"Разместите ваш корабль ({self.ships[0]} клетки)")
+        self.status_label.config(text=f"Разместите ваш корабль ({self.ships[self.current_ship_index]} клетки)")
 
     def auto_place_ships(self):
         """Автоматическая расстановка кораблей для игрока"""
-        self.start_new_game()
+        # На большом поле новая игра сама расставляет корабли игрока
+        if self.start_new_game() and not self.large_board():
+            self.auto_place_player_ships()
 
-        # Очищаем доску игрока
+    def auto_place_player_ships(self):
+        """Случайная расстановка кораблей игрока и переход к стрельбе"""
+        # Размещаем корабли случайным образом на чистой доске игрока
         self.player_board = self.create_empty_board()
-
-        # Размещаем корабли случайным образом
-        for ship_size in self.ships:
-            placed = False
-            attempts = 0
-
-            while not placed and attempts < 100:
-                orientation = random.choice(["horizontal", "vertical"])
-                row = random.randint(0, self.board_size - 1)
-                col = random.randint(0, self.board_size - 1)
-
-                if orientation == "horizontal":
-                    if col + ship_size > self.board_size:
-                        attempts += 1
-                        continue
-                else:  # vertical
-                    if row + ship_size > self.board_size:
-                        attempts += 1
-                        continue
-
-                if self.can_place_ship(self.player_board, row, col, ship_size, orientation):
-                    # Размещаем корабль
-                    if orientation == "horizontal":
-                        for i in range(ship_size):
-                            self.player_board[row][col + i] = "S"
-                    else:  # vertical
-                        for i in range(ship_size):
-                            self.player_board[row + i][col] = "S"
-                    placed = True
-                else:
-                    attempts += 1
-
-            if not placed:
-                messagebox.showerror("Ошибка", "Не удалось автоматически разместить корабли. Попробуйте вручную.")
-                return
+        self.place_random_ships(self.player_board)
+        self.log_move("record_fleet", journal.SIDE_PLAYER, self.player_board)
 
         # Обновляем доску
         self.draw_board(self.player_canvas, self.player_board, True)
@@ -435,66 +1100,38 @@ class BattleshipGame:
         self.current_ship_index = len(self.ships)
         self.status_label.config(text="Все корабли размещены! Ваш ход. Кликайте по правому полю.")
 
-        # Разблокируем доску компьютера для выстрелов
-        self.draw_board(self.computer_canvas, self.computer_target_board, False)
-
     def place_computer_ships(self):
         """Размещение кораблей компьютера"""
         self.computer_board = self.create_empty_board()
-
-        for ship_size in self.ships:
-            placed = False
-            attempts = 0
-
-            while not placed and attempts < 100:
-                orientation = random.choice(["horizontal", "vertical"])
-                row = random.randint(0, self.board_size - 1)
-                col = random.randint(0, self.board_size - 1)
-
-                if orientation == "horizontal":
-                    if col + ship_size > self.board_size:
-                        attempts += 1
-                        continue
-                else:  # vertical
-                    if row + ship_size > self.board_size:
-                        attempts += 1
-                        continue
-
-                if self.can_place_ship(self.computer_board, row, col, ship_size, orientation):
-                    # Размещаем корабль
-                    if orientation == "horizontal":
-                        for i in range(ship_size):
-                            self.computer_board[row][col + i] = "S"
-                    else:  # vertical
-                        for i in range(ship_size):
-                            self.computer_board[row + i][col] = "S"
-                    placed = True
-                else:
-                    attempts += 1
+        self.place_random_ships(self.computer_board)
 
     def player_fire(self, event):
         """Выстрел игрока по полю компьютера"""
         if self.game_over or not self.ships_placed or self.current_turn != "player":
             return
 
-        canvas = self.computer_canvas
-        cell_size = 400 // self.board_size
-        col = event.x // cell_size
-        row = event.y // cell_size
+        row, col = self.event_cell(self.computer_canvas, event)
 
         # Проверяем, что выстрел в пределах доски
         if not (0 <= row < self.board_size and 0 <= col < self.board_size):
             return
 
-        # Проверяем, что в эту клетку еще не стреляли
-        if self.computer_target_board[row][col] != "~":
+        # В сетевой игре выстрел проверяет сервер; до его ответа больше не стреляем
+        if self.network:
+            if not self.computer_board.is_shot(row, col):
+                self.current_turn = "opponent"
+                self.network.send("FIRE", row, col)
             return
 
-        # Проверяем попадание
-        if self.computer_board[row][col] == "S":
+        # Стреляем; None означает, что в эту клетку уже стреляли
+        result = self.computer_board.fire(row, col)
+        if result is None:
+            return
+        self.log_move("record_shot", journal.SIDE_COMPUTER, row, col, self.computer_board)
+        self.broadcast_shot(spectate.COMPUTER, self.computer_board, row, col, result)
+
+        if result == engine.HIT:
             # Попадание!
-            self.computer_target_board[row][col] = "X"
-            self.computer_board[row][col] = "X"
             self.status_label.config(text="Попадание! Стреляйте еще.")
 
             # Проверяем, потоплен ли корабль
@@ -504,61 +1141,89 @@ class BattleshipGame:
             # Проверяем, выиграл ли игрок
             if self.check_win(self.computer_board):
                 self.game_over = True
+                self.discard_save()
+                self.broadcast("game_over", spectate.PLAYER)
+                self.learn_player_fleet()
                 messagebox.showinfo("Победа!", "Поздравляем! Вы потопили все корабли противника!")
                 self.create_main_menu()
                 return
         else:
             # Промах
-            self.computer_target_board[row][col] = "O"
             self.status_label.config(text="Промах! Ход противника.")
             self.current_turn = "computer"
-            self.root.after(1000, self.computer_turn)  # Компьютер делает ход через 1 секунду
+            self.schedule_computer_turn()
 
         # Обновляем доски
-        self.draw_board(self.computer_canvas, self.computer_target_board, False)
+        self.draw_board(self.computer_canvas, self.computer_board, False)
         self.draw_board(self.player_canvas, self.player_board, True)
 
+    def schedule_computer_turn(self):
+        """Ход компьютера после настроенной паузы"""
+        self.ai_after = self.root.after(self.ai_delay, self.computer_turn)
+
+    def cancel_computer_turn(self):
+        """Отмена запланированного или считающегося хода компьютера"""
+        if self.ai_after:
+            self.root.after_cancel(self.ai_after)
+            self.ai_after = None
+        if self.ai_future:
+            # Уже начатый расчет досчитается в потоке, но его результат будет отброшен
+            self.ai_future.cancel()
+            self.ai_future = None
+
     def computer_turn(self):
-        """Ход компьютера"""
-        if self.game_over or self.current_turn != "computer":
+        """Ход компьютера: выбор клетки уходит в поток, результат забирается опросом"""
+        self.ai_after = None
+        if self.game_over or self.current_turn != "computer" or self.ai_future:
             return
 
-        # Простая стратегия: случайный выстрел
-        # Можно улучшить для более интеллектуальной игры
+        self.ai_future = self.ai_executor.submit(self.choose_computer_shot)
+        self.poll_computer_turn(self.ai_future)
 
-        # Сначала ищем раненый корабль, чтобы добить
-        target = self.find_target()
+    def poll_computer_turn(self, future):
+        """Ожидание выбора клетки без блокировки цикла событий"""
+        if future is not self.ai_future:
+            # Ход отменен
+            return
+        if not future.done():
+            self.root.after(AI_POLL_INTERVAL, self.poll_computer_turn, future)
+            return
+        self.ai_future = None
+        row, col = future.result()
+        self.apply_computer_shot(row, col)
 
-        if target:
-            row, col = target
-        else:
-            # Случайный выстрел
-            row = random.randint(0, self.board_size - 1)
-            col = random.randint(0, self.board_size - 1)
+    def choose_computer_shot(self):
+        """Выбор клетки для выстрела компьютера; выполняется в потоке, доски не меняет"""
+        return self.computer_ai.choose()
 
-            # Проверяем, что в эту клетку еще не стреляли
-            attempts = 0
-            while self.player_target_board[row][col] != "~" and attempts < 100:
-                row = random.randint(0, self.board_size - 1)
-                col = random.randint(0, self.board_size - 1)
-                attempts += 1
+    def apply_computer_shot(self, row, col):
+        """Выстрел компьютера по выбранной клетке"""
+        if self.game_over or self.current_turn != "computer":
+            return
 
         # Проверяем попадание
-        if self.player_board[row][col] == "S":
+        result = self.player_board.fire(row, col)
+        if result is not None:
+            self.log_move("record_shot", journal.SIDE_PLAYER, row, col, self.player_board)
+            self.broadcast_shot(spectate.PLAYER, self.player_board, row, col, result)
+        if result == engine.HIT:
             # Попадание!
-            self.player_target_board[row][col] = "X"
-            self.player_board[row][col] = "X"
+            sunk = self.is_ship_sunk(self.player_board, row, col)
+            self.computer_ai.observe(row, col, ai.RESULT_SUNK if sunk else ai.RESULT_HIT)
 
             # Проверяем, выиграл ли компьютер
             if self.check_win(self.player_board):
                 self.game_over = True
+                self.discard_save()
+                self.broadcast("game_over", spectate.COMPUTER)
+                self.learn_player_fleet()
                 self.draw_board(self.player_canvas, self.player_board, True)
                 messagebox.showinfo("Поражение", "Компьютер потопил все ваши корабли!")
                 self.create_main_menu()
                 return
         else:
             # Промах
-            self.player_target_board[row][col] = "O"
+            self.computer_ai.observe(row, col, ai.RESULT_MISS)
             self.current_turn = "player"
             self.status_label.config(text="Противник промахнулся! Ваш ход.")
 
@@ -567,65 +1232,21 @@ class BattleshipGame:
 
         # Если компьютер попал, он ходит еще раз
         if self.current_turn == "computer":
-            self.root.after(1000, self.computer_turn)
-
-    def find_target(self):
-        """Поиск цели для компьютера (раненый корабль)"""
-        for row in range(self.board_size):
-            for col in range(self.board_size):
-                if self.player_target_board[row][col] == "X":
-                    # Проверяем соседние клетки
-                    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-                    for dr, dc in directions:
-                        new_row, new_col = row + dr, col + dc
-                        if (0 <= new_row < self.board_size and
-                                0 <= new_col < self.board_size and
-                                self.player_target_board[new_row][new_col] == "~"):
-                            return new_row, new_col
-        return None
+            self.schedule_computer_turn()
 
     def is_ship_sunk(self, board, row, col):
         """Проверка, потоплен ли корабль"""
-        # Находим все клетки корабля
-        ship_cells = []
-        visited = set()
-
-        def dfs(r, c):
-            if (r, c) in visited:
-                return
-            visited.add((r, c))
-
-            # Если это часть корабля
-            if board[r][c] == "X":
-                ship_cells.append((r, c))
-                # Проверяем соседние клетки
-                directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-                for dr, dc in directions:
-                    new_r, new_c = r + dr, c + dc
-                    if 0 <= new_r < self.board_size and 0 <= new_c < self.board_size:
-                        dfs(new_r, new_c)
-
-        dfs(row, col)
-
-        # Проверяем, все ли клетки корабля подбиты
-        for r, c in ship_cells:
-            if board[r][c] != "X":
-                return False
-        return len(ship_cells) > 0
+        return board.is_ship_sunk(row, col)
 
     def check_win(self, board):
         """Проверка, все ли корабли потоплены"""
-        for row in range(self.board_size):
-            for col in range(self.board_size):
-                if board[row][col] == "S":
-                    return False
-        return True
+        return board.all_sunk()
 
     def open_settings(self):
         """Открытие окна настроек"""
         settings_window = tk.Toplevel(self.root)
         settings_window.title("Настройки")
-        settings_window.geometry("400x300")
+        settings_window.geometry("420x540")
         settings_window.configure(bg=self.colors["bg"])
         settings_window.resizable(False, False)
 
@@ -656,16 +1277,117 @@ class BattleshipGame:
         )
         size_label.pack(side="left", padx=(0, 10))
 
-        size_var = tk.StringVar(value=str(self.board_size))
+        size_var = tk.StringVar(value=str(self.settings_board_size))
+        # Обычные размеры и несколько размеров большого поля; любой другой можно ввести вручную
+        sizes = [str(size) for size in range(6, 16)]
+        sizes += [str(size) for size in (engine.LARGE_BOARD, 200, 500, LARGE_BOARD_MAX)]
         size_spinbox = tk.Spinbox(
             size_frame,
-            from_=6,
-            to=15,
+            values=sizes,
             textvariable=size_var,
             font=("Arial", 12),
             width=10
         )
         size_spinbox.pack(side="left")
+        # Spinbox со списком values при создании подставляет первое значение
+        size_var.set(str(self.settings_board_size))
+
+        # Настройка стратегии компьютера
+        ai_frame = tk.Frame(settings_window, bg=self.colors["bg"])
+        ai_frame.pack(pady=(0, 20))
+
+        ai_label = tk.Label(
+            ai_frame,
+            text="Противник:",
+            font=("Arial", 12),
+            fg=self.colors["text"],
+            bg=self.colors["bg"]
+        )
+        ai_label.pack(side="left", padx=(0, 10))
+
+        ai_names = {name: strategy.title or name for name, strategy in ai.strategies().items()}
+        ai_var = tk.StringVar(value=ai_names.get(self.ai_strategy, ai_names[ai.SIMPLE]))
+        ai_combobox = ttk.Combobox(
+            ai_frame,
+            values=list(ai_names.values()),
+            textvariable=ai_var,
+            state="readonly",
+            font=("Arial", 12),
+            width=14
+        )
+        ai_combobox.pack(side="left")
+
+        # Состав флота: длины кораблей
+        fleet_frame = tk.Frame(settings_window, bg=self.colors["bg"])
+        fleet_frame.pack(pady=(0, 20))
+
+        fleet_label = tk.Label(
+            fleet_frame,
+            text="Флот:",
+            font=("Arial", 12),
+            fg=self.colors["text"],
+            bg=self.colors["bg"]
+        )
+        fleet_label.pack(side="left", padx=(0, 10))
+
+        fleet_var = tk.StringVar(value=" ".join(map(str, self.settings_ships)))
+        fleet_entry = tk.Entry(
+            fleet_frame,
+            textvariable=fleet_var,
+            font=("Arial", 12),
+            width=22
+        )
+        fleet_entry.pack(side="left")
+
+        # Пауза перед ходом компьютера
+        delay_frame = tk.Frame(settings_window, bg=self.colors["bg"])
+        delay_frame.pack(pady=(0, 20))
+
+        delay_label = tk.Label(
+            delay_frame,
+            text="Пауза хода противника, мс:",
+            font=("Arial", 12),
+            fg=self.colors["text"],
+            bg=self.colors["bg"]
+        )
+        delay_label.pack(side="left", padx=(0, 10))
+
+        delay_var = tk.StringVar(value=str(self.ai_delay))
+        delay_spinbox = tk.Spinbox(
+            delay_frame,
+            from_=0,
+            to=5000,
+            increment=100,
+            textvariable=delay_var,
+            font=("Arial", 12),
+            width=6
+        )
+        delay_spinbox.pack(side="left")
+
+        # Размер кэша оценок позиций компьютера
+        cache_frame = tk.Frame(settings_window, bg=self.colors["bg"])
+        cache_frame.pack(pady=(0, 20))
+
+        cache_label = tk.Label(
+            cache_frame,
+            text="Кэш оценок противника, позиций:",
+            font=("Arial", 12),
+            fg=self.colors["text"],
+            bg=self.colors["bg"]
+        )
+        cache_label.pack(side="left", padx=(0, 10))
+
+        cache_var = tk.StringVar(value=str(self.ai_cache_size))
+        cache_spinbox = tk.Spinbox(
+            cache_frame,
+            from_=0,
+            to=65536,
+            increment=1024,
+            textvariable=cache_var,
+            font=("Arial", 12),
+            width=6
+        )
+        cache_spinbox.pack(side="left")
 
         # Кнопки
         buttons_frame = tk.Frame(settings_window, bg=self.colors["bg"])
@@ -674,14 +1396,44 @@ class BattleshipGame:
         def save_settings():
             try:
                 new_size = int(size_var.get())
-                if 6 <= new_size <= 15:
-                    self.board_size = new_size
-                    messagebox.showinfo("Сохранено", "Настройки сохранены!")
-                    settings_window.destroy()
-                else:
-                    messagebox.showerror("Ошибка", "Размер доски должен быть от 6 до 15!")
+                new_delay = int(delay_var.get())
+                new_cache_size = int(cache_var.get())
             except ValueError:
                 messagebox.showerror("Ошибка", "Введите корректное число!")
+                return
+            try:
+                new_ships = fleet.parse_ships(fleet_var.get())
+            except ValueError:
+                messagebox.showerror("Ошибка", "Флот задается длинами кораблей через пробел, например: 4 3 3 2 1")
+                return
+
+            if new_delay < 0:
+                messagebox.showerror("Ошибка", "Пауза не может быть отрицательной!")
+            elif new_cache_size < 0:
+                messagebox.showerror("Ошибка", "Размер кэша не может быть отрицательным!")
+            elif not (6 <= new_size <= 15 or engine.LARGE_BOARD <= new_size <= LARGE_BOARD_MAX):
+                messagebox.showerror("Ошибка", f"Размер доски должен быть от 6 до 15 "
+                                               f"или от {engine.LARGE_BOARD} до {LARGE_BOARD_MAX}!")
+            else:
+                fits = fleet.fleet_fits(new_size, new_ships)
+                if fits is None:
+                    messagebox.showerror("Ошибка", "Не удалось проверить, помещается ли флот. "
+                                                   "Уменьшите число кораблей.")
+                elif not fits:
+                    area = fleet.TILE if new_size >= engine.LARGE_BOARD else new_size
+                    messagebox.showerror("Ошибка", f"Флот не помещается на доске {area}x{area} "
+                                                   f"без касаний кораблей!")
+                else:
+                    self.settings_board_size = new_size
+                    self.settings_ships = new_ships
+                    self.ai_delay = new_delay
+                    self.ai_cache_size = new_cache_size
+                    ai.evaluation_cache.resize(new_cache_size)
+                    for strategy, name in ai_names.items():
+                        if name == ai_var.get():
+                            self.ai_strategy = strategy
+                    messagebox.showinfo("Сохранено", "Настройки сохранены!")
+                    settings_window.destroy()
 
         save_btn = tk.Button(
             buttons_frame,
@@ -717,14 +1469,18 @@ class BattleshipGame:
 
     def show_rules(self):
         """Показать правила игры"""
-        rules_text = """
+        # Состав флота берется из настроек: с ним начнется следующая партия
+        ships = self.settings_ships
+        fleet_lines = "\n".join(
+            f"           - {count} {plural(count, 'корабль', 'корабля', 'кораблей')} "
+            f"размером {length} {plural(length, 'клетка', 'клетки', 'клеток')}"
+            for length, count in sorted(Counter(ships).items(), reverse=True)
+        )
+        rules_text = f"""
         ПРАВИЛА ИГРЫ "МОРСКОЙ БОЙ"
 
-        1. Каждый игрок имеет флот из 10 кораблей:
-           - 1 корабль размером 4 клетки
-           - 2 корабля размером 3 клетки
-           - 3 корабля размером 2 клетки
-           - 4 корабля размером 1 клетка
+        1. Каждый игрок имеет флот из {len(ships)} {plural(len(ships), 'корабля', 'кораблей', 'кораблей')}:
+{fleet_lines}
 
         2. Корабли не могут соприкасаться друг с другом 
            даже углами.
@@ -753,7 +1509,23 @@ class BattleshipGame:
             if os.path.exists("battleship_settings.json"):
                 with open("battleship_settings.json", "r") as f:
                     settings = json.load(f)
-                    self.board_size = settings.get("board_size", 10)
+                    self.settings_board_size = settings.get("board_size", 10)
+                    self.ai_strategy = settings.get("ai", ai.SIMPLE)
+                    self.instrumentation = settings.get("instrumentation", False)
+                    self.latency_hud = settings.get("latency_hud", False)
+                    self.ai_delay = max(0, int(settings.get("ai_delay", AI_DELAY)))
+                    self.ai_cache_size = max(0, int(settings.get("ai_cache_size", ai.EVALUATION_CACHE_SIZE)))
+                    self.spectator_port = settings.get("spectator_port")
+                    self.endgame_threshold = max(0, int(settings.get("endgame_threshold",
+                                                                     endgame.INTERACTIVE_THRESHOLD)))
+                    ai.evaluation_cache.resize(self.ai_cache_size)
+                    ships = settings.get("ships")
+                    if ships is not None:
+                        ships = [int(length) for length in ships]
+                        if fleet.fleet_fits(self.settings_board_size, ships):
+                            self.settings_ships = sorted(ships, reverse=True)
+                        else:
+                            print(f"Флот {ships} из настроек не помещается на доске, используется стандартный")
         except Exception as e:
             print(f"Ошибка загрузки настроек: {e}")
 
@@ -761,7 +1533,15 @@ class BattleshipGame:
         """Сохранение настроек в файл"""
         try:
             settings = {
-                "board_size": self.board_size
+                "board_size": self.settings_board_size,
+                "ai": self.ai_strategy,
+                "ai_delay": self.ai_delay,
+                "ai_cache_size": self.ai_cache_size,
+                "spectator_port": self.spectator_port,
+                "endgame_threshold": self.endgame_threshold,
+                "ships": self.settings_ships,
+                "instrumentation": self.instrumentation,
+                "latency_hud": self.latency_hud
             }
             with open("battleship_settings.json", "w") as f:
                 json.dump(settings, f)
@@ -771,6 +1551,29 @@ class BattleshipGame:
     def on_closing(self):
         """Обработка закрытия окна"""
         self.save_settings()
+        self.cancel_computer_turn()
+        # Дожидаемся уже начатого расчета: он пользуется генератором, который попадает в сохранение
+        self.ai_executor.shutdown(wait=True, cancel_futures=True)
+        self.save_game()
+        self.close_network()
+        if self.spectators:
+            self.spectators.close()
+        if self.journal:
+            self.journal.close()
+        for placements in self.heatmaps.values():
+            if placements:
+                placements.close()
+        if instrument.is_enabled():
+            try:
+                instrument.dump("battleship_metrics.json", {"ai_cache": ai.evaluation_cache.stats()})
+            except Exception as e:
+                print(f"Ошибка сохранения счетчиков: {e}")
+        if self.latency:
+            self.latency.stop()
+            try:
+                self.latency.export(latency.DEFAULT_PATH)
+            except OSError as e:
+                print(f"Ошибка сохранения замеров задержек: {e}")
         self.root.destroy()
 
 
@@ -0,0 +1,73 @@
+"""Подключение окна игры к серверу сетевой игры (sea_battle.server).
+
+Tk не умеет ждать сокет сам, поэтому строки от сервера читает фоновый
+поток и складывает в очередь, а окно забирает их опросом через after.
+"""
+import queue
+import socket
+import threading
+
+from .server import DEFAULT_HOST, DEFAULT_PORT
+
+# Период опроса очереди сообщений окном, мс
+POLL_INTERVAL = 50
+
+
+def default_address():
+    """Адрес сервера по умолчанию для диалога подключения"""
+    return f"{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """Разбор строки «хост:порт»; порт можно не указывать"""
+    host, _, port = text.strip().rpartition(":")
+    if not host:
+        return text.strip(), default_port
+    return host, int(port)
+
+
+class Connection:
+    """Строковое соединение с сервером"""
+
+    def __init__(self, host, port, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.messages = queue.Queue()
+        self.closed = False
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        try:
+            with self.sock.makefile("r", encoding="utf-8", newline="\n") as lines:
+                for line in lines:
+                    self.messages.put(line.split())
+        except (OSError, ValueError):
+            pass
+        # Пустой список — признак закрытого соединения
+        self.messages.put([])
+
+    def send(self, *parts):
+        """Отправка команды; ошибки сети закрывают соединение"""
+        try:
+            self.sock.sendall((" ".join(map(str, parts)) + "\n").encode())
+        except OSError:
+            self.close()
+
+    def poll(self):
+        """Все пришедшие сообщения в виде списков слов"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
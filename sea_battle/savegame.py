@@ -0,0 +1,121 @@
+"""Компактное двоичное сохранение незавершенной партии.
+
+Файл состоит из заголовка фиксированного размера, списка размеров
+кораблей и четырех упакованных битовых масок: корабли и выстрелы для
+доски игрока и доски компьютера. Попадания и промахи восстанавливаются
+из них (попадание — выстрел по кораблю). Партия на доске 10x10 со
+стандартным флотом занимает 78 байт.
+
+Состояние генератора случайных чисел Mersenne Twister слишком велико,
+поэтому при сохранении из него берется 64-битное зерно, которым
+генератор тут же пересевается; то же зерно записывается в файл, и после
+загрузки генератор продолжает ту же последовательность.
+"""
+import struct
+from collections import namedtuple
+
+from . import engine
+
+MAGIC = b"SB"
+VERSION = 1
+
+# Магия, версия, размер доски, флаги, индекс текущего корабля, зерно, число кораблей
+HEADER = struct.Struct("<2sBHBBQB")
+
+FLAG_COMPUTER_TURN = 1
+FLAG_PLACEMENT = 2
+FLAG_VERTICAL = 4
+
+SavedGame = namedtuple(
+    "SavedGame",
+    "board_size ships player_board computer_board current_turn current_ship_index "
+    "orientation placement_mode seed"
+)
+
+
+class SaveFormatError(ValueError):
+    """Файл сохранения поврежден или имеет другой формат"""
+
+
+def reseed(rng):
+    """Новое зерно для генератора: генератор пересевается, зерно возвращается для записи"""
+    seed = rng.getrandbits(64)
+    rng.seed(seed)
+    return seed
+
+
+def _mask_size(board_size):
+    return (board_size * board_size + 7) // 8
+
+
+def dumps(game):
+    """Упаковка SavedGame в байты"""
+    flags = 0
+    if game.current_turn == "computer":
+        flags |= FLAG_COMPUTER_TURN
+    if game.placement_mode:
+        flags |= FLAG_PLACEMENT
+    if game.orientation == engine.VERTICAL:
+        flags |= FLAG_VERTICAL
+
+    size = _mask_size(game.board_size)
+    parts = [
+        HEADER.pack(MAGIC, VERSION, game.board_size, flags, game.current_ship_index, game.seed, len(game.ships)),
+        bytes(game.ships),
+    ]
+    for board in (game.player_board, game.computer_board):
+        parts.append(board.ships.to_bytes(size, "little"))
+        parts.append(board.shots.to_bytes(size, "little"))
+    return b"".join(parts)
+
+
+def loads(data):
+    """Распаковка байтов в SavedGame"""
+    if len(data) < HEADER.size:
+        raise SaveFormatError("Файл сохранения слишком короткий")
+    magic, version, board_size, flags, ship_index, seed, fleet_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise SaveFormatError("Неизвестный формат сохранения")
+
+    size = _mask_size(board_size)
+    offset = HEADER.size
+    if len(data) != offset + fleet_size + 4 * size:
+        raise SaveFormatError("Неверная длина файла сохранения")
+    ships = list(data[offset:offset + fleet_size])
+    offset += fleet_size
+
+    boards = []
+    for _ in range(2):
+        ships_mask = int.from_bytes(data[offset:offset + size], "little")
+        shots = int.from_bytes(data[offset + size:offset + 2 * size], "little")
+        offset += 2 * size
+
+        board = engine.Board(board_size)
+        board.hits = shots & ships_mask
+        board.misses = shots & ~ships_mask
+        board.set_ships(ships_mask)
+        boards.append(board)
+
+    return SavedGame(
+        board_size=board_size,
+        ships=ships,
+        player_board=boards[0],
+        computer_board=boards[1],
+        current_turn="computer" if flags & FLAG_COMPUTER_TURN else "player",
+        current_ship_index=ship_index,
+        orientation=engine.VERTICAL if flags & FLAG_VERTICAL else engine.HORIZONTAL,
+        placement_mode=bool(flags & FLAG_PLACEMENT),
+        seed=seed,
+    )
+
+
+def save(path, game):
+    """Запись партии в файл"""
+    with open(path, "wb") as f:
+        f.write(dumps(game))
+
+
+def load(path):
+    """Чтение партии из файла"""
+    with open(path, "rb") as f:
+        return loads(f.read())
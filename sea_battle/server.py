@@ -0,0 +1,362 @@
+"""Сервер сетевой игры «человек против человека» на asyncio.
+
+Один процесс ведет сколько угодно партий одновременно. Клиенты общаются
+с сервером строками текста, по одной команде или ответу в строке.
+
+Команды клиента:
+
+    JOIN <размер>           встать в очередь на партию с доской этого размера
+    PLACE <row> <col> <длина> <h|v>  поставить корабль флота
+    FIRE <row> <col>        выстрел по доске соперника
+    PING                    проверка связи (ответ PONG)
+    QUIT                    выход
+
+Ответы сервера:
+
+    WAIT                    соперник еще не найден
+    START <размер> <корабли через запятую>
+    OK                      корабль поставлен
+    ERR <текст>             команда отклонена
+    TURN you|opponent       чей сейчас ход
+    SHOT <row> <col> miss|hit|sunk      результат своего выстрела
+    INCOMING <row> <col> miss|hit|sunk  выстрел соперника
+    WIN, LOSE               конец партии
+    LEFT                    соперник отключился
+
+Корабли ставятся в любом порядке из списка START, проверка позиций, выстрелов и
+победы выполняется той же доской движка, что и в локальной игре. Память на
+сессию ограничена: длина строки и буфер отправки не больше заданных
+пределов, медленный клиент отключается.
+
+Запуск сервера и нагрузочная проверка через loopback:
+
+    python -m sea_battle.server --port 5050
+    python -m sea_battle.server --load-test 1000
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import time
+
+from . import ai, engine, fleet
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5050
+BOARD_SIZES = range(6, 16)
+
+# Пределы на одну сессию
+MAX_LINE = 256
+MAX_SEND_BUFFER = 64 * 1024
+IDLE_TIMEOUT = 600
+# Очередь входящих подключений: тысячи клиентов могут подключаться одновременно
+BACKLOG = 4096
+
+
+class Player:
+    """Подключение одного игрока"""
+
+    __slots__ = ("writer", "match", "board", "ships_left")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.match = None
+        self.board = None
+        self.ships_left = None
+
+    def send(self, line):
+        """Отправка строки без ожидания; переполненный буфер означает, что клиент не читает"""
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_SEND_BUFFER:
+            self.writer.close()
+            return
+        self.writer.write(line.encode() + b"\n")
+
+
+class Match:
+    """Партия двух игроков"""
+
+    __slots__ = ("board_size", "ships", "players", "turn", "over")
+
+    def __init__(self, board_size, ships, players, first):
+        self.board_size = board_size
+        self.ships = ships
+        self.players = players
+        self.turn = first
+        self.over = False
+        for player in players:
+            player.match = self
+            player.board = engine.Board(board_size)
+            player.ships_left = list(ships)
+
+    def opponent(self, player):
+        return self.players[1] if self.players[0] is player else self.players[0]
+
+    def started(self):
+        return not any(player.ships_left for player in self.players)
+
+    def send_turn(self):
+        shooter = self.players[self.turn]
+        shooter.send("TURN you")
+        self.opponent(shooter).send("TURN opponent")
+
+    def place(self, player, row, col, length, orientation):
+        """Корабль игрока из еще не поставленных"""
+        if length not in player.ships_left:
+            return player.send("ERR такого корабля не осталось")
+        if not player.board.place_ship(row, col, length, orientation):
+            return player.send("ERR корабль нельзя разместить в этой позиции")
+        player.ships_left.remove(length)
+        player.send("OK")
+        if self.started():
+            self.send_turn()
+
+    def fire(self, player, row, col):
+        """Выстрел игрока по доске соперника"""
+        if not self.started():
+            return player.send("ERR расстановка не закончена")
+        if self.players[self.turn] is not player:
+            return player.send("ERR сейчас ход соперника")
+        opponent = self.opponent(player)
+        target = opponent.board
+        shot = target.fire(row, col)
+        if shot is None:
+            return player.send("ERR в эту клетку стрелять нельзя")
+
+        if shot == engine.MISS:
+            result = ai.RESULT_MISS
+            self.turn = 1 - self.turn
+        elif target.is_ship_sunk(row, col):
+            result = ai.RESULT_SUNK
+        else:
+            result = ai.RESULT_HIT
+        player.send(f"SHOT {row} {col} {result}")
+        opponent.send(f"INCOMING {row} {col} {result}")
+
+        if target.all_sunk():
+            self.over = True
+            player.send("WIN")
+            opponent.send("LOSE")
+        else:
+            self.send_turn()
+
+
+class Server:
+    """Очередь ожидающих игроков и все текущие партии"""
+
+    def __init__(self, ships=engine.DEFAULT_SHIPS, seed=None):
+        self.ships = tuple(ships)
+        self.rng = random.Random(seed)
+        self.waiting = {}  # размер доски -> ожидающий игрок
+        self.sessions = 0
+        self.matches = 0
+
+    def fleet_fits(self, board_size):
+        return fleet.fleet_fits(board_size, self.ships) is True
+
+    def join(self, player, board_size):
+        """Постановка в очередь; второй игрок с тем же размером доски начинает партию"""
+        if player.match and not player.match.over:
+            return player.send("ERR партия уже идет")
+        if board_size not in BOARD_SIZES or not self.fleet_fits(board_size):
+            return player.send("ERR недопустимый размер доски")
+
+        # Повторный JOIN заменяет прежнюю заявку: игрок стоит только в одной очереди
+        self.unqueue(player)
+        other = self.waiting.pop(board_size, None)
+        if other is None:
+            self.waiting[board_size] = player
+            return player.send("WAIT")
+
+        match = Match(board_size, self.ships, (other, player), self.rng.randrange(2))
+        self.matches += 1
+        ships = ",".join(map(str, self.ships))
+        for member in match.players:
+            member.send(f"START {board_size} {ships}")
+
+    def unqueue(self, player):
+        """Снятие игрока с очереди ожидания"""
+        for board_size, waiting in list(self.waiting.items()):
+            if waiting is player:
+                del self.waiting[board_size]
+
+    def leave(self, player):
+        """Отключение игрока: снимаем с очереди, соперник получает LEFT"""
+        self.unqueue(player)
+        match = player.match
+        if match:
+            if not match.over:
+                match.over = True
+                match.opponent(player).send("LEFT")
+            player.match = None
+
+    def dispatch(self, player, parts):
+        """Разбор одной команды клиента"""
+        command = parts[0].upper()
+        try:
+            if command == "PING":
+                player.send("PONG")
+            elif command == "JOIN" and len(parts) == 2:
+                self.join(player, int(parts[1]))
+            elif command in ("PLACE", "FIRE"):
+                match = player.match
+                if match is None or match.over:
+                    player.send("ERR нет текущей партии")
+                elif command == "PLACE" and len(parts) == 5 and parts[4] in ("h", "v"):
+                    orientation = engine.VERTICAL if parts[4] == "v" else engine.HORIZONTAL
+                    match.place(player, int(parts[1]), int(parts[2]), int(parts[3]), orientation)
+                elif command == "FIRE" and len(parts) == 3:
+                    match.fire(player, int(parts[1]), int(parts[2]))
+                else:
+                    player.send("ERR неверная команда")
+            else:
+                player.send("ERR неверная команда")
+        except ValueError:
+            player.send("ERR неверное число")
+
+    async def handle(self, reader, writer):
+        """Сессия одного клиента"""
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        player = Player(writer)
+        self.sessions += 1
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if not line:
+                    break
+                parts = line.decode(errors="replace").split()
+                if not parts:
+                    continue
+                if parts[0].upper() == "QUIT":
+                    break
+                self.dispatch(player, parts)
+                if writer.is_closing():
+                    break
+        except (asyncio.TimeoutError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            # Простой, слишком длинная строка или обрыв связи
+            pass
+        finally:
+            self.sessions -= 1
+            self.leave(player)
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Запуск прослушивания; возвращает asyncio.Server"""
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_LINE, backlog=BACKLOG)
+
+
+async def bot(host, port, board_size, layout, rng, latencies, think=0.0):
+    """Клиент-бот: ставит готовую расстановку и стреляет как простой компьютер; think — пауза перед выстрелом"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    board = target = None
+    sent = 0.0
+    writer.write(f"JOIN {board_size}\n".encode())
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return None
+            parts = line.decode().split()
+            command = parts[0]
+            if command == "START":
+                board = engine.Board(board_size)
+                target = engine.Board(board_size)
+                board.set_ships(layout)
+                for row, col, length, orientation in board.ship_anchors():
+                    writer.write(f"PLACE {row} {col} {length} {orientation[0]}\n".encode())
+            elif command == "TURN" and parts[1] == "you":
+                row, col = engine.choose_shot(target, rng)
+                if think:
+                    await asyncio.sleep(think)
+                sent = time.perf_counter()
+                writer.write(f"FIRE {row} {col}\n".encode())
+            elif command == "SHOT":
+                latencies.append(time.perf_counter() - sent)
+                target.mark(int(parts[1]), int(parts[2]), parts[3] != ai.RESULT_MISS)
+            elif command == "INCOMING":
+                board.fire(int(parts[1]), int(parts[2]))
+            elif command in ("WIN", "LOSE", "LEFT"):
+                return command
+            elif command == "ERR":
+                raise RuntimeError(line.decode().strip())
+    finally:
+        writer.close()
+
+
+async def load_test(pairs, board_size=10, port=0, seed=0, think=0.0):
+    """Одновременные партии ботов через loopback; возвращает статистику задержек.
+
+    Без паузы think боты стреляют сразу после ответа, и замер показывает
+    предельную пропускную способность; задержка тогда — время в очереди.
+    """
+    server = Server(seed=seed)
+    listener = await server.start(DEFAULT_HOST, port)
+    port = listener.sockets[0].getsockname()[1]
+    rng = random.Random(seed)
+    # Расстановки готовятся заранее, чтобы генерация не занимала цикл событий во время замера
+    layouts = fleet.generate_fleets(2 * pairs, board_size, server.ships, seed=seed)
+    latencies = []
+    started = time.perf_counter()
+    async with listener:
+        results = await asyncio.gather(*(
+            bot(DEFAULT_HOST, port, board_size, layout, random.Random(rng.random()), latencies, think)
+            for layout in list(layouts)
+        ))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1e3 if latencies else None
+
+    return {
+        "games": pairs,
+        "sessions": 2 * pairs,
+        "finished": results.count("WIN"),
+        "moves": len(latencies),
+        "seconds": elapsed,
+        "moves_per_second": len(latencies) / elapsed if elapsed else None,
+        "latency_ms": {"p50": percentile(50), "p90": percentile(90), "p99": percentile(99),
+                       "max": latencies[-1] * 1e3 if latencies else None},
+    }
+
+
+async def serve(host, port):
+    server = Server()
+    listener = await server.start(host, port)
+    print(f"Сервер слушает {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер сетевой игры «Морской бой»")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="адрес для прослушивания")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="порт")
+    parser.add_argument("--load-test", type=int, metavar="PAIRS",
+                        help="вместо сервера сыграть столько партий ботов через loopback")
+    parser.add_argument("--board-size", type=int, default=10, help="размер доски для нагрузочной проверки")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора для нагрузочной проверки")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="пауза бота перед выстрелом, мс")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.load_test:
+        report = asyncio.run(load_test(args.load_test, args.board_size, seed=args.seed,
+                                       think=args.think_ms / 1000))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Симулятор партий «компьютер против компьютера» без графического интерфейса.
+
+Партии распределяются по пулу процессов; каждый процесс получает свое
+зерно генератора, поэтому прогон с тем же зерном и числом процессов
+воспроизводится полностью.
+
+Пример запуска:
+
+    python -m sea_battle.simulate --games 100000 --workers 8 --seed 1
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from . import engine, fleet
+
+
+def play_game(board_size, layouts, rng):
+    """Одна партия на двух расстановках; возвращает (номер победителя, число его выстрелов)"""
+    boards = [engine.Board(board_size), engine.Board(board_size)]
+    for board, layout in zip(boards, layouts):
+        board.set_ships(layout)
+
+    shots = [0, 0]
+    turn = 0
+    while True:
+        # Стреляющий игрок бьет по доске соперника
+        target = boards[1 - turn]
+        row, col = engine.choose_shot(target, rng)
+        shots[turn] += 1
+        if target.fire(row, col) == engine.HIT:
+            if target.all_sunk():
+                return turn, shots[turn]
+        else:
+            turn = 1 - turn
+
+
+def worker_seed(seed, worker):
+    """Зерно генератора для отдельного процесса"""
+    return seed * 1_000_003 + worker
+
+
+def shot_seed(seed, worker):
+    """Зерно выстрелов процесса: отдельное от зерна расстановок, чтобы выстрелы не повторяли их генератор"""
+    return f"shots:{worker_seed(seed, worker)}"
+
+
+def run_chunk(worker, games, board_size, ships, seed):
+    """Прогон части партий в одном процессе"""
+    rng = random.Random(shot_seed(seed, worker))
+    shots_to_win = Counter()
+    wins = [0, 0]
+    started = time.perf_counter()
+    layouts = fleet.generate_fleets(2 * games, board_size, ships, seed=worker_seed(seed, worker))
+    for _ in range(games):
+        winner, shots = play_game(board_size, (next(layouts), next(layouts)), rng)
+        wins[winner] += 1
+        shots_to_win[shots] += 1
+    return {
+        "worker": worker,
+        "pid": os.getpid(),
+        "games": games,
+        "seconds": time.perf_counter() - started,
+        "wins": wins,
+        "shots_to_win": dict(shots_to_win),
+    }
+
+
+def split_games(games, workers):
+    """Разбиение числа партий на почти равные части"""
+    base, extra = divmod(games, workers)
+    return [base + (1 if i < extra else 0) for i in range(workers)]
+
+
+def summarize(chunks, elapsed):
+    """Сводная статистика по результатам всех процессов"""
+    shots_to_win = Counter()
+    wins = [0, 0]
+    for chunk in chunks:
+        shots_to_win.update({int(k): v for k, v in chunk["shots_to_win"].items()})
+        wins[0] += chunk["wins"][0]
+        wins[1] += chunk["wins"][1]
+
+    games = sum(shots_to_win.values())
+    ordered = sorted(shots_to_win.elements())
+
+    def percentile(p):
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    return {
+        "games": games,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else None,
+        "wins": wins,
+        "shots_to_win": {
+            "min": ordered[0] if ordered else None,
+            "max": ordered[-1] if ordered else None,
+            "mean": sum(ordered) / games if games else None,
+            "p50": percentile(50),
+            "p90": percentile(90),
+            "p99": percentile(99),
+            "histogram": {str(k): shots_to_win[k] for k in sorted(shots_to_win)},
+        },
+        "workers": [
+            {
+                "worker": chunk["worker"],
+                "pid": chunk["pid"],
+                "games": chunk["games"],
+                "seconds": chunk["seconds"],
+                "games_per_second": chunk["games"] / chunk["seconds"] if chunk["seconds"] else None,
+            }
+            for chunk in chunks
+        ],
+    }
+
+
+def run_simulation(games, workers=None, board_size=10, ships=engine.DEFAULT_SHIPS, seed=0):
+    """Прогон партий на пуле процессов; возвращает сводную статистику"""
+    workers = workers or os.cpu_count() or 1
+    ships = tuple(ships)
+    counts = [count for count in split_games(games, workers) if count]
+
+    started = time.perf_counter()
+    if len(counts) <= 1:
+        chunks = [run_chunk(0, games, board_size, ships, seed)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(counts)) as pool:
+            futures = [
+                pool.submit(run_chunk, worker, count, board_size, ships, seed)
+                for worker, count in enumerate(counts)
+            ]
+            chunks = [future.result() for future in futures]
+    return summarize(chunks, time.perf_counter() - started)
+
+
+def print_summary(summary):
+    """Вывод сводки в читаемом виде"""
+    shots = summary["shots_to_win"]
+    print(f"Партий: {summary['games']} за {summary['seconds']:.2f} с "
+          f"({summary['games_per_second']:.0f} партий/с)")
+    print(f"Побед первого/второго игрока: {summary['wins'][0]}/{summary['wins'][1]}")
+    print(f"Выстрелов до победы: среднее {shots['mean']:.2f}, медиана {shots['p50']}, "
+          f"p90 {shots['p90']}, p99 {shots['p99']}, мин {shots['min']}, макс {shots['max']}")
+    for worker in summary["workers"]:
+        print(f"  процесс {worker['worker']} (pid {worker['pid']}): {worker['games']} партий "
+              f"за {worker['seconds']:.2f} с")
+
+
+def positive_int(text):
+    """Тип аргумента командной строки: целое больше нуля"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("нужно целое число больше нуля")
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Симуляция партий компьютер против компьютера")
+    parser.add_argument("--games", type=positive_int, default=1000, help="число партий")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию все ядра)")
+    parser.add_argument("--board-size", type=int, default=10, help="размер доски")
+    parser.add_argument("--seed", type=int, default=0, help="базовое зерно генератора")
+    parser.add_argument("--json", action="store_true", help="вывести статистику в формате JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    summary = run_simulation(args.games, args.workers, args.board_size, seed=args.seed)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
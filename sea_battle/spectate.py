@@ -0,0 +1,508 @@
+"""Трансляция локальной партии зрителям по сети.
+
+Окно игры публикует каждое изменение клетки (выстрел игрока или
+компьютера) маленьким событием; подключившийся зритель сначала получает
+полный снимок обеих досок, а дальше — только изменения. Рассылка идет
+в отдельном потоке со своим циклом asyncio: окно лишь ставит событие в
+очередь цикла и не ждет сети. Каждое событие кодируется один раз, и
+одни и те же байты пишутся всем зрителям.
+
+Зритель, который не успевает читать, не задерживает остальных: когда
+его буфер отправки превышает HIGH_WATER, события для него пропускаются,
+а после того как буфер опустеет до LOW_WATER, он получает свежий снимок
+и продолжает с изменениями. Память на зрителя ограничена буфером, буфер
+ядра — SOCKET_SNDBUF.
+
+События (строки текста, как у sea_battle.server; seq растет на единицу
+с каждым событием, по нему зритель замечает пропуски):
+
+    GAME <seq> <размер>                       новая партия, доски пусты
+    SNAPSHOT <seq> <размер> <доска игрока> <доска компьютера>
+                                              доска — попадания, промахи и клетки
+                                              потопленных кораблей: три маски hex через «/»
+    CELL <seq> player|computer <row> <col> miss|hit|sunk
+                                              выстрел по доске игрока или компьютера
+    OVER <seq> player|computer                победитель партии
+
+Зритель может отправлять PING (ответ PONG) и QUIT. Нагрузочная проверка
+через loopback с тысячами зрителей, часть из которых не читает:
+
+    python -m sea_battle spectate --load-test 2000 --slow 0.1
+    python -m sea_battle spectate --watch 127.0.0.1:5051
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+
+from . import ai, engine, fleet
+from .server import DEFAULT_HOST, MAX_LINE
+
+DEFAULT_PORT = 5051
+PLAYER = "player"
+COMPUTER = "computer"
+SIDES = (PLAYER, COMPUTER)
+
+# Пределы буфера отправки одного зрителя: выше HIGH_WATER события пропускаются,
+# при LOW_WATER и ниже зритель получает снимок
+HIGH_WATER = 64 * 1024
+LOW_WATER = 8 * 1024
+# Буфер отправки ядра на зрителя: без предела ядро копит до мегабайт и отставание не видно
+SOCKET_SNDBUF = 32 * 1024
+# Как часто проверять, опустели ли буферы отставших зрителей, с
+RESYNC_INTERVAL = 0.05
+BACKLOG = 4096
+
+
+class Subscriber:
+    """Подключение одного зрителя"""
+
+    __slots__ = ("writer", "transport", "stale")
+
+    def __init__(self, writer):
+        self.writer = writer
+        # Запись прямо в транспорт: в рассылке на тысячи зрителей обертка потока заметна
+        self.transport = writer.transport
+        # Зритель отстал: события пропускаются до отправки нового снимка
+        self.stale = False
+
+
+class Broadcaster:
+    """Состояние транслируемой партии и рассылка событий; работает внутри цикла asyncio"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.seq = 0
+        self.size = 0
+        self.boards = {}
+        self.sunk = {}
+        self.stats = {"events": 0, "sent": 0, "skipped": 0, "resyncs": 0}
+        self.resync_task = None
+
+    def new_game(self, size, state=None):
+        """Новая партия; state — уже сделанные выстрелы: сторона -> (попадания, промахи, потопленные)"""
+        self.size = size
+        self.boards = {side: engine.Board(size) for side in SIDES}
+        self.sunk = dict.fromkeys(SIDES, 0)
+        for side, (hits, misses, sunk) in (state or {}).items():
+            self.boards[side].hits = hits
+            self.boards[side].misses = misses
+            self.sunk[side] = sunk
+        if state:
+            self.seq += 1
+            self._publish(self.snapshot_line())
+        else:
+            self._publish(self._event("GAME", size))
+
+    def shot(self, side, row, col, result):
+        """Выстрел по доске стороны side с результатом ai.RESULT_*"""
+        board = self.boards[side]
+        board.mark(row, col, result != ai.RESULT_MISS)
+        if result == ai.RESULT_SUNK:
+            # Корабли не касаются, поэтому связная группа попаданий — потопленный корабль
+            cells = board.bit(row, col)
+            while True:
+                grown = board.shift_cross(cells) & board.hits
+                if grown == cells:
+                    break
+                cells = grown
+            self.sunk[side] |= cells
+        self._publish(self._event("CELL", side, row, col, result))
+
+    def game_over(self, winner):
+        self._publish(self._event("OVER", winner))
+
+    def _event(self, *parts):
+        self.seq += 1
+        return " ".join(map(str, (parts[0], self.seq) + parts[1:]))
+
+    def snapshot_line(self):
+        """Полное состояние обеих досок с номером последнего события"""
+        boards = [
+            "/".join(format(mask, "x") for mask in (self.boards[side].hits, self.boards[side].misses, self.sunk[side]))
+            for side in SIDES
+        ] if self.boards else ["0/0/0", "0/0/0"]
+        return f"SNAPSHOT {self.seq} {self.size} {boards[0]} {boards[1]}"
+
+    def _publish(self, line):
+        """Одно кодирование события и запись тем же байтам всем зрителям"""
+        self.stats["events"] += 1
+        data = line.encode() + b"\n"
+        for subscriber in self.subscribers:
+            self._deliver(subscriber, data)
+
+    def _deliver(self, subscriber, data):
+        transport = subscriber.transport
+        if transport.is_closing():
+            return
+        if subscriber.stale or transport.get_write_buffer_size() > HIGH_WATER:
+            # Снимок, который зритель получит позже, уже учтет это событие
+            subscriber.stale = True
+            self.stats["skipped"] += 1
+            return
+        transport.write(data)
+        self.stats["sent"] += 1
+
+    def _resync(self):
+        """Снимок для отставших зрителей, чьи буферы опустели"""
+        snapshot = None
+        for subscriber in self.subscribers:
+            transport = subscriber.transport
+            if subscriber.stale and not transport.is_closing() and transport.get_write_buffer_size() <= LOW_WATER:
+                if snapshot is None:
+                    snapshot = self.snapshot_line().encode() + b"\n"
+                transport.write(snapshot)
+                subscriber.stale = False
+                self.stats["resyncs"] += 1
+
+    async def _resync_loop(self):
+        while True:
+            await asyncio.sleep(RESYNC_INTERVAL)
+            self._resync()
+
+    async def handle(self, reader, writer):
+        """Сессия одного зрителя: снимок при подключении, дальше события рассылаются сами"""
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF)
+        subscriber = Subscriber(writer)
+        writer.write(self.snapshot_line().encode() + b"\n")
+        self.subscribers.add(subscriber)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip().upper()
+                if command == "QUIT":
+                    break
+                if command == "PING" and not subscriber.stale:
+                    writer.write(b"PONG\n")
+        except (asyncio.LimitOverrunError, ValueError, ConnectionError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Запуск прослушивания; возвращает asyncio.Server"""
+        listener = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE, backlog=BACKLOG)
+        self.resync_task = asyncio.ensure_future(self._resync_loop())
+        return listener
+
+
+class SpectatorService:
+    """Трансляция в фоновом потоке; методы вызываются из потока окна и не ждут сети"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.broadcaster = Broadcaster()
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self.error = None
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(host, port, ready),
+                                       name="sea_battle-spectate", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if self.error:
+            raise self.error
+
+    def _run(self, host, port, ready):
+        asyncio.set_event_loop(self.loop)
+        try:
+            listener = self.loop.run_until_complete(self.broadcaster.start(host, port))
+            self.port = listener.sockets[0].getsockname()[1]
+        except OSError as e:
+            self.error = e
+            ready.set()
+            self.loop.close()
+            return
+        ready.set()
+        self.loop.run_forever()
+        # Остановка: закрываем прослушивание и сессии зрителей, затем сам цикл
+        listener.close()
+        self.broadcaster.resync_task.cancel()
+        # Закрытый транспорт завершает сессию как отключение зрителя
+        for subscriber in list(self.broadcaster.subscribers):
+            subscriber.transport.close()
+        tasks = asyncio.all_tasks(self.loop)
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    def new_game(self, size, state=None):
+        self.loop.call_soon_threadsafe(self.broadcaster.new_game, size, state)
+
+    def shot(self, side, row, col, result):
+        self.loop.call_soon_threadsafe(self.broadcaster.shot, side, row, col, result)
+
+    def game_over(self, winner):
+        self.loop.call_soon_threadsafe(self.broadcaster.game_over, winner)
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1)
+
+
+def board_state(board):
+    """Выстрелы по доске движка в виде (попадания, промахи, потопленные клетки) для new_game"""
+    sunk = 0
+    for cells in board.sunk_ships():
+        sunk |= cells
+    return board.hits, board.misses, sunk
+
+
+class View:
+    """Состояние партии глазами зрителя, собранное из снимков и изменений"""
+
+    def __init__(self):
+        self.seq = 0
+        self.size = 0
+        self.boards = {side: [0, 0, 0] for side in SIDES}
+        self.winner = None
+        self.gaps = 0
+        self.snapshots = 0
+
+    def apply(self, parts):
+        """Учет одной строки трансляции; возвращает номер события или None"""
+        command = parts[0]
+        if command == "PONG":
+            return None
+        seq = int(parts[1])
+        if command == "SNAPSHOT":
+            self.snapshots += 1
+            self.size = int(parts[2])
+            for side, text in zip(SIDES, parts[3:5]):
+                self.boards[side] = [int(mask, 16) for mask in text.split("/")]
+            self.winner = None
+        else:
+            if seq != self.seq + 1:
+                self.gaps += 1
+            if command == "GAME":
+                self.size = int(parts[2])
+                self.boards = {side: [0, 0, 0] for side in SIDES}
+                self.winner = None
+            elif command == "CELL":
+                side, row, col, result = parts[2], int(parts[3]), int(parts[4]), parts[5]
+                bit = 1 << (row * self.size + col)
+                self.boards[side][0 if result != ai.RESULT_MISS else 1] |= bit
+                if result == ai.RESULT_SUNK:
+                    board = engine.Board(self.size)
+                    board.hits = self.boards[side][0]
+                    cells = bit
+                    while True:
+                        grown = board.shift_cross(cells) & board.hits
+                        if grown == cells:
+                            break
+                        cells = grown
+                    self.boards[side][2] |= cells
+            elif command == "OVER":
+                self.winner = parts[2]
+        self.seq = seq
+        return seq
+
+    def render(self):
+        """Доски в текстовом виде: X — попадание, # — потопленный корабль, O — промах"""
+        lines = []
+        for side in SIDES:
+            hits, misses, sunk = self.boards[side]
+            lines.append(f"{side}:")
+            for row in range(self.size):
+                cells = []
+                for col in range(self.size):
+                    bit = 1 << (row * self.size + col)
+                    cells.append("#" if sunk & bit else engine.HIT if hits & bit
+                                 else engine.MISS if misses & bit else engine.WATER)
+                lines.append(" ".join(cells))
+        return "\n".join(lines)
+
+
+async def subscriber(host, port, received, view, stall=None, rcvbuf=None):
+    """Синтетический зритель: собирает состояние; stall — событие, до которого он не читает после снимка"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if rcvbuf:
+        # Маленький буфер приема, чтобы отставание быстро доходило до сервера
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    # Небольшой предел строки: поток не копит непрочитанное сверх пары килобайт
+    reader, writer = await asyncio.open_connection(sock=sock, limit=4 * MAX_LINE)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return view
+            seq = view.apply(line.decode().split())
+            if seq is not None:
+                received.append((seq, time.perf_counter()))
+            if stall is not None:
+                await stall.wait()
+    finally:
+        writer.close()
+
+
+async def play_games(broadcaster, games, board_size, seed, rate, published, publish_times):
+    """Партии простых компьютеров с публикацией каждого выстрела; rate — событий в секунду.
+
+    published — время публикации по номеру события, publish_times — сколько
+    заняла каждая публикация.
+    """
+    rng = random.Random(seed)
+    layouts = fleet.generate_fleets(2 * games, board_size, seed=seed)
+    pause = 1 / rate if rate else 0
+    for _ in range(games):
+        boards = {PLAYER: engine.Board(board_size), COMPUTER: engine.Board(board_size)}
+        for board in boards.values():
+            board.set_ships(next(layouts))
+        broadcaster.new_game(board_size)
+        turn = PLAYER
+        while True:
+            side = COMPUTER if turn == PLAYER else PLAYER
+            target = boards[side]
+            row, col = engine.choose_shot(target, rng)
+            shot = target.fire(row, col)
+            if shot is None:
+                # Повторный выстрел в ту же клетку ничего не меняет на доске
+                continue
+            hit = shot == engine.HIT
+            result = ai.RESULT_MISS
+            if hit:
+                result = ai.RESULT_SUNK if target.is_ship_sunk(row, col) else ai.RESULT_HIT
+            started = time.perf_counter()
+            broadcaster.shot(side, row, col, result)
+            finished = time.perf_counter()
+            published[broadcaster.seq] = finished
+            publish_times.append(finished - started)
+            if hit and target.all_sunk():
+                broadcaster.game_over(turn)
+                break
+            if not hit:
+                turn = side
+            await asyncio.sleep(pause)
+
+
+async def load_test(subscribers, games=20, board_size=10, slow=0.1, port=0, seed=0, rate=2000):
+    """Одна трансляция на много зрителей через loopback; доля slow зрителей не читает, пока идут партии.
+
+    Проверяется, что все зрители в итоге видят то же состояние, что и
+    источник, а время публикации события (то, чем платит игра) не зависит
+    от отставших зрителей.
+    """
+    broadcaster = Broadcaster()
+    broadcaster.new_game(board_size)
+    listener = await broadcaster.start(DEFAULT_HOST, port)
+    port = listener.sockets[0].getsockname()[1]
+    rng = random.Random(seed)
+    published = {}
+    publish_times = []
+    views = []
+    tasks = []
+    arrivals = []
+    stall = asyncio.Event()
+    async with listener:
+        for index in range(subscribers):
+            lagging = rng.random() < slow
+            view = View()
+            views.append((view, lagging))
+            received = []
+            arrivals.append(received)
+            tasks.append(asyncio.ensure_future(subscriber(
+                DEFAULT_HOST, port, received, view,
+                stall=stall if lagging else None, rcvbuf=4096 if lagging else None)))
+        # Ждем, пока все зрители подключатся и получат снимок
+        while len(broadcaster.subscribers) < subscribers:
+            await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        await play_games(broadcaster, games, board_size, seed, rate, published, publish_times)
+        elapsed = time.perf_counter() - started
+        stall.set()
+
+        # Отставшие зрители догоняют через снимок; ждем, пока все увидят последнее событие
+        deadline = time.perf_counter() + 30
+        while time.perf_counter() < deadline and any(view.seq < broadcaster.seq for view, _ in views):
+            await asyncio.sleep(0.05)
+        final = View()
+        final.apply(broadcaster.snapshot_line().split())
+        for subscriber_ in list(broadcaster.subscribers):
+            subscriber_.writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        broadcaster.resync_task.cancel()
+
+    latencies = sorted(
+        arrived - published[seq]
+        for received, (view, lagging) in zip(arrivals, views) if not lagging
+        for seq, arrived in received if seq in published
+    )
+    publish = sorted(publish_times)
+
+    def percentile(values, p):
+        return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1e3 if values else None
+
+    return {
+        "subscribers": subscribers,
+        "slow_subscribers": sum(lagging for _, lagging in views),
+        "games": games,
+        "events": broadcaster.stats["events"],
+        "seconds": elapsed,
+        "in_sync": sum(view.seq == broadcaster.seq and view.boards == final.boards for view, _ in views),
+        "stats": broadcaster.stats,
+        "publish_ms": {"p50": percentile(publish, 50), "p99": percentile(publish, 99),
+                       "max": percentile(publish, 100)},
+        "delivery_ms": {"p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+                        "p99": percentile(latencies, 99)},
+    }
+
+
+async def watch(host, port):
+    """Текстовый зритель: печать досок после каждого события"""
+    view = View()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            view.apply(line.decode().split())
+            print(f"\nсобытие {view.seq}" + (f", победитель: {view.winner}" if view.winner else ""))
+            print(view.render())
+    finally:
+        writer.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Трансляция партии зрителям")
+    parser.add_argument("--watch", metavar="HOST:PORT", help="подключиться к трансляции и печатать доски")
+    parser.add_argument("--load-test", type=int, metavar="SUBSCRIBERS",
+                        help="нагрузочная проверка через loopback с таким числом зрителей")
+    parser.add_argument("--games", type=int, default=20, help="партий в нагрузочной проверке")
+    parser.add_argument("--slow", type=float, default=0.1, help="доля медленных зрителей")
+    parser.add_argument("--rate", type=float, default=2000, help="событий в секунду (0 — без пауз)")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from .netclient import parse_address
+
+    args = parse_args(argv)
+    if args.load_test:
+        report = asyncio.run(load_test(args.load_test, args.games, slow=args.slow, seed=args.seed,
+                                       rate=args.rate))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif args.watch:
+        try:
+            asyncio.run(watch(*parse_address(args.watch, DEFAULT_PORT)))
+        except KeyboardInterrupt:
+            pass
+    else:
+        parse_args(["--help"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Круговой турнир стратегий стрельбы (sea_battle.ai) без графического интерфейса.
+
+Все стратегии стреляют по одним и тем же расстановкам: партия i каждой
+пары разыгрывается на паре расстановок i дважды, с разными первыми
+игроками. Стратегия видит только результаты своих выстрелов, поэтому
+последовательность ее выстрелов по расстановке не зависит от соперника.
+Каждая стратегия один раз добивает каждую расстановку, а исход встречи
+определяется сравнением числа промахов: при правиле «попал — стреляешь
+еще» первый игрок побеждает, если промахнулся не больше второго.
+
+Партии распределяются по пулу процессов так же, как в sea_battle.simulate;
+прогон с тем же зерном и числом процессов воспроизводится полностью, если
+точный расчет эндшпиля выключен (по умолчанию) или ни разу не упирается в
+предел времени (--endgame-threshold N включает его, например 200000).
+Стратегии, зарегистрированные вне модуля ai, должны регистрироваться
+при импорте, чтобы их видели процессы пула.
+
+Пример запуска:
+
+    python -m sea_battle.tournament --games 5000 --workers 8 --budget-ms 2
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from . import ai, endgame, engine, fleet
+from .simulate import split_games, worker_seed
+
+# Множитель нормального распределения для 95% доверительного интервала
+Z95 = 1.96
+
+
+def sink_fleet(strategy, board):
+    """Стрельба стратегии до потопления всего флота; возвращает (выстрелы, промахи)"""
+    shots = misses = 0
+    while True:
+        row, col = strategy.choose()
+        shots += 1
+        result = board.fire(row, col)
+        if result == engine.HIT:
+            sunk = board.is_ship_sunk(row, col)
+            strategy.observe(row, col, ai.RESULT_SUNK if sunk else ai.RESULT_HIT)
+            if board.all_sunk():
+                return shots, misses
+        else:
+            # Повторный выстрел в ту же клетку тоже передает ход
+            misses += 1
+            strategy.observe(row, col, ai.RESULT_MISS)
+
+
+class _Timed:
+    """Обертка стратегии, копящая время choose() в микросекундах"""
+
+    def __init__(self, strategy, latencies):
+        self.strategy = strategy
+        self.latencies = latencies
+
+    def choose(self):
+        started = time.perf_counter()
+        cell = self.strategy.choose()
+        self.latencies[int((time.perf_counter() - started) * 1e6)] += 1
+        return cell
+
+    def observe(self, row, col, result):
+        self.strategy.observe(row, col, result)
+
+
+def run_chunk(worker, names, games, board_size, ships, seed, cache_size=ai.EVALUATION_CACHE_SIZE,
+              endgame_threshold=endgame.THRESHOLD):
+    """Прогон части партий в одном процессе"""
+    started = time.perf_counter()
+    ai.evaluation_cache.resize(cache_size)
+    ai.evaluation_cache.clear()
+    layouts = fleet.generate_fleets(2 * games, board_size, ships, seed=worker_seed(seed, worker))
+    shots = {name: [] for name in names}
+    latencies = {name: Counter() for name in names}
+    # Пара (a, b) -> [побед a, побед b, сумма выстрелов победителя]
+    pairs = {pair: [0, 0, 0] for pair in itertools.combinations(names, 2)}
+
+    for game in range(games):
+        sides = (next(layouts), next(layouts))
+        # results[name][side] — выстрелы и промахи стратегии по расстановке side
+        results = {}
+        for name in names:
+            results[name] = []
+            for side, layout in enumerate(sides):
+                board = engine.Board(board_size)
+                board.set_ships(layout)
+                rng = random.Random(worker_seed(worker_seed(seed, worker), 2 * game + side))
+                strategy = _Timed(ai.create(name, board_size, ships, rng, endgame_threshold=endgame_threshold),
+                                  latencies[name])
+                result = sink_fleet(strategy, board)
+                results[name].append(result)
+                shots[name].append(result[0])
+
+        for (a, b), record in pairs.items():
+            # Первый игрок стреляет по второй расстановке, второй — по первой
+            for first, second in ((a, b), (b, a)):
+                first_shots, first_misses = results[first][1]
+                second_shots, second_misses = results[second][0]
+                if first_misses <= second_misses:
+                    winner, winner_shots = first, first_shots
+                else:
+                    winner, winner_shots = second, second_shots
+                record[0 if winner == a else 1] += 1
+                record[2] += winner_shots
+
+    return {
+        "worker": worker,
+        "pid": os.getpid(),
+        "games": games,
+        "seconds": time.perf_counter() - started,
+        "shots": shots,
+        "latencies": {name: dict(counts) for name, counts in latencies.items()},
+        "pairs": [[a, b, *record] for (a, b), record in pairs.items()],
+        "cache": ai.evaluation_cache.stats(),
+    }
+
+
+def mean_interval(values):
+    """Среднее и полуширина 95% доверительного интервала"""
+    n = len(values)
+    if not n:
+        return None, None
+    mean = sum(values) / n
+    if n < 2:
+        return mean, None
+    variance = sum((v - mean) ** 2 for v in values) / (n - 1)
+    return mean, Z95 * math.sqrt(variance / n)
+
+
+def proportion_interval(successes, n):
+    """Доля успехов и ее 95% доверительный интервал Уилсона"""
+    if not n:
+        return None, None, None
+    p = successes / n
+    denominator = 1 + Z95 ** 2 / n
+    center = (p + Z95 ** 2 / (2 * n)) / denominator
+    half = Z95 * math.sqrt(p * (1 - p) / n + Z95 ** 2 / (4 * n * n)) / denominator
+    return p, center - half, center + half
+
+
+def summarize(names, chunks, elapsed, budget_ms=None):
+    """Сводная статистика по результатам всех процессов"""
+    games = sum(chunk["games"] for chunk in chunks)
+    moves = 0
+    strategies = {}
+    for name in names:
+        shots = [s for chunk in chunks for s in chunk["shots"][name]]
+        latencies = Counter()
+        for chunk in chunks:
+            latencies.update({int(k): v for k, v in chunk["latencies"][name].items()})
+        ordered = sorted(latencies.elements())
+        moves += len(ordered)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] / 1e3 if ordered else None
+
+        mean, half = mean_interval(shots)
+        p99 = percentile(99)
+        strategies[name] = {
+            "fleets": len(shots),
+            "shots_to_sink": {"mean": mean, "ci95": half},
+            "move_ms": {
+                "mean": sum(ordered) / len(ordered) / 1e3 if ordered else None,
+                "p50": percentile(50),
+                "p99": p99,
+                "max": ordered[-1] / 1e3 if ordered else None,
+            },
+            "within_budget": None if budget_ms is None or p99 is None else p99 <= budget_ms,
+            "win_rate": None,
+        }
+
+    matches = []
+    totals = {}
+    for a, b in itertools.combinations(names, 2):
+        wins_a = wins_b = winner_shots = 0
+        for chunk in chunks:
+            for first, second, a_wins, b_wins, total in chunk["pairs"]:
+                if (first, second) == (a, b):
+                    wins_a += a_wins
+                    wins_b += b_wins
+                    winner_shots += total
+        played = wins_a + wins_b
+        rate, low, high = proportion_interval(wins_a, played)
+        matches.append({
+            "strategies": [a, b],
+            "matches": played,
+            "wins": [wins_a, wins_b],
+            "win_rate": rate,
+            "win_rate_ci95": [low, high],
+            "mean_shots_to_win": winner_shots / played if played else None,
+        })
+        for name, wins in ((a, wins_a), (b, wins_b)):
+            won, total = totals.get(name, (0, 0))
+            totals[name] = (won + wins, total + played)
+    for name, (won, total) in totals.items():
+        strategies[name]["win_rate"] = won / total if total else None
+
+    # Кэш оценок у каждого процесса свой: складываем обращения
+    cache_hits = sum(chunk["cache"]["hits"] for chunk in chunks)
+    cache_lookups = cache_hits + sum(chunk["cache"]["misses"] for chunk in chunks)
+
+    # Сильнейшая стратегия в бюджете задержки: меньше всего выстрелов до потопления флота
+    eligible = [name for name in names if strategies[name]["within_budget"] is not False]
+    best = min(eligible, key=lambda name: strategies[name]["shots_to_sink"]["mean"], default=None)
+
+    return {
+        "games": games,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else None,
+        "moves_per_second": moves / elapsed if elapsed else None,
+        "budget_ms": budget_ms,
+        "best": best,
+        "cache": {
+            "hits": cache_hits,
+            "misses": cache_lookups - cache_hits,
+            "hit_rate": cache_hits / cache_lookups if cache_lookups else None,
+        },
+        "strategies": strategies,
+        "matches": matches,
+        "workers": [
+            {
+                "worker": chunk["worker"],
+                "pid": chunk["pid"],
+                "games": chunk["games"],
+                "seconds": chunk["seconds"],
+            }
+            for chunk in chunks
+        ],
+    }
+
+
+def run_tournament(games, names=None, workers=None, board_size=10, ships=engine.DEFAULT_SHIPS,
+                   seed=0, budget_ms=None, cache_size=ai.EVALUATION_CACHE_SIZE,
+                   endgame_threshold=endgame.THRESHOLD):
+    """Турнир на пуле процессов; возвращает сводную статистику"""
+    available = ai.strategies()
+    names = list(names or available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Недоступные стратегии: {', '.join(unknown)}")
+    workers = workers or os.cpu_count() or 1
+    ships = tuple(ships)
+    counts = [count for count in split_games(games, workers) if count]
+
+    started = time.perf_counter()
+    if len(counts) <= 1:
+        chunks = [run_chunk(0, names, games, board_size, ships, seed, cache_size, endgame_threshold)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(counts)) as pool:
+            futures = [
+                pool.submit(run_chunk, worker, names, count, board_size, ships, seed, cache_size,
+                            endgame_threshold)
+                for worker, count in enumerate(counts)
+            ]
+            chunks = [future.result() for future in futures]
+    return summarize(names, chunks, time.perf_counter() - started, budget_ms)
+
+
+def print_summary(summary):
+    """Вывод сводки в читаемом виде"""
+    print(f"Партий: {summary['games']} за {summary['seconds']:.2f} с "
+          f"({summary['games_per_second']:.0f} партий/с, {summary['moves_per_second']:.0f} ходов/с)")
+    for name, stats in summary["strategies"].items():
+        shots = stats["shots_to_sink"]
+        move = stats["move_ms"]
+        ci = f" ± {shots['ci95']:.2f}" if shots["ci95"] is not None else ""
+        budget = {True: "", False: " (вне бюджета)", None: ""}[stats["within_budget"]]
+        print(f"  {name}: {shots['mean']:.2f}{ci} выстрелов до потопления флота, "
+              f"ход {move['mean']:.3f} мс (p99 {move['p99']:.3f} мс){budget}")
+    for match in summary["matches"]:
+        a, b = match["strategies"]
+        low, high = match["win_rate_ci95"]
+        print(f"  {a} против {b}: {match['wins'][0]}:{match['wins'][1]}, "
+              f"доля побед {a} {match['win_rate']:.3f} [{low:.3f}; {high:.3f}], "
+              f"выстрелов до победы в среднем {match['mean_shots_to_win']:.2f}")
+    cache = summary["cache"]
+    if cache["hit_rate"] is not None:
+        print(f"Кэш оценок: {cache['hits']} попаданий, {cache['misses']} промахов "
+              f"(доля попаданий {cache['hit_rate']:.3f})")
+    if summary["best"]:
+        print(f"Лучшая стратегия: {summary['best']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Круговой турнир стратегий компьютера")
+    parser.add_argument("--games", type=int, default=1000, help="число пар расстановок")
+    parser.add_argument("--strategies", nargs="+", help="имена стратегий (по умолчанию все доступные)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию все ядра)")
+    parser.add_argument("--board-size", type=int, default=10, help="размер доски")
+    parser.add_argument("--seed", type=int, default=0, help="базовое зерно генератора")
+    parser.add_argument("--budget-ms", type=float, default=None, help="допустимое время хода (p99), мс")
+    parser.add_argument("--cache-size", type=int, default=ai.EVALUATION_CACHE_SIZE,
+                        help="позиций в кэше оценок каждого процесса (0 — без кэша)")
+    parser.add_argument("--endgame-threshold", type=int, default=endgame.THRESHOLD,
+                        help="оценка числа расстановок для точного эндшпиля (0 — без него)")
+    parser.add_argument("--json", action="store_true", help="вывести статистику в формате JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    summary = run_tournament(args.games, args.strategies, args.workers, args.board_size,
+                             seed=args.seed, budget_ms=args.budget_ms, cache_size=args.cache_size,
+                             endgame_threshold=args.endgame_threshold)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Кэш оценок вероятностной стратегии: ключ позиции и вытеснение."""
+import random
+
+import pytest
+
+from sea_battle import ai
+
+np = pytest.importorskip("numpy")
+
+
+def test_state_key_depends_on_fleet_lengths():
+    keys = {ai.DensityAI(10, ships, random.Random(0)).state_key() for ships in ((4, 3), (4, 2), (4, 3, 3))}
+    assert len(keys) == 3
+
+
+def test_state_key_follows_sunk_ships():
+    strategy = ai.DensityAI(5, (2, 1), random.Random(0))
+    before = strategy.state_key()
+    strategy.observe(0, 0, ai.RESULT_SUNK)
+    after = strategy.state_key()
+    other = ai.DensityAI(5, (2, 1), random.Random(0))
+    other.observe(0, 0, ai.RESULT_MISS)
+    assert len({before, after, other.state_key()}) == 3
+
+
+def test_cache_is_not_shared_between_fleets():
+    cache = ai.EvaluationCache(16)
+    small = ai.DensityAI(6, (2,), random.Random(0), cache=cache)
+    large = ai.DensityAI(6, (3,), random.Random(0), cache=cache)
+    small.choose()
+    large.choose()
+    assert cache.stats()["size"] == 2
+    assert cache.hits == 0
+
+
+def test_cache_evicts_least_recent():
+    cache = ai.EvaluationCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
@@ -0,0 +1,41 @@
+"""Пакетный движок: разметка кораблей и прогон на пуле процессов."""
+import random
+
+import pytest
+
+from sea_battle import batch, engine, fleet
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("board_size, ships", [(10, engine.DEFAULT_SHIPS), (7, (3, 2, 2, 1, 1)), (12, (5, 4, 1))])
+def test_layout_arrays_match_board_registry(board_size, ships):
+    rng = random.Random(board_size)
+    layouts = [fleet.sample_layout(board_size, ships, rng) for _ in range(50)]
+    ship_id, lengths = batch._layout_arrays(board_size, layouts)
+    for layout, ids, sizes in zip(layouts, ship_id, lengths):
+        board = engine.Board(board_size)
+        board.set_ships(layout)
+        expected = np.full((board_size, board_size), -1)
+        for number, cells in enumerate(board.fleet):
+            for row, col in engine.iter_cells(cells, board_size):
+                expected[row, col] = number
+        assert (ids == expected).all()
+        assert list(sizes) == [bin(cells).count("1") for cells in board.fleet] + [0] * (len(sizes) - len(board.fleet))
+
+
+def test_pool_matches_single_process():
+    single = batch.run_batch(60, workers=1, seed=4, batch_size=30)
+    pooled = batch.run_batch(60, workers=2, seed=4, batch_size=30)
+    assert len(pooled["workers"]) == 2
+    assert (single["wins"], single["shots_to_win"]) == (pooled["wins"], pooled["shots_to_win"])
+
+
+def test_every_game_finishes():
+    summary = batch.run_batch(40, workers=1, board_size=8, ships=(3, 2, 1), seed=1)
+    assert sum(summary["wins"]) == summary["games"] == 40
+
+
+def test_main_reports_missing_numpy(monkeypatch):
+    monkeypatch.setattr(batch, "np", None)
+    assert batch.main(["--games", "1"]) == 1
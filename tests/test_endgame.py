@@ -0,0 +1,85 @@
+"""Точный расчет эндшпиля против перебора всех сочетаний положений на доске 5 x 5."""
+import random
+import time
+
+import pytest
+
+from sea_battle import ai, endgame, engine, fleet
+
+SIZE = 5
+SHIPS = (3, 2, 2, 1)
+
+
+def brute_force(board_size, blocked, wounded, lengths):
+    """Перебор всех упорядоченных наборов положений живых кораблей без запоминания"""
+    tables = [[p for p in endgame._placements(board_size, length) if not p[0] & blocked and p[0] & ~wounded]
+              for length in sorted(lengths, reverse=True)]
+    coverage = [0] * (board_size * board_size)
+    count = 0
+
+    def place(index, union, forbidden):
+        nonlocal count
+        if index == len(tables):
+            if not wounded & ~union:
+                count += 1
+                for row, col in engine.iter_cells(union, board_size):
+                    coverage[row * board_size + col] += 1
+            return
+        for cells, halo, _ in tables[index]:
+            if not cells & forbidden:
+                place(index + 1, union | cells, forbidden | halo)
+
+    place(0, 0, 0)
+    return count, coverage
+
+
+def observed(seed, shots):
+    """Наблюдения после shots случайных выстрелов по случайной расстановке"""
+    rng = random.Random(seed)
+    board = engine.Board(SIZE)
+    board.set_ships(fleet.sample_layout(SIZE, SHIPS, rng))
+    cells = [(row, col) for row in range(SIZE) for col in range(SIZE)]
+    for row, col in rng.sample(cells, shots):
+        board.fire(row, col)
+    sunk = 0
+    for cells_mask in board.sunk_ships():
+        sunk |= cells_mask
+    blocked = board.misses | board.halo(sunk)
+    wounded = board.hits & ~sunk
+    return blocked, wounded, board.afloat_sizes()
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_solve_matches_brute_force(seed):
+    blocked, wounded, lengths = observed(seed, shots=seed % 12)
+    expected = brute_force(SIZE, blocked, wounded, lengths)
+    assert expected[0] >= 1  # настоящая расстановка всегда среди найденных
+    assert endgame.solve(SIZE, blocked, wounded, lengths, budget_ms=10_000) == expected
+    assert endgame.estimate(SIZE, blocked, wounded, lengths, limit=10 ** 9) >= expected[0]
+
+
+def test_solve_gives_up_after_deadline():
+    blocked, wounded, lengths = 0, 0, engine.DEFAULT_SHIPS
+    assert endgame.solve(10, blocked, wounded, lengths, deadline=time.perf_counter()) is None
+
+
+def test_threshold_is_per_instance_and_in_state_key():
+    pytest.importorskip("numpy")
+    off = ai.create("density", SIZE, SHIPS, random.Random(0))
+    on = ai.create("density", SIZE, SHIPS, random.Random(0), endgame_threshold=10 ** 9)
+    assert off.endgame_threshold == endgame.THRESHOLD
+    assert on.endgame_threshold == 10 ** 9
+    assert off.state_key() != on.state_key()
+
+
+def test_timed_out_move_is_not_cached(monkeypatch):
+    pytest.importorskip("numpy")
+    cache = ai.EvaluationCache(16)
+    strategy = ai.DensityAI(SIZE, SHIPS, random.Random(0), cache=cache, endgame_threshold=10 ** 9,
+                           endgame_budget_ms=10_000)
+    monkeypatch.setattr(endgame, "solve", lambda *args, **kwargs: None)
+    strategy.choose()
+    assert cache.stats()["size"] == 0
+    monkeypatch.undo()
+    strategy.choose()
+    assert cache.stats()["size"] == 1
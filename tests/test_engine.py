@@ -0,0 +1,109 @@
+"""Битовый движок против прежней логики на списках строк из main.py."""
+import random
+
+import pytest
+
+from sea_battle import engine
+
+
+class ListBoard:
+    """Доска в виде списка строк, как в BattleshipGame до выделения движка"""
+
+    def __init__(self, size):
+        self.size = size
+        self.board = [[engine.WATER] * size for _ in range(size)]
+
+    def can_place_ship(self, row, col, length, orientation):
+        if orientation == engine.HORIZONTAL:
+            if not (0 <= row < self.size and 0 <= col and col + length <= self.size):
+                return False
+            cells = [(row, col + i) for i in range(length)]
+        else:
+            if not (0 <= col < self.size and 0 <= row and row + length <= self.size):
+                return False
+            cells = [(row + i, col) for i in range(length)]
+        for r0, c0 in cells:
+            for r in range(max(0, r0 - 1), min(self.size, r0 + 2)):
+                for c in range(max(0, c0 - 1), min(self.size, c0 + 2)):
+                    if self.board[r][c] == engine.SHIP:
+                        return False
+        return True
+
+    def place_ship(self, row, col, length, orientation):
+        if not self.can_place_ship(row, col, length, orientation):
+            return False
+        for i in range(length):
+            if orientation == engine.HORIZONTAL:
+                self.board[row][col + i] = engine.SHIP
+            else:
+                self.board[row + i][col] = engine.SHIP
+        return True
+
+    def fire(self, row, col):
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            return None
+        cell = self.board[row][col]
+        if cell in (engine.HIT, engine.MISS):
+            return None
+        self.board[row][col] = engine.HIT if cell == engine.SHIP else engine.MISS
+        return self.board[row][col]
+
+    def is_ship_sunk(self, row, col):
+        # Прежний обход собирал только подбитые клетки и считал потопленным любой
+        # раненый корабль; здесь корабль — вся связная группа клеток S и X
+        if self.board[row][col] not in (engine.SHIP, engine.HIT):
+            return False
+        stack, seen = [(row, col)], {(row, col)}
+        while stack:
+            r, c = stack.pop()
+            if self.board[r][c] == engine.SHIP:
+                return False
+            for dr, dc in engine.DIRECTIONS:
+                nr, nc = r + dr, c + dc
+                if (0 <= nr < self.size and 0 <= nc < self.size and (nr, nc) not in seen
+                        and self.board[nr][nc] in (engine.SHIP, engine.HIT)):
+                    seen.add((nr, nc))
+                    stack.append((nr, nc))
+        return True
+
+    def check_win(self):
+        return all(cell != engine.SHIP for line in self.board for cell in line)
+
+
+@pytest.mark.parametrize("board_class", [engine.Board, engine.SparseBoard])
+@pytest.mark.parametrize("seed", range(20))
+def test_game_matches_list_board(board_class, seed):
+    rng = random.Random(seed)
+    size = rng.choice((5, 7, 10))
+    board, reference = board_class(size), ListBoard(size)
+    for _ in range(200):
+        row, col = rng.randrange(-1, size + 1), rng.randrange(-1, size + 1)
+        length = rng.choice(engine.DEFAULT_SHIPS)
+        orientation = rng.choice(engine.ORIENTATIONS)
+        assert board.can_place_ship(row, col, length, orientation) == \
+            reference.can_place_ship(row, col, length, orientation)
+        assert board.place_ship(row, col, length, orientation) == \
+            reference.place_ship(row, col, length, orientation)
+
+    cells = [(row, col) for row in range(-1, size + 1) for col in range(-1, size + 1)]
+    shots = cells + rng.sample(cells, len(cells) // 2)
+    rng.shuffle(shots)
+    for row, col in shots:
+        result = board.fire(row, col)
+        assert result == reference.fire(row, col)
+        if result == engine.HIT:
+            assert board.is_ship_sunk(row, col) == reference.is_ship_sunk(row, col)
+        assert board.all_sunk() == reference.check_win()
+    assert [[board.cell(row, col) for col in range(size)] for row in range(size)] == reference.board
+
+
+def test_set_ships_rebuilds_fleet():
+    rng = random.Random(1)
+    source = engine.Board(10)
+    for length in engine.DEFAULT_SHIPS:
+        placement = rng.choice(source.legal_placements(length))
+        source.place_ship(placement.row, placement.col, length, placement.orientation)
+    board = engine.Board(10)
+    board.set_ships(source.ships)
+    assert sorted(board.fleet) == sorted(source.fleet)
+    assert sorted(board.ship_anchors()) == sorted(source.ship_anchors())
@@ -0,0 +1,70 @@
+"""Проверка осуществимости флота против полного перебора на маленьких досках."""
+import itertools
+import random
+
+import pytest
+
+from sea_battle import engine, fleet
+
+
+def brute_force_fits(board_size, ships):
+    """Полный перебор без отсечений: корабли по очереди во все положения"""
+    lengths = sorted(ships, reverse=True)
+    if any(length > board_size for length in lengths):
+        return False
+    tables = [fleet._ship_placements(board_size, length) for length in lengths]
+
+    def search(index, ships_mask, first):
+        if index == len(lengths):
+            return True
+        for position in range(first, len(tables[index])):
+            placement = tables[index][position]
+            if placement.halo & ships_mask:
+                continue
+            # Одинаковые корабли перебираются по возрастанию номера положения
+            same = index + 1 < len(lengths) and lengths[index + 1] == lengths[index]
+            if search(index + 1, ships_mask | placement.cells, position + 1 if same else 0):
+                return True
+        return False
+
+    return search(0, 0, 0)
+
+
+def fleets(max_length, max_ships):
+    for count in range(1, max_ships + 1):
+        yield from itertools.combinations_with_replacement(range(max_length, 0, -1), count)
+
+
+@pytest.mark.parametrize("board_size, max_ships", [(1, 3), (2, 4), (3, 5), (4, 6), (5, 7)])
+def test_fleet_fits_matches_brute_force(board_size, max_ships):
+    for ships in fleets(min(board_size + 1, 4), max_ships):
+        assert fleet.fleet_fits(board_size, ships) == brute_force_fits(board_size, ships), ships
+
+
+def test_fleet_fits_rejects_bad_lengths():
+    assert fleet.fleet_fits(10, (4, 0)) is False
+    assert fleet.fleet_fits(10, engine.DEFAULT_SHIPS) is True
+
+
+@pytest.mark.parametrize("board_size, ships", [(10, engine.DEFAULT_SHIPS), (6, (3, 2, 2, 1)), (4, (2, 1, 1))])
+def test_sample_layout_is_legal(board_size, ships):
+    rng = random.Random(board_size)
+    for _ in range(20):
+        board = engine.Board(board_size)
+        board.set_ships(fleet.sample_layout(board_size, ships, rng))
+        assert sorted((length for _, _, length, _ in board.ship_anchors()), reverse=True) == sorted(ships, reverse=True)
+        for cells in board.fleet:
+            assert not board.halo(cells) & board.ships & ~cells
+
+
+def test_backtracking_gives_up_after_node_limit():
+    with pytest.raises(fleet.FleetSearchLimitError):
+        fleet.sample_backtracking(7, engine.DEFAULT_SHIPS, random.Random(0), limit=5)
+
+
+def test_backtracking_reports_infeasible_fleet():
+    # Оценка по площади флот пропускает, но без касаний он на доску не встает
+    ships = (3, 2, 2, 1)
+    assert fleet.area_bound_allows(4, ships) and not brute_force_fits(4, ships)
+    with pytest.raises(fleet.FleetInfeasibleError):
+        fleet.sample_backtracking(4, ships, random.Random(0))
@@ -0,0 +1,83 @@
+"""Журнал ходов: записанные партии восстанавливаются всеми способами воспроизведения."""
+import random
+
+import pytest
+
+from sea_battle import engine, fleet, journal
+
+
+def play(log, board_size, ships, rng):
+    """Партия со случайными расстановками и выстрелами; возвращает доски (игрока, компьютера)"""
+    log.start_game(board_size)
+    boards = []
+    for side in (journal.SIDE_PLAYER, journal.SIDE_COMPUTER):
+        board = engine.Board(board_size)
+        board.set_ships(fleet.sample_layout(board_size, ships, rng))
+        log.record_fleet(side, board)
+        boards.append(board)
+    cells = [(row, col) for row in range(board_size) for col in range(board_size)]
+    for side in (journal.SIDE_PLAYER, journal.SIDE_COMPUTER):
+        for row, col in rng.sample(cells, rng.randrange(len(cells) + 1)):
+            boards[side].fire(row, col)
+            log.record_shot(side, row, col, boards[side])
+    return tuple(boards)
+
+
+def same_boards(left, right):
+    return all((a.ships, a.hits, a.misses, sorted(a.fleet)) == (b.ships, b.hits, b.misses, sorted(b.fleet))
+               for a, b in zip(left, right))
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    path = tmp_path / "journal.bin"
+    rng = random.Random(3)
+    games = []
+    # Журнал дописывается: каждая партия открывает файл заново
+    for board_size, ships in ((10, engine.DEFAULT_SHIPS), (6, (3, 2, 1, 1)), (10, engine.DEFAULT_SHIPS)):
+        log = journal.Journal(path)
+        games.append(play(log, board_size, ships, rng))
+        log.close()
+    return path, games
+
+
+def test_fast_forward_file(recorded):
+    path, games = recorded
+    replayed = list(journal.fast_forward_file(path))
+    assert len(replayed) == len(games)
+    for boards, expected in zip(replayed, games):
+        assert same_boards(boards, expected)
+
+
+def test_fast_forward_and_replayer_agree(recorded):
+    path, games = recorded
+    for records, expected in zip(journal.iter_games(path), games):
+        assert same_boards(journal.fast_forward(records), expected)
+        replayer = journal.Replayer(records)
+        while replayer.step() is not None:
+            pass
+        assert same_boards(replayer.boards, expected)
+
+
+def test_partial_fast_forward_matches_replayer(recorded):
+    path, _ = recorded
+    records = next(journal.iter_games(path))
+    replayer = journal.Replayer(records)
+    for upto in range(1, len(records) + 1, 7):
+        while replayer.position < upto:
+            replayer.step()
+        assert same_boards(journal.fast_forward(records, upto), replayer.boards)
+
+
+def test_unfinished_tail_is_ignored(recorded):
+    path, games = recorded
+    with open(path, "ab") as f:
+        f.write(b"\x02\x00\x01")
+    assert len(list(journal.fast_forward_file(path))) == len(games)
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"XYZ\x01" + bytes(16))
+    with pytest.raises(journal.JournalFormatError):
+        list(journal.iter_records(path))
@@ -0,0 +1,54 @@
+"""Замеры задержек интерфейса без окна: учет кликов и гистограммы."""
+import pytest
+
+from sea_battle import latency
+
+
+class Root:
+    """Вместо окна Tk: отложенные вызовы выполняются сразу"""
+
+    def after_idle(self, callback):
+        callback()
+
+
+class Game:
+    """Обработчики кликов, которые перерисовывают доску, только если клик что-то изменил"""
+
+    def __init__(self):
+        self.shot = set()
+
+    def draw_board(self):
+        pass
+
+    def player_fire(self, cell):
+        if cell in self.shot:
+            return
+        self.shot.add(cell)
+        self.draw_board()
+
+    def place_player_ship(self, cell):
+        self.draw_board()
+
+
+def test_only_clicks_that_redraw_are_recorded():
+    monitor = latency.LatencyMonitor(Root())
+    game = Game()
+    monitor.attach(game)
+    for cell in (1, 1, 2, 2, 2, 3):
+        game.player_fire(cell)
+    game.place_player_ship(0)
+    assert monitor.histograms[latency.CLICK_FIRE].count == 3
+    assert monitor.histograms[latency.CLICK_PLACE].count == 1
+    assert monitor.histograms[latency.DRAW].count == 4
+
+
+def test_histogram_round_trip():
+    histogram = latency.Histogram()
+    for ms in (0.005, 0.5, 1, 2, 3, 50, 400):
+        histogram.record(ms / 1000)
+    loaded = latency.Histogram.from_dict(histogram.to_dict())
+    assert loaded.counts == histogram.counts
+    assert loaded.count == 7
+    for p in latency.PERCENTILES:
+        assert loaded.percentile(p) == pytest.approx(histogram.percentile(p))
+    assert histogram.percentile(50) == pytest.approx(2, rel=latency.RATIO - 1)
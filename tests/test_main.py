@@ -0,0 +1,117 @@
+"""Логика окна игры, которую можно проверить без дисплея: трансляция выстрелов и сохранение."""
+import random
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+from sea_battle import ai, endgame, engine, main, savegame, spectate  # noqa: E402
+
+
+class Spectators:
+    """Трансляция, которая только запоминает события"""
+
+    def __init__(self):
+        self.events = []
+
+    def shot(self, *args):
+        self.events.append(("shot",) + args)
+
+
+def headless_game(board_size, spectators=None):
+    """Игра без окна: только состояние, нужное проверяемым методам"""
+    game = object.__new__(main.BattleshipGame)
+    game.board_size = board_size
+    game.spectators = spectators
+    game.network = None
+    return game
+
+
+@pytest.mark.parametrize("spectators", [None, Spectators()])
+def test_shot_on_large_board_is_not_broadcast(spectators):
+    game = headless_game(engine.LARGE_BOARD, spectators)
+    board = engine.new_board(game.board_size)
+    assert isinstance(board, engine.SparseBoard)
+    board.place_ship(5, 5, 2, engine.HORIZONTAL)
+    for row, col in ((0, 0), (5, 5), (5, 6)):
+        game.broadcast_shot(spectate.COMPUTER, board, row, col, board.fire(row, col))
+    assert spectators is None or spectators.events == []
+
+
+def test_shot_results_are_broadcast():
+    spectators = Spectators()
+    game = headless_game(10, spectators)
+    board = engine.new_board(game.board_size)
+    board.place_ship(2, 2, 2, engine.VERTICAL)
+    for row, col in ((0, 0), (2, 2), (3, 2)):
+        game.broadcast_shot(spectate.PLAYER, board, row, col, board.fire(row, col))
+    assert spectators.events == [
+        ("shot", spectate.PLAYER, 0, 0, ai.RESULT_MISS),
+        ("shot", spectate.PLAYER, 2, 2, ai.RESULT_HIT),
+        ("shot", spectate.PLAYER, 3, 2, ai.RESULT_SUNK),
+    ]
+
+
+@pytest.fixture
+def saved(tmp_path, monkeypatch):
+    """Сохранение прошлого сеанса в рабочем каталоге"""
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / main.SAVE_FILE
+    path.write_bytes(b"previous session")
+    return path
+
+
+def session_game(local_game):
+    game = headless_game(10)
+    game.local_game = local_game
+    game.game_over = False
+    game.replayer = None
+    game.player_board = None
+    game.computer_board = None
+    return game
+
+
+def test_closing_without_a_game_keeps_the_save(saved):
+    session_game(local_game=False).save_game()
+    assert saved.read_bytes() == b"previous session"
+
+
+def test_closing_after_replay_keeps_the_save(saved):
+    game = session_game(local_game=False)
+    game.player_board, game.computer_board = engine.Board(10), engine.Board(10)
+    game.replayer = object()
+    game.save_game()
+    assert saved.read_bytes() == b"previous session"
+
+
+def test_unfinished_game_replaces_the_save(saved):
+    game = session_game(local_game=True)
+    game.ships = list(engine.DEFAULT_SHIPS)
+    game.player_board, game.computer_board = engine.Board(10), engine.Board(10)
+    game.current_turn = "player"
+    game.current_ship_index = 0
+    game.current_ship_orientation = engine.HORIZONTAL
+    game.placement_mode = True
+    game.rng = random.Random(0)
+    game.save_game()
+    assert savegame.load(saved).board_size == 10
+
+
+def test_finished_game_removes_the_save(saved):
+    game = session_game(local_game=True)
+    game.game_over = True
+    game.discard_save()
+    game.save_game()
+    assert not saved.exists()
+
+
+def test_computer_uses_endgame_solver():
+    pytest.importorskip("numpy")
+    game = headless_game(10)
+    game.ai_strategy = ai.DENSITY
+    game.ships = list(engine.DEFAULT_SHIPS)
+    game.rng = random.Random(0)
+    game.heatmaps = {10: False}
+    game.endgame_threshold = endgame.INTERACTIVE_THRESHOLD
+    computer_ai = game.create_computer_ai()
+    assert computer_ai.endgame_threshold == endgame.INTERACTIVE_THRESHOLD > 0
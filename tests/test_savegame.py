@@ -0,0 +1,77 @@
+"""Сохранение партии: упаковка и распаковка дают ту же позицию."""
+import random
+
+import pytest
+
+from sea_battle import engine, fleet, savegame
+
+
+def played_board(board_size, ships, rng, shots):
+    board = engine.Board(board_size)
+    board.set_ships(fleet.sample_layout(board_size, ships, rng))
+    for _ in range(shots):
+        board.fire(rng.randrange(board_size), rng.randrange(board_size))
+    return board
+
+
+def assert_same_board(loaded, board):
+    assert (loaded.ships, loaded.hits, loaded.misses) == (board.ships, board.hits, board.misses)
+    assert sorted(loaded.fleet) == sorted(board.fleet)
+    assert loaded.remaining == board.remaining
+    assert loaded.all_sunk() == board.all_sunk()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_round_trip(seed):
+    rng = random.Random(seed)
+    board_size, ships = rng.choice(((10, engine.DEFAULT_SHIPS), (7, (3, 2, 2, 1, 1)), (15, (5, 4, 3, 3, 2))))
+    game = savegame.SavedGame(
+        board_size=board_size,
+        ships=list(ships),
+        player_board=played_board(board_size, ships, rng, rng.randrange(board_size * board_size)),
+        computer_board=played_board(board_size, ships, rng, rng.randrange(board_size * board_size)),
+        current_turn=rng.choice(("player", "computer")),
+        current_ship_index=rng.randrange(len(ships) + 1),
+        orientation=rng.choice(engine.ORIENTATIONS),
+        placement_mode=rng.random() < 0.5,
+        seed=rng.getrandbits(64),
+    )
+    loaded = savegame.loads(savegame.dumps(game))
+    assert_same_board(loaded.player_board, game.player_board)
+    assert_same_board(loaded.computer_board, game.computer_board)
+    assert loaded._replace(player_board=None, computer_board=None) == \
+        game._replace(player_board=None, computer_board=None)
+
+
+def test_standard_game_is_78_bytes(tmp_path):
+    rng = random.Random(0)
+    board = played_board(10, engine.DEFAULT_SHIPS, rng, 30)
+    game = savegame.SavedGame(10, list(engine.DEFAULT_SHIPS), board, board, "player", 0,
+                              engine.HORIZONTAL, False, 1)
+    path = tmp_path / "game.sav"
+    savegame.save(path, game)
+    assert path.stat().st_size == 78
+    assert_same_board(savegame.load(path).player_board, board)
+
+
+def test_reseed_continues_sequence():
+    rng = random.Random(5)
+    seed = savegame.reseed(rng)
+    expected = [rng.random() for _ in range(5)]
+    restored = random.Random(seed)
+    assert [restored.random() for _ in range(5)] == expected
+
+
+@pytest.mark.parametrize("data", [b"", b"SB", b"XX" + bytes(100)])
+def test_broken_file_is_rejected(data):
+    with pytest.raises(savegame.SaveFormatError):
+        savegame.loads(data)
+
+
+def test_truncated_file_is_rejected():
+    rng = random.Random(1)
+    board = played_board(10, engine.DEFAULT_SHIPS, rng, 10)
+    data = savegame.dumps(savegame.SavedGame(10, list(engine.DEFAULT_SHIPS), board, board, "player", 0,
+                                             engine.HORIZONTAL, False, 1))
+    with pytest.raises(savegame.SaveFormatError):
+        savegame.loads(data[:-1])
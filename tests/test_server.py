@@ -0,0 +1,135 @@
+"""Сетевая игра через loopback: сервер на свободном порту и два клиента окна игры."""
+import asyncio
+import threading
+
+import pytest
+
+from sea_battle import ai, netclient, server
+
+TIMEOUT = 5
+BOARD_SIZE = 6
+SHIPS = (2, 1)
+
+
+@pytest.fixture
+def address():
+    """Сервер в фоновом потоке со своим циклом asyncio, как у трансляции"""
+    loop = asyncio.new_event_loop()
+    game_server = server.Server(ships=SHIPS, seed=1)
+    listener = loop.run_until_complete(game_server.start(server.DEFAULT_HOST, 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server.DEFAULT_HOST, listener.sockets[0].getsockname()[1]
+
+    async def stop():
+        # Сессии клиентов завершаются вместе с циклом, как при остановке сервера
+        listener.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(TIMEOUT)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(TIMEOUT)
+    loop.close()
+
+
+@pytest.fixture
+def clients(address):
+    connections = [netclient.Connection(*address, timeout=TIMEOUT) for _ in range(2)]
+    yield connections
+    for connection in connections:
+        connection.close()
+
+
+def receive(connection):
+    """Следующее сообщение сервера; без ответа за TIMEOUT тест падает"""
+    return connection.messages.get(timeout=TIMEOUT)
+
+
+def test_placement_fire_and_result_round_trip(clients):
+    first, second = clients
+    first.send("JOIN", BOARD_SIZE)
+    assert receive(first) == ["WAIT"]
+    second.send("JOIN", BOARD_SIZE)
+    for connection in clients:
+        assert receive(connection) == ["START", str(BOARD_SIZE), "2,1"]
+
+    # У обоих игроков одинаковый флот: двухпалубный в (0, 0) по горизонтали и одиночный в (3, 3)
+    for connection in clients:
+        connection.send("PLACE", 0, 0, 2, "h")
+        assert receive(connection) == ["OK"]
+        connection.send("PLACE", 1, 1, 1, "h")
+        assert receive(connection)[0] == "ERR"  # касается двухпалубного
+        connection.send("PLACE", 3, 3, 1, "h")
+        assert receive(connection) == ["OK"]
+    turns = {receive(connection)[1]: connection for connection in clients}
+    shooter, waiting = turns["you"], turns["opponent"]
+
+    waiting.send("FIRE", 0, 0)
+    assert receive(waiting)[0] == "ERR"  # не его ход
+
+    shooter.send("FIRE", 0, 0)
+    assert receive(shooter) == ["SHOT", "0", "0", ai.RESULT_HIT]
+    assert receive(waiting) == ["INCOMING", "0", "0", ai.RESULT_HIT]
+    assert receive(shooter) == ["TURN", "you"]
+    assert receive(waiting) == ["TURN", "opponent"]
+
+    shooter.send("FIRE", 0, 1)
+    assert receive(shooter) == ["SHOT", "0", "1", ai.RESULT_SUNK]
+    assert receive(waiting) == ["INCOMING", "0", "1", ai.RESULT_SUNK]
+    receive(shooter), receive(waiting)
+
+    # Промах передает ход
+    shooter.send("FIRE", 5, 5)
+    assert receive(shooter) == ["SHOT", "5", "5", ai.RESULT_MISS]
+    assert receive(waiting) == ["INCOMING", "5", "5", ai.RESULT_MISS]
+    assert receive(shooter) == ["TURN", "opponent"]
+    assert receive(waiting) == ["TURN", "you"]
+
+    waiting.send("FIRE", 3, 3)
+    assert receive(waiting) == ["SHOT", "3", "3", ai.RESULT_SUNK]
+    assert receive(shooter) == ["INCOMING", "3", "3", ai.RESULT_SUNK]
+    assert receive(waiting) == ["TURN", "you"]
+    assert receive(shooter) == ["TURN", "opponent"]
+    waiting.send("FIRE", 3, 3)
+    assert receive(waiting)[0] == "ERR"  # в эту клетку уже стреляли
+    waiting.send("FIRE", 5, 5)
+    for connection in (waiting, shooter, waiting, shooter):
+        receive(connection)
+
+    # Последний корабль: победа и конец партии
+    shooter.send("FIRE", 3, 3)
+    assert receive(shooter) == ["SHOT", "3", "3", ai.RESULT_SUNK]
+    assert receive(waiting) == ["INCOMING", "3", "3", ai.RESULT_SUNK]
+    assert receive(shooter) == ["WIN"]
+    assert receive(waiting) == ["LOSE"]
+    shooter.send("FIRE", 4, 4)
+    assert receive(shooter)[0] == "ERR"
+
+
+def test_opponent_leaving_ends_match(clients):
+    first, second = clients
+    first.send("JOIN", BOARD_SIZE)
+    receive(first)
+    second.send("JOIN", BOARD_SIZE)
+    receive(first), receive(second)
+    second.send("QUIT")
+    assert receive(first) == ["LEFT"]
+
+
+def test_rejoin_moves_player_to_new_queue(clients):
+    first, second = clients
+    first.send("JOIN", BOARD_SIZE)
+    assert receive(first) == ["WAIT"]
+    first.send("JOIN", BOARD_SIZE + 1)
+    assert receive(first) == ["WAIT"]
+    # Прежняя заявка снята: второй игрок ждет, а не начинает партию с первым
+    second.send("JOIN", BOARD_SIZE)
+    assert receive(second) == ["WAIT"]
+
+
+def test_load_test_finishes_every_game():
+    report = asyncio.run(asyncio.wait_for(server.load_test(5, board_size=8, seed=2), 30))
+    assert report["finished"] == report["games"] == 5
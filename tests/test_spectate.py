@@ -0,0 +1,51 @@
+"""Трансляция через loopback: зритель получает снимок, затем изменения."""
+import socket
+
+import pytest
+
+from sea_battle import ai, spectate
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def service():
+    service = spectate.SpectatorService(port=0)
+    yield service
+    service.close()
+
+
+def test_spectator_gets_snapshot_then_shots(service):
+    service.new_game(10)
+    with socket.create_connection((spectate.DEFAULT_HOST, service.port), timeout=TIMEOUT) as sock:
+        lines = sock.makefile("r", encoding="utf-8")
+        view = spectate.View()
+        snapshot = lines.readline().split()
+        assert snapshot[0] == "SNAPSHOT"
+        view.apply(snapshot)
+        assert view.size == 10
+
+        service.shot(spectate.COMPUTER, 3, 4, ai.RESULT_HIT)
+        service.shot(spectate.PLAYER, 0, 0, ai.RESULT_MISS)
+        service.shot(spectate.COMPUTER, 3, 5, ai.RESULT_SUNK)
+        service.game_over(spectate.PLAYER)
+        events = [lines.readline().split() for _ in range(4)]
+
+    assert [event[0] for event in events] == ["CELL", "CELL", "CELL", "OVER"]
+    assert events[0][2:] == [spectate.COMPUTER, "3", "4", ai.RESULT_HIT]
+    for event in events:
+        view.apply(event)
+    assert view.gaps == 0
+    assert view.winner == spectate.PLAYER
+    hits, misses, sunk = view.boards[spectate.COMPUTER]
+    assert hits == sunk == (1 << 34) | (1 << 35)
+    assert view.boards[spectate.PLAYER][1] == 1
+
+
+def test_late_spectator_gets_current_state(service):
+    service.new_game(10)
+    service.shot(spectate.PLAYER, 1, 1, ai.RESULT_MISS)
+    with socket.create_connection((spectate.DEFAULT_HOST, service.port), timeout=TIMEOUT) as sock:
+        view = spectate.View()
+        view.apply(sock.makefile("r", encoding="utf-8").readline().split())
+    assert view.boards[spectate.PLAYER][1] == 1 << 11
@@ -0,0 +1,60 @@
+"""Пул необстрелянных клеток: случайная клетка никогда не повторяется."""
+import random
+
+import pytest
+
+from sea_battle import engine
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_shots_cover_board_without_repeats(seed):
+    rng = random.Random(seed)
+    size = rng.choice((3, 7, 10))
+    board = engine.Board(size)
+    seen = set()
+    while True:
+        parity = rng.choice((None, 0, 1))
+        cell = board.random_unshot(rng, parity)
+        if cell is None:
+            # Без parity клеток нет совсем; с parity — кончились клетки этого цвета
+            if parity is None:
+                break
+            remaining = {(row, col) for row in range(size) for col in range(size)} - seen
+            assert all((row + col) & 1 != parity for row, col in remaining)
+            continue
+        assert cell not in seen
+        assert parity is None or sum(cell) & 1 == parity
+        seen.add(cell)
+        # Выстрел по своей доске или отметка на доске целей — пул обновляется в обоих случаях
+        if rng.random() < 0.5:
+            board.fire(*cell)
+        else:
+            board.mark(*cell, rng.random() < 0.3)
+    assert len(seen) == size * size
+
+
+def test_pool_starts_from_existing_shots():
+    board = engine.Board(5)
+    for row, col in ((0, 0), (2, 3), (4, 4)):
+        board.fire(row, col)
+    pool = board.unshot_pool()
+    assert len(pool) == 22
+    assert {board.random_unshot(random.Random(i)) for i in range(500)}.isdisjoint({(0, 0), (2, 3), (4, 4)})
+
+
+def test_pool_rebuilt_after_masks_change_directly():
+    board = engine.Board(4)
+    board.unshot_pool()
+    # Маски выстрелов, загруженные из сохранения, меняются в обход fire и mark
+    board.misses = board.full & ~1
+    assert board.random_unshot(random.Random(0)) == (0, 0)
+    board.misses = board.full
+    assert board.random_unshot(random.Random(0)) is None
+
+
+def test_discard_is_idempotent():
+    pool = engine.UnshotPool(3)
+    pool.discard(4)
+    pool.discard(4)
+    assert len(pool) == 8
+    assert sorted(list(pool.cells[0]) + list(pool.cells[1])) == [0, 1, 2, 3, 5, 6, 7, 8]